@@ -1,28 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Header, Request, Response, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from sqlalchemy import or_, and_
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional
 from backend.db.connection import get_db
-from backend.db.models import Question, HealthData, UserAnswer, Result, User
-from backend.calculate_service import calculate_for_user
-from backend.services.result_service import save_health_score
+from backend.db.models import Question, HealthData, UserAnswer, Result, User, RecommendationJob, UserScoreRollup
+from backend.calculate_service import calculate_for_submission, get_age
+from backend.services.result_service import save_health_score, rollup_summary
+from backend.services.answer_service import get_current_answers, save_user_answers
 from backend.auth import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime
 from typing import List
-from backend.calculations.prompt_builder import build_prompt
 import os
-from uuid import uuid4
-from g4f import ChatCompletion
-from g4f.models import (
-    gpt_4, gpt_4o, gpt_3_5_turbo, claude_3_5_sonnet, llama_3_2_11b, mixtral_8x22b
-)
+import time
+import base64
+import binascii
+import hmac
+from backend.services.recommendation_service import get_last_result, get_last_health_data, collect_prompt_inputs, RecommendationDataError
+from backend.services.recommendation_stream import recommendation_events, stored_recommendation_events
+from backend.services.recommendation_jobs import job_queue, JOB_DONE
+from backend.services.recommendation_cache import recommendation_cache
+from backend.services.question_catalog import get_question_catalog, load_question_catalog
+from backend.services.auth_cache import token_cache, user_cache, auth_stats
+from backend.services.password_hasher import password_hasher, PasswordHasherOverloaded
+from backend.services.provider_health import provider_health
+from backend.services.metrics import span
+from backend.services.avatar_service import avatar_processor, avatar_digest, avatar_urls, AvatarError, AvatarTooLarge, AVATAR_SIZES
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")  
 
 class Token(BaseModel):
@@ -43,6 +55,14 @@ class AnswerInput(BaseModel):
     question_id: int
     answer: Optional[bool]
 
+    # Ответы проверяются один раз здесь, дальше расчёт их не валидирует
+    @field_validator("question_id")
+    @classmethod
+    def question_must_exist(cls, question_id):
+        if get_question_catalog().get(question_id) is None:
+            raise ValueError(f"Неизвестный вопрос: {question_id}")
+        return question_id
+
 class UserInput(BaseModel):
     systolic_bp: int
     diastolic_bp: int
@@ -51,6 +71,14 @@ class UserInput(BaseModel):
     height: int
     weight: int
     answers: List[AnswerInput]
+
+    @field_validator("answers")
+    @classmethod
+    def answers_must_be_unique(cls, answers):
+        question_ids = [answer.question_id for answer in answers]
+        if len(question_ids) != len(set(question_ids)):
+            raise ValueError("Ответ на каждый вопрос должен быть указан один раз")
+        return answers
     
 class UserUpdate(BaseModel):
     name: str | None = None
@@ -59,11 +87,23 @@ class UserUpdate(BaseModel):
 
 # Вспомогательные функции
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt выполняется в отдельном ограниченном пуле, см. services/password_hasher.py
+async def verify_password(plain_password, hashed_password):
+    return await _run_password_hasher(password_hasher.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await _run_password_hasher(password_hasher.hash, password)
+
+async def _run_password_hasher(func, *args):
+    try:
+        with span("auth.password"):
+            return await func(*args)
+    except PasswordHasherOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"},
+        )
 
 def create_access_token(data: dict):
     from datetime import datetime, timedelta
@@ -72,14 +112,33 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def encode_results_cursor(created_at: datetime, result_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{result_id}".encode()).decode()
+
+def decode_results_cursor(cursor: str):
+    try:
+        created_at, result_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(result_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("invalid cursor")
+
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def authenticate_user(db: Session, email: str, password: str):
+def get_detached_user_by_email(db: Session, email: str):
+    # Пользователь без привязки к сессии; соединение сразу возвращается в пул,
+    # чтобы не удерживать его, пока bcrypt проверяет пароль
     user = get_user_by_email(db, email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await run_in_threadpool(get_detached_user_by_email, db, email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         return False
     return user
 
@@ -89,28 +148,49 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    start = time.perf_counter()
+
+    with span("auth"):
+        # Проверенные токены и пользователи кэшируются, см. services/auth_cache.py
+        payload = token_cache.get(token)
+        token_hit = payload is not None
+        if payload is None:
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                raise credentials_exception
+            token_cache.put(token, payload)
+
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
+
+        # Попадание в кэш не обращается к БД (merge без загрузки). При промахе
+        # пользователь читается в пуле потоков, чтобы ожидание соединения не
+        # блокировало event loop, и соединение сразу возвращается в пул, а не
+        # удерживается до начала обработчика
+        user = user_cache.get_by_email(db, token_data.email)
+        user_hit = user is not None
+        if user is None:
+            user = await run_in_threadpool(get_detached_user_by_email, db, token_data.email)
+            if user is None:
+                raise credentials_exception
+            user_cache.put(user)
+            user = db.merge(user, load=False)
+
+    auth_stats.record(time.perf_counter() - start, token_hit, user_hit)
     return user
 
 # Роуты регистрации и входа
 
 @router.post("/auth/register", status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(get_detached_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     new_user = User(
         email=user.email,
         password=hashed_password,
@@ -119,14 +199,13 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         birth_date=user.birthdate
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.commit)
     
     return {"message": "User registered successfully"}
 
 @router.post("/auth/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -143,13 +222,67 @@ def read_root():
     return {"message": "API is running"}
 
 @router.get("/questions")
-def get_questions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(Question).all()
+def get_questions(request: Request, current_user: User = Depends(get_current_user)):
+    # Вопросы из каталога в памяти; клиент с актуальным ETag получает 304
+    catalog = get_question_catalog()
+    headers = {"ETag": catalog.etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == catalog.etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse([q._asdict() for q in catalog.questions], headers=headers)
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    # Служебные маршруты доступны только с заголовком X-Admin-Token при заданном ADMIN_TOKEN
+    # Сравнение за постоянное время, чтобы токен нельзя было подобрать по времени ответа
+    if not ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.post("/admin/questions/reload", dependencies=[Depends(require_admin)])
+def reload_questions(db: Session = Depends(get_db)):
+    # Перезагрузка каталога после изменения вопросов
+    catalog = load_question_catalog(db)
+    return {"version": catalog.version, "etag": catalog.etag, "questions": len(catalog.questions)}
 
 @router.get("/results")
-def get_results(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    results = db.query(Result).filter(Result.user_id == current_user.id).all()
-    return results
+def get_results(
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    include_recommendation: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Постраничная выдача от новых к старым (keyset по created_at, id).
+    # Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    columns = [Result.id, Result.user_id, Result.health_score, Result.analysis_text, Result.created_at]
+    if include_recommendation:
+        columns.append(Result.recommendation)
+
+    query = db.query(*columns).filter(Result.user_id == current_user.id)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_results_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Неверный курсор")
+        query = query.filter(
+            or_(
+                Result.created_at < cursor_created_at,
+                and_(Result.created_at == cursor_created_at, Result.id < cursor_id),
+            )
+        )
+
+    rows = query.order_by(Result.created_at.desc(), Result.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_results_cursor(rows[-1].created_at, rows[-1].id)
+
+    return [row._asdict() for row in rows]
+
+@router.get("/results/summary")
+def get_results_summary(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    rollup = db.get(UserScoreRollup, current_user.id)
+    if rollup is None:
+        return {"message": "Результаты ещё не рассчитаны"}
+    return rollup_summary(rollup)
 
 @router.get("/my_last_result")
 def get_my_last_result(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -171,6 +304,9 @@ def get_my_last_result(current_user: User = Depends(get_current_user), db: Sessi
 
 @router.post("/submit_health_data")
 def submit_health_data(data: UserInput, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Вся отправка сохраняется одной транзакцией с одним commit
+    age = get_age(current_user.birth_date)
+
     # Сохранение физиологических данных
     health_entry = HealthData(
         user_id=current_user.id,
@@ -179,30 +315,38 @@ def submit_health_data(data: UserInput, current_user: User = Depends(get_current
         pulse=data.pulse,
         temperature=data.temperature,
         height=data.height,
-        weight=data.weight
+        weight=data.weight,
+        age=age
     )
-    db.add(health_entry)
-    db.commit()
-
-    # Сохранение ответов
-    for answer in data.answers:
-        if answer.answer is not None:
-            new_answer = UserAnswer(
-                user_id=current_user.id,
-                question_id=answer.question_id,
-                answer=answer.answer
-            )
-            db.add(new_answer)
-    db.commit()
-
-    # Вызов расчёта и сохранение результата
-    result_data = calculate_for_user(current_user.id)
+    # Ответы перезаписывают текущие ответы пользователя; "Не знаю" тоже сохраняется,
+    # чтобы заменить прежний ответ на этот вопрос
+    answers = [(answer.question_id, answer.answer) for answer in data.answers]
+    with span("submit.db_write"):
+        db.add(health_entry)
+        db.flush()
+        save_user_answers(db, current_user.id, answers, health_data_id=health_entry.id)
+        # Отправка может содержать часть вопросов: балл считается по всему текущему
+        # набору ответов, как в calculate_for_user и rescore
+        current_answers = get_current_answers(db, current_user.id)
+
+    # Расчёт по данным запроса и сохранение результата
+    health_data = {
+        "systolic_bp": data.systolic_bp,
+        "diastolic_bp": data.diastolic_bp,
+        "pulse": data.pulse,
+        "temperature": data.temperature,
+        "weight": float(data.weight),
+        "height": float(data.height),
+    }
+    result_data = calculate_for_submission(health_data, current_answers, age)
 
     if result_data:
-        age = current_user.age if hasattr(current_user, 'age') else 0
-        save_health_score(db, current_user.id, result_data, age)
-        db.commit()  
+        with span("submit.save_result"):
+            save_health_score(db, current_user.id, result_data, age)
+    with span("submit.commit"):
+        db.commit()
 
+    if result_data:
         return {
             "total_score": round(result_data["total_score"], 2),
             "physiology_score": round(result_data["details"]["physiology_total"], 2),
@@ -220,123 +364,131 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
         "birth_date": current_user.birth_date
     }
 
-models_to_try = [
-    gpt_4, gpt_4o, gpt_3_5_turbo,
-    claude_3_5_sonnet,
-    llama_3_2_11b, mixtral_8x22b,
-]
-
-@router.post("/generate_recommendation")
+@router.post("/generate_recommendation", status_code=202)
 def generate_recommendation(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    last_result = (
-        db.query(Result)
-        .filter(Result.user_id == current_user.id)
-        .order_by(Result.created_at.desc())
-        .first()
-    )
+    last_result = get_last_result(db, current_user.id)
     if not last_result:
         raise HTTPException(status_code=404, detail="Результаты не найдены")
 
-    score = round(last_result.health_score, 2)
-
-    user_answers = (
-        db.query(UserAnswer, Question)
-        .join(Question, UserAnswer.question_id == Question.id)
-        .filter(UserAnswer.user_id == current_user.id)
-        .all()
-    )
-
-    qa_pairs = []
-    for ua, q in user_answers:
-        ans_text = "Да" if ua.answer else "Нет" if ua.answer is not None else "Не знаю"
-        qa_pairs.append({"question": q.question_text, "answer": ans_text})
-
-    phys_data_entry = (
-        db.query(HealthData)
-        .filter(HealthData.user_id == current_user.id)
-        .order_by(HealthData.created_at.desc())
-        .first()
-    )
-    if not phys_data_entry:
+    if not get_last_health_data(db, current_user.id):
         raise HTTPException(status_code=404, detail="Физиологические данные не найдены")
 
-    phys_data = {
-        "systolic": phys_data_entry.systolic_bp,
-        "diastolic": phys_data_entry.diastolic_bp,
-        "pulse": phys_data_entry.pulse,
-        "temperature": phys_data_entry.temperature,
-        "height": phys_data_entry.height,
-        "weight": phys_data_entry.weight
-    }
+    # Генерация выполняется в фоне, клиент опрашивает статус задачи.
+    # Повторный запрос по тому же результату получает ту же задачу,
+    # а если рекомендация уже есть — выполненную задачу с ней
+    job = job_queue.enqueue(db, current_user.id, last_result.id)
 
-    prompt = build_prompt(score, qa_pairs, phys_data, age=phys_data_entry.age)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "recommendation": last_result.recommendation if job.status == JOB_DONE else None,
+    }
 
-    last_exception = None
-    recommendation = None
+@router.post("/generate_recommendation/stream")
+async def stream_recommendation(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Рекомендация отдаётся по частям (Server-Sent Events) по мере генерации
+    last_result = await run_in_threadpool(get_last_result, db, current_user.id)
+    if not last_result:
+        raise HTTPException(status_code=404, detail="Результаты не найдены")
 
-    for model in models_to_try:
+    if last_result.recommendation:
+        events = stored_recommendation_events(last_result.recommendation)
+    else:
         try:
-            print(f"[INFO] Trying model: {model.name}")
-            response = ChatCompletion.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                stream=False,
-            )
+            inputs = await run_in_threadpool(collect_prompt_inputs, db, last_result)
+        except RecommendationDataError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        # Одновременные запросы по тому же результату получают текст одной генерации
+        events = recommendation_events(current_user.id, last_result.id, inputs)
+    # Соединение возвращается в пул до начала потока: генерация может идти долго,
+    # а сохранение рекомендации открывает свою сессию
+    await run_in_threadpool(db.rollback)
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            if response and isinstance(response, str) and response.strip():
-                recommendation = response
-                print(f"[INFO] Model {model.name} succeeded")
-                break
-        except Exception as e:
-            last_exception = e
-            print(f"[ERROR] Ошибка при вызове модели {model.name}: {e}")
+@router.get("/recommendation_jobs/{job_id}")
+def get_recommendation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = db.get(RecommendationJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    if not recommendation or not recommendation.strip():
-        raise HTTPException(
-            status_code=500,
-            detail=f"Не удалось получить рекомендацию. Последняя ошибка: {last_exception}"
-        )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "recommendation": job.result.recommendation if job.status == JOB_DONE else None
+    }
 
-    last_result.recommendation = recommendation
-    db.commit()
-    db.refresh(last_result)
+@router.get("/debug/auth", dependencies=[Depends(require_admin)])
+def get_auth_stats():
+    return auth_stats.snapshot()
 
-    print(f"[INFO] Recommendation saved to DB. Type: {type(recommendation)}")
-    print(f"[INFO] Recommendation content preview: {recommendation[:500]}")
+@router.get("/debug/llm_providers", dependencies=[Depends(require_admin)])
+def get_llm_provider_health():
+    return provider_health.snapshot()
 
-    return {"recommendation": recommendation}
+@router.get("/debug/recommendation_cache", dependencies=[Depends(require_admin)])
+def get_recommendation_cache_stats():
+    return recommendation_cache.get_stats()
 
-# Загрузка фото профиля
-UPLOAD_DIR = "uploads/avatars"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Загрузка фото профиля (каталог создаётся при старте, см. index.lifespan)
 
 @router.post("/users/upload-avatar")
-def upload_avatar(
+async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Проверим тип
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Only image files are allowed")
-
-    # Сохраняем файл
-    filename = f"user_{current_user.id}_{uuid4().hex[:8]}.{file.filename.split('.')[-1]}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-
-    with open(file_path, "wb") as image_file:
-        content = file.file.read()
-        image_file.write(content)
-
-    # Сохраняем путь в базу
-    relative_path = f"/uploads/avatars/{filename}"
-    current_user.avatar_path = relative_path
-    db.commit()
+    # Размер всего тела запроса ограничивается в UploadSizeLimitMiddleware,
+    # размер файла — при потоковой записи
+    async with avatar_processor.user_lock(current_user.id):
+        # Путь текущего аватара перечитывается под блокировкой: его могла сменить
+        # загрузка, завершившаяся, пока этот запрос ждал
+        await run_in_threadpool(db.refresh, current_user)
+        try:
+            thumbnails = await avatar_processor.save_upload(file, current_user.id)
+        except AvatarTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except AvatarError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Новый путь сохраняется в базе, и только после успешного commit удаляются
+        # файлы прежнего аватара; при ошибке удаляются новые файлы. Файлы с тем же
+        # хэшем, что у нового аватара, не удаляются ни в одном из случаев
+        old_urls = avatar_urls(current_user.avatar_path)
+        new_urls = list(thumbnails.values())
+        digest = avatar_digest(new_urls[0])
+        current_user.avatar_path = thumbnails[AVATAR_SIZES[0]]
+        try:
+            await run_in_threadpool(db.commit)
+        except Exception:
+            if avatar_digest(old_urls[0] if old_urls else None) != digest:
+                avatar_processor.discard(new_urls)
+            raise
+        user_cache.invalidate(current_user.id)
+        avatar_processor.discard(url for url in old_urls if avatar_digest(url) != digest)
 
-    return {"message": "Avatar uploaded successfully", "avatar_path": relative_path}
+    return {
+        "message": "Avatar uploaded successfully",
+        "avatar_path": current_user.avatar_path,
+        "thumbnails": {str(size): url for size, url in thumbnails.items()},
+    }
 
 # Редактирование данных профиля
 @router.put("/users/profile")
@@ -356,6 +508,7 @@ async def update_profile(
             raise HTTPException(status_code=400, detail="Неверный формат даты рождения")
 
     db.commit()
+    user_cache.invalidate(current_user.id)
     db.refresh(current_user)
 
     return {
@@ -1,4 +1,3 @@
-from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 
@@ -6,13 +5,7 @@ SECRET_KEY = "552266"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+# Хэширование паролей — services/password_hasher.py (ограниченный пул для bcrypt)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
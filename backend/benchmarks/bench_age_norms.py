@@ -0,0 +1,39 @@
+# Микро-бенчмарк get_age_norms: прежний поиск по словарю против таблицы по возрасту.
+# Запуск: python -m backend.benchmarks.bench_age_norms
+import timeit
+
+from backend.calculations.utils import get_age_norms, validate_positive
+
+
+def legacy_get_age_norms(age):
+    # Реализация до перехода на AGE_NORMS_TABLE: словарь строится при каждом вызове
+    age = validate_positive(age, "age")
+    age_norms = {
+        "bp": {(18, 30): (120, 80), (31, 45): (125, 85), (46, 60): (130, 85), (61, 100): (135, 90)},
+        "pulse": {(18, 30): (60, 80), (31, 45): (62, 82), (46, 60): (64, 84), (61, 100): (66, 86)},
+        "bmi": {(18, 30): (18.5, 24.9), (31, 45): (19, 25.5), (46, 60): (19.5, 26), (61, 100): (20, 27)},
+    }
+
+    def get_norm(category):
+        for age_range, norm in age_norms[category].items():
+            if age_range[0] <= age <= age_range[1]:
+                return norm
+        return None
+
+    return {"bp": get_norm("bp"), "pulse": get_norm("pulse"), "bmi": get_norm("bmi")}
+
+
+def bench(func, ages, number):
+    timer = timeit.Timer(lambda: [func(age) for age in ages])
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / (number * len(ages)) * 1e9
+
+
+if __name__ == "__main__":
+    ages = list(range(18, 101))
+    number = 2000
+    before = bench(legacy_get_age_norms, ages, number)
+    after = bench(get_age_norms, ages, number)
+    print(f"get_age_norms до:    {before:8.1f} нс/вызов")
+    print(f"get_age_norms после: {after:8.1f} нс/вызов")
+    print(f"ускорение: x{before / after:.1f}")
@@ -0,0 +1,46 @@
+# Сравнение calculate_user_answers_score и CompiledAnswerScorer на опросниках разного размера.
+# Запуск: python -m backend.benchmarks.bench_answer_scorer
+import random
+import timeit
+
+from backend.calculations.answer_scorer import CompiledAnswerScorer, pack_answers
+from backend.calculations.utils import calculate_user_answers_score
+from backend.services.question_catalog import CatalogQuestion
+
+
+def make_survey(size, seed=42):
+    rng = random.Random(seed)
+    questions = [
+        CatalogQuestion(i, f"Вопрос {i}?", rng.choice([0.5, 1.0, 1.5, 2.0]), "bench", rng.random() < 0.5)
+        for i in range(1, size + 1)
+    ]
+    answers = [rng.choice([True, False, None]) for _ in questions]
+    return questions, answers
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, repeat=5, number=number)) / number * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'вопросов':>9} {'dict, мкс':>12} {'compiled, мкс':>14} {'packed, мкс':>12}")
+    for size in (10, 30, 100, 300, 1000):
+        questions, answers = make_survey(size)
+        scorer = CompiledAnswerScorer(questions)
+        ids = [q.id for q in questions]
+        packed = pack_answers(answers)
+        user_answers = [
+            {"question_id": q.id, "weight": q.weight, "positive_uns": q.positive_uns, "answer": a}
+            for q, a in zip(questions, answers)
+        ]
+
+        legacy = calculate_user_answers_score(user_answers)
+        assert abs(legacy - scorer.score(ids, answers)) < 1e-9
+
+        number = max(20000 // size, 20)
+        print(
+            f"{size:>9} "
+            f"{bench(lambda: calculate_user_answers_score(user_answers), number):>12.2f} "
+            f"{bench(lambda: scorer.score(ids, answers), number):>14.2f} "
+            f"{bench(lambda: scorer.score(ids, packed), number):>12.2f}"
+        )
@@ -0,0 +1,137 @@
+# Запросы "последняя запись пользователя" до и после составных индексов (миграция 0003):
+# планы запросов и латентность p50/p99 на большой локальной базе.
+# Запуск: python -m backend.benchmarks.bench_latest_row_queries [пользователей] [записей на пользователя]
+# По умолчанию 20000 x 50 — по миллиону строк в results и health_data.
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from backend.benchmarks.common import reset_schema, summarize
+from sqlalchemy import insert, select, text
+from backend.db.connection import engine
+from backend.db.migrate import upgrade_database
+from backend.db.models import HealthData, Question, Result, UserAnswer, User
+
+QUESTIONS = 30
+CHUNK = 50_000
+
+
+def seed(users: int, rows_per_user: int):
+    # Схема до индексов (ревизия 0002) и массовая вставка пачками
+    reset_schema("0002")
+    seed_users_and_questions(users)
+    start = datetime(2024, 1, 1)
+    result_rows, health_rows, answer_rows = [], [], []
+
+    def flush(conn, force=False):
+        for model, rows in ((Result, result_rows), (HealthData, health_rows), (UserAnswer, answer_rows)):
+            if rows and (force or len(rows) >= CHUNK):
+                conn.execute(insert(model), rows)
+                rows.clear()
+
+    with engine.begin() as conn:
+        # Записи разных пользователей перемешаны по времени, как в рабочей базе
+        for step in range(rows_per_user):
+            for user_id in range(1, users + 1):
+                created_at = start + timedelta(minutes=step * users + user_id)
+                result_rows.append({
+                    "user_id": user_id,
+                    "health_score": round(random.uniform(20, 100), 2),
+                    "analysis_text": "-",
+                    "created_at": created_at,
+                })
+                health_rows.append({
+                    "user_id": user_id,
+                    "systolic_bp": 120, "diastolic_bp": 80, "pulse": 70,
+                    "temperature": 36.6, "height": 175, "weight": 75, "age": 40,
+                    "created_at": created_at,
+                })
+                flush(conn)
+        for user_id in range(1, users + 1):
+            for question_id in range(1, QUESTIONS + 1):
+                answer_rows.append({"user_id": user_id, "question_id": question_id, "answer": random.random() < 0.5})
+            flush(conn)
+        flush(conn, force=True)
+
+
+def seed_users_and_questions(users: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Question), [
+            {"id": i, "question_text": f"q{i}", "weight": 1.0, "category": "bench", "positive_uns": True}
+            for i in range(1, QUESTIONS + 1)
+        ])
+        conn.execute(insert(User), [
+            {"id": i, "email": f"user{i}@bench.local", "password": "-", "name": f"User {i}",
+             "gender": "m", "birth_date": date(1970, 1, 1)}
+            for i in range(1, users + 1)
+        ])
+
+
+QUERIES = {
+    # get_last_result / my_last_result / generate_recommendation
+    "latest_result": lambda user_id: select(Result.id).where(Result.user_id == user_id)
+        .order_by(Result.created_at.desc()).limit(1),
+    # get_last_health_data / calculate_for_user
+    "latest_health_data": lambda user_id: select(HealthData.id).where(HealthData.user_id == user_id)
+        .order_by(HealthData.created_at.desc()).limit(1),
+    # первая страница /results
+    "results_page": lambda user_id: select(Result.id, Result.health_score, Result.created_at)
+        .where(Result.user_id == user_id).order_by(Result.created_at.desc(), Result.id.desc()).limit(50),
+    # ответы пользователя для расчёта
+    "user_answers": lambda user_id: select(UserAnswer.question_id, UserAnswer.answer)
+        .where(UserAnswer.user_id == user_id),
+}
+
+
+def explain(conn, statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+        return "\n".join("    " + row[-1] for row in rows)
+    rows = conn.execute(text("EXPLAIN ANALYZE " + sql)).all()
+    return "\n".join("    " + row[0] for row in rows)
+
+
+def measure(users: int, samples: int):
+    report = {}
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, build in QUERIES.items():
+            print(f"  {name}:")
+            print(explain(conn, build(users // 2)))
+            latencies = []
+            for _ in range(samples):
+                statement = build(random.randint(1, users))
+                start = time.perf_counter()
+                conn.execute(statement).all()
+                latencies.append(time.perf_counter() - start)
+            report[name] = summarize(latencies)
+    return report
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    samples = 50
+    random.seed(42)
+
+    start = time.perf_counter()
+    seed(users, rows_per_user)
+    print(f"Заполнено: {users} пользователей, {users * rows_per_user} строк в results и health_data "
+          f"за {time.perf_counter() - start:.1f} с")
+
+    print("\nБез индексов (ревизия 0002):")
+    before = measure(users, samples)
+
+    start = time.perf_counter()
+    upgrade_database()
+    print(f"\nМиграция до head: {time.perf_counter() - start:.1f} с")
+
+    print("\nС индексами (head):")
+    after = measure(users, samples)
+
+    print(f"\n{'запрос':<20} {'p50 до':>10} {'p50 после':>10} {'p99 до':>10} {'p99 после':>10}")
+    for name in QUERIES:
+        print(f"{name:<20} {before[name]['p50_ms']:>10} {after[name]['p50_ms']:>10} "
+              f"{before[name]['p99_ms']:>10} {after[name]['p99_ms']:>10}")
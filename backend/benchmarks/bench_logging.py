@@ -0,0 +1,72 @@
+# Накладные расходы логирования на расчёт балла (calculate_for_submission):
+# логирование выключено (уровень INFO), DEBUG через очередь (logging_config)
+# и DEBUG с синхронной записью в файл из потока запроса.
+# Запуск: python -m backend.benchmarks.bench_logging [число расчётов]
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.common import reset_database, random_payload, summarize
+from backend.calculate_service import calculate_for_submission
+from backend.logging_config import setup_logging, shutdown_logging, TextFormatter
+from backend.services.question_catalog import load_question_catalog
+
+
+def make_requests(count):
+    requests = []
+    for _ in range(count):
+        payload = random_payload()
+        health_data = {key: payload[key] for key in ("systolic_bp", "diastolic_bp", "pulse", "temperature")}
+        health_data.update(weight=float(payload["weight"]), height=float(payload["height"]))
+        answers = [(a["question_id"], a["answer"]) for a in payload["answers"]]
+        requests.append((health_data, answers, 45))
+    return requests
+
+
+def run(requests):
+    latencies = []
+    for health_data, answers, age in requests:
+        start = time.perf_counter()
+        calculate_for_submission(health_data, answers, age)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def configure_sync(level, stream):
+    # Синхронный StreamHandler: форматирование и запись в потоке запроса
+    shutdown_logging()
+    logger = logging.getLogger("backend")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    reset_database()
+    load_question_catalog()
+    requests = make_requests(count)
+
+    log_path = os.path.join(tempfile.gettempdir(), "health_bench.log")
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        modes = {
+            "выключено (INFO)": lambda: setup_logging("INFO", stream=log_file),
+            "DEBUG, очередь": lambda: setup_logging("DEBUG", stream=log_file),
+            "DEBUG, синхронно": lambda: configure_sync("DEBUG", log_file),
+        }
+        run(requests[:1000])  # прогрев
+        results = {}
+        for name, configure in modes.items():
+            configure()
+            results[name] = run(requests)
+            shutdown_logging()
+
+    baseline = results["выключено (INFO)"]["mean_ms"]
+    for name, stats in results.items():
+        overhead_us = (stats["mean_ms"] - baseline) * 1000
+        print(f"{name:<20} {stats}  накладные расходы: {overhead_us:+.1f} мкс/запрос")
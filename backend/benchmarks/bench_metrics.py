@@ -0,0 +1,51 @@
+# Накладные расходы метрик: стоимость одного span() и запись гистограммы,
+# и латентность /submit_health_data через ASGI с метриками и без них.
+# Запуск: python -m backend.benchmarks.bench_metrics [число запросов]
+# Для сравнения с выключенными метриками: METRICS_ENABLED=0 python -m backend.benchmarks.bench_metrics
+import asyncio
+import sys
+import time
+
+from backend.benchmarks.common import reset_database, random_payload, summarize
+import httpx
+from backend.services import metrics
+
+
+def span_cost(iterations: int = 200_000) -> float:
+    # Среднее время пустого with span(...) в микросекундах
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with metrics.span("bench.noop"):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def submit_latencies(count: int):
+    from backend.index import app
+    from backend.services.question_catalog import load_question_catalog
+    from backend.api import create_access_token
+
+    load_question_catalog()
+    transport = httpx.ASGITransport(app=app)
+    token = create_access_token({"sub": "user1@bench.local"})
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(count):
+            payload = random_payload()
+            start = time.perf_counter()
+            response = await client.post("/api/submit_health_data", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    return summarize(latencies)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    reset_database()
+    print(f"METRICS_ENABLED={int(metrics.METRICS_ENABLED)}")
+    print(f"span(): {span_cost():.2f} мкс")
+    print(f"/submit_health_data: {asyncio.run(submit_latencies(count))}")
+    if metrics.METRICS_ENABLED:
+        exposition = metrics.registry.render()
+        print(f"/metrics: {len(exposition.splitlines())} строк")
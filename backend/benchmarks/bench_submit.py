@@ -0,0 +1,89 @@
+# Сравнение прежнего и текущего пути /submit_health_data:
+# число обращений к БД, commit'ов и латентность p50/p99.
+# Запуск: python -m backend.benchmarks.bench_submit [число отправок]
+import sys
+import time
+import io
+import contextlib
+
+from backend.benchmarks.common import reset_database, random_payload, summarize
+from sqlalchemy import event
+from backend.db.connection import engine, SessionLocal
+from backend.db.models import User, HealthData, UserAnswer
+from backend.calculate_service import calculate_for_user
+from backend.services.result_service import save_health_score
+from backend.api import submit_health_data, UserInput
+
+counters = {"statements": 0, "commits": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters["statements"] += 1
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    counters["commits"] += 1
+
+
+def legacy_submit(data: UserInput, current_user: User, db):
+    # Путь до перехода на одну транзакцию: три commit'а и повторное чтение данных
+    health_entry = HealthData(
+        user_id=current_user.id,
+        systolic_bp=data.systolic_bp,
+        diastolic_bp=data.diastolic_bp,
+        pulse=data.pulse,
+        temperature=data.temperature,
+        height=data.height,
+        weight=data.weight,
+        age=0
+    )
+    db.add(health_entry)
+    db.commit()
+
+    # Ответы по одному; при повторной отправке прежний ответ обновляется
+    for answer in data.answers:
+        existing = db.query(UserAnswer).filter_by(user_id=current_user.id, question_id=answer.question_id).first()
+        if existing is not None:
+            existing.answer = answer.answer
+        else:
+            db.add(UserAnswer(user_id=current_user.id, question_id=answer.question_id, answer=answer.answer))
+    db.commit()
+
+    result_data = calculate_for_user(db, current_user.id)
+    if result_data:
+        save_health_score(db, current_user.id, result_data, 0)
+        db.commit()
+
+
+def run(submit, count):
+    reset_database()
+    payloads = [UserInput(**random_payload()) for _ in range(count)]
+    latencies = []
+    counters.update(statements=0, commits=0)
+
+    for i, payload in enumerate(payloads):
+        db = SessionLocal()
+        try:
+            user = db.get(User, i % 10 + 1)
+            start = time.perf_counter()
+            submit(payload, user, db)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+
+    # Загрузка пользователя не входит в измерение
+    stats = summarize(latencies)
+    stats["statements_per_submit"] = round((counters["statements"] - count) / count, 2)
+    stats["commits_per_submit"] = round(counters["commits"] / count, 2)
+    return stats
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with contextlib.redirect_stdout(io.StringIO()):
+        before = run(legacy_submit, count)
+        after = run(submit_health_data, count)
+    print(f"до:    {before}")
+    print(f"после: {after}")
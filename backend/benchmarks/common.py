@@ -0,0 +1,98 @@
+# Общие утилиты бенчмарков: локальная SQLite-база с тестовыми вопросами и пользователями.
+# Скрипты бенчмарков должны импортировать этот модуль до остальных модулей backend:
+# DATABASE_URL (настройка развёртывания) всегда заменяется адресом базы бенчмарков
+# BENCH_DATABASE_URL, поэтому бенчмарк не пересоздаёт таблицы рабочей базы.
+import os
+import random
+import statistics
+import tempfile
+from datetime import date
+
+BENCH_DB_PATH = os.path.join(tempfile.gettempdir(), "health_bench.db")
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DB_PATH}")
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+from sqlalchemy import make_url, text
+from backend.db.connection import engine, SessionLocal
+from backend.db.migrate import upgrade_database
+from backend.db.models import Base, Question, User
+
+
+def reset_schema(revision: str = "head"):
+    # Пересоздаёт схему миграциями до указанной ревизии. Только в базе бенчмарков:
+    # если backend.db импортирован раньше этого модуля, engine смотрит на DATABASE_URL
+    if engine.url != make_url(BENCH_DATABASE_URL):
+        raise RuntimeError(
+            f"Схема пересоздаётся только в базе бенчмарков ({BENCH_DATABASE_URL}), "
+            f"а не в {engine.url.render_as_string(hide_password=True)}"
+        )
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    upgrade_database(revision)
+
+
+def reset_database(questions: int = 30, users: int = 10, seed: int = 42):
+    # Пересоздаёт схему и заполняет вопросы и пользователей
+    random.seed(seed)
+    reset_schema()
+
+    db = SessionLocal()
+    try:
+        db.add_all(
+            Question(
+                id=i,
+                question_text=f"Тестовый вопрос {i}?",
+                weight=random.choice([0.5, 1.0, 1.5, 2.0]),
+                category="bench",
+                positive_uns=random.random() < 0.5,
+            )
+            for i in range(1, questions + 1)
+        )
+        db.add_all(
+            User(
+                id=i,
+                email=f"user{i}@bench.local",
+                password="-",
+                name=f"User {i}",
+                gender="m",
+                birth_date=date(1960 + i % 40, 1, 1),
+            )
+            for i in range(1, users + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def random_payload(questions: int = 30):
+    return {
+        "systolic_bp": random.randint(100, 160),
+        "diastolic_bp": random.randint(60, 100),
+        "pulse": random.randint(50, 110),
+        "temperature": round(random.uniform(35.8, 37.6), 1),
+        "height": random.randint(150, 200),
+        "weight": random.randint(50, 120),
+        "answers": [
+            {"question_id": i, "answer": random.choice([True, False, None])}
+            for i in range(1, questions + 1)
+        ],
+    }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples):
+    # Латентности в миллисекундах
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
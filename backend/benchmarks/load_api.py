@@ -0,0 +1,131 @@
+# Сквозной нагрузочный тест API на локальной SQLite и заглушке LLM.
+# Виртуальные пользователи одновременно проходят сценарий: вход, отправка данных,
+# /results, /my_last_result, /generate_recommendation с ожиданием готовности задачи.
+# Отчёт — пропускная способность и p50/p95/p99 по каждому маршруту.
+# Запуск: python -m backend.benchmarks.load_api [пользователей] [итераций на пользователя]
+import os
+
+# Дешёвый bcrypt, чтобы вход не занимал весь тест, и без ограничения частоты
+# (его проверяет load_rate_limit); задаётся до импорта backend
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+import asyncio
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+from backend.benchmarks.common import reset_database, random_payload, summarize
+import httpx
+from sqlalchemy import update
+from backend.db.connection import SessionLocal
+from backend.db.models import User
+from backend.services.llm import FakeLLMProvider, set_llm_provider
+from backend.services.password_hasher import pwd_context
+from backend.index import app
+
+PASSWORD = "bench-password"
+LLM_LATENCY = 0.05
+JOB_POLL_INTERVAL = 0.01
+
+
+def seed(users: int, seed_value: int = 42):
+    reset_database(users=users, seed=seed_value)
+    db = SessionLocal()
+    try:
+        db.execute(update(User).values(password=pwd_context.hash(PASSWORD)))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def timed(client, samples, route, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    samples[route].append(time.perf_counter() - start)
+    return response
+
+
+async def virtual_user(client, user_id: int, iterations: int, samples, statuses, rng):
+    # При перегрузке пула bcrypt вход отвечает 503 — повторяем, как клиент по Retry-After
+    while True:
+        response = await timed(client, samples, "POST /auth/login", "POST", "/api/auth/login",
+                               data={"username": f"user{user_id}@bench.local", "password": PASSWORD})
+        if response.status_code != 503:
+            break
+        statuses["login 503"] += 1
+        await asyncio.sleep(rng.uniform(0.01, 0.05))
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(iterations):
+        for route, method, url, kwargs in (
+            ("POST /submit_health_data", "POST", "/api/submit_health_data", {"json": random_payload()}),
+            ("GET /results", "GET", "/api/results", {}),
+            ("GET /my_last_result", "GET", "/api/my_last_result", {}),
+        ):
+            response = await timed(client, samples, route, method, url, headers=headers, **kwargs)
+            if response.status_code >= 400:
+                statuses["errors"] += 1
+
+        start = time.perf_counter()
+        response = await timed(client, samples, "POST /generate_recommendation", "POST",
+                               "/api/generate_recommendation", headers=headers)
+        job_id = response.json().get("job_id")
+        # Время до готовой рекомендации (очередь + LLM), опрашивая статус задачи
+        while job_id:
+            response = await client.get(f"/api/recommendation_jobs/{job_id}", headers=headers)
+            status = response.json().get("status")
+            if status in ("done", "failed"):
+                statuses["errors"] += status == "failed"
+                break
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+        samples["recommendation ready"].append(time.perf_counter() - start)
+        await asyncio.sleep(rng.uniform(0, 0.005))
+
+
+async def run_load(users: int = 20, iterations: int = 5, seed_value: int = 42) -> dict:
+    seed(users, seed_value)
+    set_llm_provider(FakeLLMProvider(latency=LLM_LATENCY))
+    rng = random.Random(seed_value)
+    random.seed(seed_value)
+    samples = defaultdict(list)
+    statuses = Counter()
+
+    transport = httpx.ASGITransport(app=app)
+    # lifespan: миграции, каталог вопросов, воркеры очереди рекомендаций
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                virtual_user(client, user_id, iterations, samples, statuses, rng) for user_id in range(1, users + 1)
+            ))
+            elapsed = time.perf_counter() - start
+
+    requests = sum(len(values) for route, values in samples.items() if route != "recommendation ready")
+    routes = {route: summarize(values) for route, values in sorted(samples.items())}
+    return {
+        "users": users,
+        "iterations": iterations,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "errors": statuses["errors"],
+        "rejected_logins": statuses["login 503"],
+        "routes": routes,
+    }
+
+
+def print_report(report: dict):
+    print(f"пользователей: {report['users']}, итераций: {report['iterations']}, "
+          f"время: {report['elapsed_s']} с, {report['throughput_rps']} запросов/с, ошибок: {report['errors']}, "
+          f"повторов входа после 503: {report['rejected_logins']}")
+    print(f"{'маршрут':<32} {'n':>6} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<32} {stats['count']:>6} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print_report(asyncio.run(run_load(users, iterations)))
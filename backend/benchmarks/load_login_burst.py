@@ -0,0 +1,67 @@
+# Нагрузочный тест: всплеск логинов и латентность остальных эндпоинтов.
+# Пока идут сотни одновременных /auth/login, фоновые запросы к /api/
+# должны отвечать так же быстро, как без нагрузки, а лишние логины — получать 503.
+# Запуск: python -m backend.benchmarks.load_login_burst [число логинов]
+import asyncio
+import sys
+import time
+from collections import Counter
+
+from backend.benchmarks.common import reset_database, summarize
+import httpx
+from backend.db.connection import SessionLocal
+from backend.db.models import User
+from backend.services.password_hasher import pwd_context
+from backend.index import app
+
+PASSWORD = "bench-password"
+
+
+async def probe(client, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+
+
+async def login(client, statuses):
+    response = await client.post("/api/auth/login", data={"username": "user1@bench.local", "password": PASSWORD})
+    statuses[response.status_code] += 1
+
+
+async def measure(client, logins):
+    stop = asyncio.Event()
+    samples = []
+    statuses = Counter()
+    probe_task = asyncio.create_task(probe(client, stop, samples))
+    start = time.perf_counter()
+    if logins:
+        await asyncio.gather(*(login(client, statuses) for _ in range(logins)))
+    else:
+        await asyncio.sleep(1)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return summarize(samples), dict(statuses), elapsed
+
+
+async def main(logins):
+    reset_database(users=1)
+    db = SessionLocal()
+    db.get(User, 1).password = pwd_context.hash(PASSWORD)
+    db.commit()
+    db.close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle, _, _ = await measure(client, 0)
+        burst, statuses, elapsed = await measure(client, logins)
+
+    print(f"/api/ без нагрузки:     {idle}")
+    print(f"/api/ во время логинов: {burst}")
+    print(f"логины: {logins} за {elapsed:.2f} с, статусы {statuses}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
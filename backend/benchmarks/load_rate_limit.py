@@ -0,0 +1,134 @@
+# Нагрузочная проверка ограничения частоты (services/rate_limit.py).
+# Пользователи одновременно шлют пачки запросов на /submit_health_data и
+# /generate_recommendation. Проверяется, что ни один пользователь и все вместе
+# не получили больше, чем позволяют bucket'ы (ёмкость + восполнение за время
+# теста), что отказы приходят как 429 с Retry-After и что после паузы
+# Retry-After запрос снова проходит.
+# Запуск: python -m backend.benchmarks.load_rate_limit [пользователей] [запросов в пачке]
+# С RATE_LIMIT_BACKEND=redis проверяется общий backend.
+import json
+import os
+
+# Небольшие лимиты, чтобы исчерпать их за секунды; задаются до импорта backend
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RATE_LIMIT_ENABLED"] = "1"
+os.environ["RATE_LIMITS"] = json.dumps({
+    "submit": {"user": "5/5", "global": "30/5"},
+    "llm": {"user": "2/10", "global": "8/10"},
+})
+
+import asyncio
+import sys
+import time
+from collections import Counter
+
+from backend.benchmarks.common import reset_database, random_payload, summarize
+import httpx
+from sqlalchemy import update
+from backend.db.connection import SessionLocal
+from backend.db.models import User
+from backend.services.llm import FakeLLMProvider, set_llm_provider
+from backend.services.password_hasher import pwd_context
+from backend.services.rate_limit import load_rate_limits
+from backend.index import app
+
+PASSWORD = "bench-password"
+LIMITS = load_rate_limits()
+
+
+def seed(users: int):
+    reset_database(users=users)
+    db = SessionLocal()
+    try:
+        db.execute(update(User).values(password=pwd_context.hash(PASSWORD)))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def login(client, user_id: int) -> dict:
+    response = await client.post("/api/auth/login", data={"username": f"user{user_id}@bench.local", "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def send(client, method, url, headers, results, user_id, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, headers=headers, **kwargs)
+    results.append((user_id, response.status_code, response.headers.get("Retry-After"), time.perf_counter() - start))
+
+
+async def burst(client, tokens, rule, method, url, per_user, payload=None):
+    # Все пользователи одновременно отправляют по per_user запросов
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        send(client, method, url, headers, results, user_id, **({"json": payload()} if payload else {}))
+        for user_id, headers in tokens.items()
+        for _ in range(per_user)
+    ))
+    elapsed = time.perf_counter() - start
+    return check(rule, results, elapsed)
+
+
+def check(rule, results, elapsed):
+    limits = LIMITS[rule]
+    passed = Counter(user_id for user_id, status, _, _ in results if status != 429)
+    rejected = [result for result in results if result[1] == 429]
+    # Больше ёмкости bucket'а может пройти только за счёт восполнения во время теста
+    user_bound = limits["user"].capacity + limits["user"].rate * elapsed
+    global_bound = limits["global"].capacity + limits["global"].rate * elapsed
+    problems = []
+    if max(passed.values(), default=0) > user_bound:
+        problems.append(f"пользователь получил {max(passed.values())} > {user_bound:.1f}")
+    if sum(passed.values()) > global_bound:
+        problems.append(f"всего прошло {sum(passed.values())} > {global_bound:.1f}")
+    if any(retry_after is None for _, _, retry_after, _ in rejected):
+        problems.append("ответ 429 без Retry-After")
+    statuses = Counter(status for _, status, _, _ in results)
+
+    print(f"\n{rule}: {len(results)} запросов за {elapsed:.2f} с, статусы {dict(sorted(statuses.items()))}")
+    print(f"  прошло на пользователя: до {max(passed.values(), default=0)} (предел {user_bound:.1f}), "
+          f"всего {sum(passed.values())} (предел {global_bound:.1f})")
+    if rejected:
+        print(f"  429: латентность {summarize([r[3] for r in rejected])['p50_ms']} мс (p50), "
+              f"Retry-After {min(int(r[2]) for r in rejected)}..{max(int(r[2]) for r in rejected)} с")
+    for problem in problems:
+        print(f"  НАРУШЕНИЕ: {problem}")
+    return problems
+
+
+async def retry_after_recovers(client, headers):
+    # Исчерпать bucket пользователя, выждать Retry-After и повторить
+    while True:
+        response = await client.post("/api/submit_health_data", json=random_payload(), headers=headers)
+        if response.status_code == 429:
+            break
+    retry_after = int(response.headers["Retry-After"])
+    await asyncio.sleep(retry_after)
+    response = await client.post("/api/submit_health_data", json=random_payload(), headers=headers)
+    print(f"\nповтор через Retry-After={retry_after} с: статус {response.status_code}")
+    return [] if response.status_code == 200 else [f"после Retry-After статус {response.status_code}"]
+
+
+async def main(users: int, per_user: int) -> int:
+    seed(users + 1)
+    set_llm_provider(FakeLLMProvider(latency=0.05))
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            tokens = {user_id: await login(client, user_id) for user_id in range(1, users + 1)}
+            problems = await burst(client, tokens, "submit", "POST", "/api/submit_health_data", per_user, random_payload)
+            problems += await burst(client, tokens, "llm", "POST", "/api/generate_recommendation", per_user)
+            # Отдельный пользователь: общий bucket submit к этому моменту мог восполниться
+            await asyncio.sleep(LIMITS["submit"]["global"].capacity / LIMITS["submit"]["global"].rate)
+            problems += await retry_after_recovers(client, await login(client, users + 1))
+
+    print("\nлимиты соблюдены" if not problems else f"\nнарушений: {len(problems)}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sys.exit(asyncio.run(main(users, per_user)))
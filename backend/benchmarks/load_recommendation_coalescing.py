@@ -0,0 +1,144 @@
+# Проверка объединения одинаковых запросов рекомендации (services/single_flight.py).
+# Медленная заглушка LLM и много одновременных вызовов по одному результату:
+#   1. POST /generate_recommendation — все получают одну задачу, модели вызываются
+#      как для одного запроса;
+#   2. повтор после готовности — рекомендация возвращается сразу, без моделей;
+#   3. POST /generate_recommendation/stream — все потоки получают текст одной генерации;
+#   4. задача и потоки вперемешку — тоже одна генерация.
+# Число обращений к моделям сравнивается с одиночным запросом по новому результату.
+# Запуск: python -m backend.benchmarks.load_recommendation_coalescing [одновременных вызовов]
+import os
+
+# Дешёвый bcrypt и без ограничения частоты; задаётся до импорта backend
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+import asyncio
+import json
+import sys
+import time
+
+from backend.benchmarks.common import reset_database, random_payload
+import httpx
+from sqlalchemy import update
+from backend.db.connection import SessionLocal
+from backend.db.models import User
+from backend.services.llm import FakeLLMProvider, set_llm_provider
+from backend.services.password_hasher import pwd_context
+from backend.index import app
+
+PASSWORD = "bench-password"
+LLM_LATENCY = 0.5
+JOB_POLL_INTERVAL = 0.02
+
+
+def seed():
+    reset_database(users=1)
+    db = SessionLocal()
+    try:
+        db.execute(update(User).values(password=pwd_context.hash(PASSWORD)))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def new_result(client, headers):
+    # Новый результат с другими данными, чтобы не сработал кэш рекомендаций
+    response = await client.post("/api/submit_health_data", json=random_payload(), headers=headers)
+    response.raise_for_status()
+
+
+async def generate(client, headers):
+    response = await client.post("/api/generate_recommendation", headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def wait_job(client, headers, job_id):
+    while True:
+        job = (await client.get(f"/api/recommendation_jobs/{job_id}", headers=headers)).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def stream(client, headers):
+    # Итоговый текст из события done
+    async with client.stream("POST", "/api/generate_recommendation/stream", headers=headers) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event in ("done", "error"):
+                data = json.loads(line[len("data: "):])
+                return data.get("recommendation") if event == "done" else "error: " + data["detail"]
+
+
+def report(name, provider, calls_before, expected_calls, started, outcomes, problems):
+    calls = len(provider.calls) - calls_before
+    distinct = set(outcomes)
+    print(f"{name:<44} вызовов моделей {calls:>3} (одиночный запрос: {expected_calls}), "
+          f"разных ответов {len(distinct)}, {time.perf_counter() - started:.2f} с")
+    if calls > expected_calls:
+        problems.append(f"{name}: {calls} вызовов моделей вместо {expected_calls}")
+    if len(distinct) != 1:
+        problems.append(f"{name}: разные ответы {sorted(map(str, distinct))}")
+
+
+async def main(callers: int) -> int:
+    seed()
+    provider = FakeLLMProvider(latency=LLM_LATENCY)
+    set_llm_provider(provider)
+    problems = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            response = await client.post("/api/auth/login", data={"username": "user1@bench.local", "password": PASSWORD})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            # Одиночный запрос — сколько обращений к моделям занимает одна генерация
+            await new_result(client, headers)
+            calls_before = len(provider.calls)
+            await wait_job(client, headers, (await generate(client, headers))["job_id"])
+            single_calls = len(provider.calls) - calls_before
+            print(f"одновременных вызовов: {callers}, задержка модели {LLM_LATENCY} с\n")
+
+            # 1. Одновременные POST /generate_recommendation
+            await new_result(client, headers)
+            calls_before, started = len(provider.calls), time.perf_counter()
+            jobs = await asyncio.gather(*(generate(client, headers) for _ in range(callers)))
+            finished = await asyncio.gather(*(wait_job(client, headers, job["job_id"]) for job in jobs))
+            report("generate_recommendation", provider, calls_before, single_calls, started,
+                   [job["job_id"] for job in jobs], problems)
+            if any(job["status"] != "done" for job in finished):
+                problems.append("generate_recommendation: задача не выполнена")
+
+            # 2. Повтор, когда рекомендация уже есть
+            calls_before, started = len(provider.calls), time.perf_counter()
+            jobs = await asyncio.gather(*(generate(client, headers) for _ in range(callers)))
+            report("повтор после готовности", provider, calls_before, 0, started,
+                   [(job["status"], job["recommendation"]) for job in jobs], problems)
+
+            # 3. Одновременные потоки SSE
+            await new_result(client, headers)
+            calls_before, started = len(provider.calls), time.perf_counter()
+            texts = await asyncio.gather(*(stream(client, headers) for _ in range(callers)))
+            report("generate_recommendation/stream", provider, calls_before, single_calls, started, texts, problems)
+
+            # 4. Задача и потоки по одному результату
+            await new_result(client, headers)
+            calls_before, started = len(provider.calls), time.perf_counter()
+            job = await generate(client, headers)
+            texts = await asyncio.gather(*(stream(client, headers) for _ in range(callers)))
+            finished = await wait_job(client, headers, job["job_id"])
+            report("задача и потоки вместе", provider, calls_before, single_calls, started,
+                   texts + [finished["recommendation"]], problems)
+
+    for problem in problems:
+        print(f"НАРУШЕНИЕ: {problem}")
+    print("\nзапросы объединены" if not problems else f"\nнарушений: {len(problems)}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)))
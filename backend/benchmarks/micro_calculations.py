@@ -0,0 +1,79 @@
+# Микро-бенчмарки расчётов: функции calculations/utils.py и build_prompt.
+# Для каждой функции — лучшее из нескольких повторов, нс на вызов.
+# Запуск: python -m backend.benchmarks.micro_calculations
+import random
+import timeit
+
+import numpy as np
+
+from backend.calculations.interpretation import analysis_text, interpretation_code, interpretation_codes
+from backend.calculations.prompt_builder import build_prompt
+from backend.calculations.utils import (
+    calculate_physiological_score,
+    calculate_user_answers_score,
+    get_age_norms,
+    get_interpretation,
+)
+
+REPEAT = 5
+
+
+def _cases(seed: int = 42, size: int = 200):
+    rng = random.Random(seed)
+    health = [
+        {
+            "systolic_bp": rng.randint(100, 160),
+            "diastolic_bp": rng.randint(60, 100),
+            "pulse": rng.randint(50, 110),
+            "temperature": round(rng.uniform(35.8, 37.6), 1),
+            "height": float(rng.randint(150, 200)),
+            "weight": float(rng.randint(50, 120)),
+        }
+        for _ in range(size)
+    ]
+    ages = [rng.randint(18, 90) for _ in range(size)]
+    answers = [
+        [
+            {"answer": rng.choice([True, False, None]), "weight": rng.choice([0.5, 1.0, 2.0]), "positive_uns": rng.random() < 0.5}
+            for _ in range(30)
+        ]
+        for _ in range(size)
+    ]
+    scores = [rng.uniform(0, 100) for _ in range(size)]
+    qa_pairs = [
+        {"question": f"Тестовый вопрос {i}?", "answer": rng.choice(["Да", "Нет", "Не знаю"])}
+        for i in range(30)
+    ]
+    phys = {"systolic": 125, "diastolic": 82, "pulse": 72, "temperature": 36.6, "height": 178, "weight": 76}
+    return health, ages, answers, scores, qa_pairs, phys
+
+
+def _bench(func, number: int) -> float:
+    best = min(timeit.repeat(func, repeat=REPEAT, number=number))
+    return best / number * 1e9
+
+
+def run() -> dict:
+    health, ages, answers, scores, qa_pairs, phys = _cases()
+    size = len(ages)
+    score_array, age_array = np.array(scores), np.array(ages)
+    codes = [interpretation_code(s, a) for s, a in zip(scores, ages)]
+    benchmarks = {
+        "get_age_norms": (lambda: [get_age_norms(age) for age in ages], size),
+        "calculate_physiological_score": (lambda: [calculate_physiological_score(h, a) for h, a in zip(health, ages)], size),
+        "calculate_user_answers_score": (lambda: [calculate_user_answers_score(a) for a in answers], size),
+        "get_interpretation": (lambda: [get_interpretation(s, a) for s, a in zip(scores, ages)], size),
+        "interpretation_codes (batch)": (lambda: interpretation_codes(score_array, age_array), size),
+        "analysis_text": (lambda: [analysis_text(s, c) for s, c in zip(scores, codes)], size),
+        "build_prompt": (lambda: build_prompt(72.5, qa_pairs, phys, age=45), 1),
+    }
+    results = {}
+    for name, (func, calls) in benchmarks.items():
+        number = max(1, 2000 // calls)
+        results[name] = {"ns_per_call": round(_bench(func, number) / calls, 1)}
+    return results
+
+
+if __name__ == "__main__":
+    for name, stats in run().items():
+        print(f"{name:<32} {stats['ns_per_call']:>10.1f} нс/вызов")
@@ -0,0 +1,115 @@
+# Набор бенчмарков с сохранёнными базовыми значениями: микро-бенчмарки расчётов
+# (micro_calculations) и сквозная нагрузка на API (load_api). Результат сравнивается
+# с базовым файлом, ухудшение больше допуска считается регрессией (код выхода 1).
+#
+# Запуск:
+#   python -m backend.benchmarks.suite                   — прогон и сравнение с базой
+#   python -m backend.benchmarks.suite --save-baseline   — прогон и запись новой базы
+#   python -m backend.benchmarks.suite --tolerance 0.5 --output /tmp/bench.json
+#
+# Базовые значения зависят от машины: сравнивать имеет смысл прогоны на одном железе.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+from backend.benchmarks import load_api, micro_calculations
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "baseline.json")
+DEFAULT_TOLERANCE = 0.3
+
+
+def run_suite(users: int, iterations: int) -> dict:
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "micro": micro_calculations.run(),
+        "load": asyncio.run(load_api.run_load(users, iterations)),
+    }
+
+
+def flatten(report: dict) -> dict:
+    # Метрика -> (значение, больше_лучше)
+    metrics = {}
+    for name, stats in report["micro"].items():
+        metrics[f"micro.{name}.ns_per_call"] = (stats["ns_per_call"], False)
+    load = report["load"]
+    metrics["load.throughput_rps"] = (load["throughput_rps"], True)
+    for route, stats in load["routes"].items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"load.{route}.{key}"] = (stats[key], False)
+    return metrics
+
+
+def compare(current: dict, baseline: dict, tolerance: float):
+    # Строки отчёта (метрика, база, текущее, изменение, регрессия)
+    current_metrics = flatten(current)
+    baseline_metrics = flatten(baseline)
+    rows = []
+    for name, (value, higher_is_better) in current_metrics.items():
+        if name not in baseline_metrics:
+            rows.append((name, None, value, None, False))
+            continue
+        base = baseline_metrics[name][0]
+        change = (value - base) / base if base else 0.0
+        worse = -change if higher_is_better else change
+        rows.append((name, base, value, change, worse > tolerance))
+    return rows
+
+
+def print_comparison(rows, tolerance: float):
+    print(f"\n{'метрика':<52} {'база':>10} {'сейчас':>10} {'изм.':>8}")
+    for name, base, value, change, regression in rows:
+        base_text = "-" if base is None else f"{base:.3f}"
+        change_text = "нов." if change is None else f"{change:+.0%}"
+        flag = "  РЕГРЕССИЯ" if regression else ""
+        print(f"{name:<52} {base_text:>10} {value:>10.3f} {change_text:>8}{flag}")
+    regressions = sum(row[4] for row in rows)
+    print(f"\nРегрессий (ухудшение более {tolerance:.0%}): {regressions}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки расчётов и API с базовыми значениями")
+    parser.add_argument("--users", type=int, default=20, help="виртуальных пользователей в load_api")
+    parser.add_argument("--iterations", type=int, default=5, help="итераций сценария на пользователя")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="файл базовых значений")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат как новую базу")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимое относительное ухудшение (0.3 = 30%%)")
+    parser.add_argument("--output", help="записать результат прогона в JSON")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.users, args.iterations)
+    load_api.print_report(report["load"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nБазовые значения записаны в {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nБазовый файл {args.baseline} не найден, запустите с --save-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = print_comparison(compare(report, baseline, args.tolerance), args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,35 @@
-﻿import time
-from backend.db.connection import get_db
+﻿from sqlalchemy.orm import Session
 from backend.calculations.score_calculator import calculate_health_score
-from backend.db.models import User, HealthData, UserAnswer, Question
+from backend.db.models import User, HealthData
+from backend.services.answer_service import get_current_answers
+from backend.services.question_catalog import get_question_catalog
+from backend.services.metrics import span
 from datetime import datetime
-import traceback
+import logging
 
-start_time = time.time()
+logger = logging.getLogger(__name__)
 
-conn_gen = get_db()
-session = next(conn_gen) 
-print(f"Подключение заняло {time.time() - start_time:.4f} сек")
+def get_age(birth_date):
+    return (datetime.now().date() - birth_date).days // 365
 
-def calculate_for_user(user_id: int):
+
+def calculate_for_submission(health_data: dict, answers: list, age: int):
+    # Расчёт по физиологическим данным из запроса, без повторного чтения HealthData.
+    # answers — текущий набор ответов пользователя парами (question_id, answer),
+    # тот же, что читают calculate_for_user и rescore (см. get_current_answers)
+    try:
+        with span("score.calculate"):
+            scorer = get_question_catalog().scorer
+            answers_score = scorer.score([question_id for question_id, _ in answers], [answer for _, answer in answers])
+            return calculate_health_score(dict(health_data), None, age, answers_score=answers_score)
+
+    except Exception:
+        logger.exception("Ошибка расчёта по данным отправки")
+        return None
+
+
+def calculate_for_user(session: Session, user_id: int):
+    # Расчёт использует сессию вызывающего кода (из пула, см. get_db)
     if user_id is None:
         raise ValueError("user_id не может быть None. Авторизация обязательна.")
     
@@ -19,17 +37,15 @@ def calculate_for_user(user_id: int):
         # Получение возраста пользователя
         user = session.query(User).filter(User.id == user_id).first()
         if not user:
-            print("Ошибка: Пользователь не найден.")
+            logger.warning("Расчёт: пользователь не найден", extra={"user_id": user_id})
             return None
 
-        birth_date = user.birth_date
-        age = (datetime.now().date() - birth_date).days // 365 
-        print(f"DEBUG: возраст = {age}")
+        age = get_age(user.birth_date)
 
         # Получение данных о здоровье пользователя
         health_data = session.query(HealthData).filter(HealthData.user_id == user_id).order_by(HealthData.created_at.desc()).first()
         if not health_data:
-            print("Ошибка: Данные о здоровье отсутствуют.")
+            logger.warning("Расчёт: данные о здоровье отсутствуют", extra={"user_id": user_id})
             return None
 
         health_data_dict = {
@@ -41,33 +57,22 @@ def calculate_for_user(user_id: int):
             "height": float(health_data.height),
         }
         
-        # Получение ответов пользователя
-        user_answers_raw = session.query(UserAnswer, Question.weight, Question.positive_uns).join(Question).filter(UserAnswer.user_id == user_id).all()
-        user_answers = [
-            {"question_id": row[0].question_id,
-            "weight": float(row[1]),
-            "positive_uns": bool(row[2]),
-            "answer": bool(row[0].answer) if row[0].answer is not None else False
-            }
-            for row in user_answers_raw
-        ]
+        # Текущие ответы пользователя (по одному на вопрос), "Не знаю" не учитывается
+        # Веса вопросов берутся из каталога, без join с таблицей questions
+        user_answers = get_current_answers(session, user_id)
+        answers_score = get_question_catalog().scorer.score(
+            [question_id for question_id, _ in user_answers],
+            [answer for _, answer in user_answers],
+        )
 
         # Расчёт итогового балла
-        print("DEBUG: Запуск calculate_health_score()")
-        score_result = calculate_health_score(health_data_dict, user_answers, age)
-        
-        print(f"DEBUG: Интерпретация = {score_result.get('interpretation')}")
-
-        # Возврат результата
-        session.commit()
-        print(f"Расчёт завершён. Баллы: {score_result['total_score']:.2f}")
+        with span("score.calculate"):
+            score_result = calculate_health_score(health_data_dict, None, age, answers_score=answers_score)
+        logger.debug("Расчёт завершён: %s баллов", score_result["total_score"], extra={"user_id": user_id})
 
         return score_result
 
-    except Exception as e:
-        print(f"Ошибка: {e}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Ошибка расчёта", extra={"user_id": user_id})
         session.rollback()
         return None
-    finally:
-        session.close()
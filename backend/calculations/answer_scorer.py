@@ -0,0 +1,55 @@
+import numpy as np
+
+# Скомпилированный расчёт баллов за опросник. Веса и "положительные" ответы
+# вопросов хранятся в массивах, индексируемых id вопроса, а ответы
+# упаковываются в вектор int8: 1 — да, 0 — нет, -1 — "Не знаю".
+# Балл — маскированное скалярное произведение, как в calculate_user_answers_score.
+
+NO_ANSWER = -1
+
+
+def pack_answers(answers) -> np.ndarray:
+    # [True, False, None] -> array([1, 0, -1], dtype=int8)
+    return np.fromiter(
+        (NO_ANSWER if answer is None else int(answer) for answer in answers),
+        dtype=np.int8,
+        count=len(answers),
+    )
+
+
+class CompiledAnswerScorer:
+    def __init__(self, questions):
+        # questions — элементы с полями id, weight, positive_uns
+        size = max((q.id for q in questions), default=0) + 1
+        self.weights = np.zeros(size, dtype=float)
+        self.polarity = np.zeros(size, dtype=np.int8)
+        self.known = np.zeros(size, dtype=bool)
+        for q in questions:
+            self.weights[q.id] = q.weight
+            self.polarity[q.id] = int(q.positive_uns)
+            self.known[q.id] = True
+
+    def score(self, question_ids, answers) -> float:
+        # Балл по списку id вопросов и ответов (True/False/None), нормализованный до 50
+        ids = np.asarray(question_ids, dtype=np.intp)
+        packed = answers if isinstance(answers, np.ndarray) else pack_answers(answers)
+
+        in_range = (ids >= 0) & (ids < self.weights.shape[0])
+        ids = np.where(in_range, ids, 0)
+        answered = in_range & self.known[ids] & (packed != NO_ANSWER)
+
+        weights = self.weights[ids]
+        total_weight = weights @ answered
+        if total_weight <= 0:
+            return 0
+        raw_score = weights @ (answered & (packed == self.polarity[ids]))
+        return float(raw_score / total_weight * 50)
+
+    def score_matrix(self, answers: np.ndarray) -> np.ndarray:
+        # Баллы для матрицы ответов (пользователи x id вопроса) в упакованном виде
+        answered = (answers != NO_ANSWER) & self.known
+        matched = answered & (answers == self.polarity)
+        total_weight = answered @ self.weights
+        raw_score = matched @ self.weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total_weight > 0, raw_score / total_weight * 50, 0.0)
@@ -0,0 +1,121 @@
+# Векторизованный расчёт баллов для множества пользователей сразу.
+# Логика повторяет calculate_health_score / calculate_physiological_score,
+# но работает со столбцами (numpy-массивами) вместо словарей.
+import numpy as np
+
+from backend.calculations.interpretation import interpretation_codes
+from backend.calculations.utils import AGE_NORMS_TABLE, MIN_NORM_AGE, MAX_NORM_AGE
+
+
+# Нормы из общей таблицы AGE_NORMS_TABLE в виде массивов (возраст x (нижняя, верхняя))
+def _norms_array(category):
+    return np.array([norms[category] for norms in AGE_NORMS_TABLE], dtype=float)
+
+
+BP_NORMS = _norms_array("bp")
+PULSE_NORMS = _norms_array("pulse")
+BMI_NORMS = _norms_array("bmi")
+
+
+def _as_array(values, name, dtype=float):
+    arr = np.asarray(values, dtype=dtype)
+    if arr.ndim != 1:
+        raise ValueError(f"{name} должно быть одномерным массивом")
+    return arr
+
+
+def _validate_positive(arr, name):
+    if np.isnan(arr).any():
+        raise ValueError(f"{name} не может быть None")
+    if (arr <= 0).any():
+        raise ValueError(f"{name} должно быть положительным числом")
+
+
+def _score_from_norm(value, lower, upper, max_score=10):
+    # Аналог score_from_norm: 10 в пределах нормы, иначе минус 2 за единицу отклонения, но не меньше 5
+    below = np.maximum(max_score - (lower - value) * 2, 5)
+    above = np.maximum(max_score - (value - upper) * 2, 5)
+    return np.where(value < lower, below, np.where(value > upper, above, max_score))
+
+
+def calculate_physiological_scores_batch(systolic, diastolic, pulse, temperature, height, weight, age):
+    systolic = _as_array(systolic, "systolic")
+    diastolic = _as_array(diastolic, "diastolic")
+    pulse = _as_array(pulse, "pulse")
+    temperature = _as_array(temperature, "temperature")
+    height = _as_array(height, "height")
+    weight = _as_array(weight, "weight")
+    age = _as_array(age, "age")
+
+    for arr, name in ((weight, "weight"), (height, "height"), (temperature, "temperature"), (age, "age")):
+        _validate_positive(arr, name)
+
+    # Индекс в таблице норм, как в norm_age_index
+    age_idx = np.clip(age.astype(int), MIN_NORM_AGE, MAX_NORM_AGE)
+
+    bp_systolic, bp_diastolic = BP_NORMS[age_idx].T
+    pulse_low, pulse_high = PULSE_NORMS[age_idx].T
+    bmi_low, bmi_high = BMI_NORMS[age_idx].T
+
+    height_m = height / 100
+    bmi = weight / (height_m ** 2)
+
+    scores = {
+        "systolic_bp_score": _score_from_norm(systolic, bp_systolic - 10, bp_systolic + 10),
+        "diastolic_bp_score": _score_from_norm(diastolic, bp_diastolic - 5, bp_diastolic + 5),
+        "pulse_score": _score_from_norm(pulse, pulse_low, pulse_high),
+        "temperature_score": np.where((temperature >= 36.0) & (temperature <= 37.0), 10.0, 6.0),
+        "bmi_score": _score_from_norm(bmi, bmi_low, bmi_high),
+    }
+    scores["physiology_total"] = sum(scores.values())
+
+    return scores
+
+
+def calculate_user_answers_scores_batch(answers, weights, positive_uns):
+    # answers — матрица (пользователи x вопросы): 1/0 для да/нет, NaN для "Не знаю"
+    # weights, positive_uns — веса и "положительный" ответ для каждого столбца
+    answers = np.asarray(answers, dtype=float)
+    if answers.ndim != 2:
+        raise ValueError("answers должно быть двумерным массивом")
+    weights = _as_array(weights, "weights")
+    positive_uns = _as_array(positive_uns, "positive_uns", dtype=bool)
+    if answers.shape[1] != weights.shape[0] or weights.shape != positive_uns.shape:
+        raise ValueError("Число столбцов answers должно совпадать с числом весов")
+
+    answered = ~np.isnan(answers)
+    matched = answered & ((answers == 1) == positive_uns)
+
+    total_weight = answered @ weights
+    raw_score = matched @ weights
+
+    # Нормализация до 50-балльной шкалы
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = np.where(total_weight > 0, raw_score / total_weight * 50, 0.0)
+    return normalized
+
+
+def get_interpretation_codes(total_score, age):
+    # Коды интерпретации (см. calculations/interpretation.py) для массивов баллов и возрастов
+    return interpretation_codes(_as_array(total_score, "total_score"), _as_array(age, "age"))
+
+
+def calculate_health_scores_batch(systolic, diastolic, pulse, temperature, height, weight, age,
+                                  answers, weights, positive_uns):
+    physio_scores = calculate_physiological_scores_batch(
+        systolic, diastolic, pulse, temperature, height, weight, age
+    )
+    answers_score = calculate_user_answers_scores_batch(answers, weights, positive_uns)
+
+    # Итоговый балл, ограниченный 0..100 и округлённый до 1 знака
+    total_score = np.clip(physio_scores["physiology_total"] + answers_score, 0, 100)
+    total_score = np.round(total_score, 1)
+
+    return {
+        "total_score": total_score,
+        "interpretation_code": get_interpretation_codes(total_score, age),
+        "details": {
+            **physio_scores,
+            "user_answers_score": answers_score,
+        },
+    }
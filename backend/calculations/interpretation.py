@@ -0,0 +1,109 @@
+from bisect import bisect_right
+
+import numpy as np
+
+# Интерпретация итогового балла по таблицам вместо цепочек условий.
+# Для каждой возрастной группы задан отсортированный список порогов; полоса
+# баллов ищется bisect (для массивов — np.searchsorted). Подписи полос и шаблон
+# текста анализа хранятся по локалям и раскрываются в таблицы один раз при импорте.
+#
+# Код интерпретации = номер возрастной группы * BANDS + номер полосы
+# (0 — самая низкая полоса группы).
+
+DEFAULT_LOCALE = "ru"
+
+# (возраст, с которого начинается группа; пороги полос по возрастанию)
+INTERPRETATION_COHORTS = (
+    (0, (30, 50, 70, 85)),
+    (60, (25, 45, 65, 80)),
+)
+BANDS = 5
+
+# Подписи полос по группам, от низкой к высокой
+INTERPRETATION_LABELS = {
+    "ru": (
+        (
+            "Низкий уровень здоровья",
+            "Состояние здоровья требует внимания",
+            "Удовлетворительное состояние здоровья",
+            "Хорошее состояние здоровья",
+            "Отличное состояние здоровья",
+        ),
+        (
+            "Низкий уровень здоровья с учетом возраста",
+            "Состояние здоровья требует внимания с учетом возраста",
+            "Удовлетворительное состояние здоровья с учетом возраста",
+            "Хорошее состояние здоровья с учетом возраста",
+            "Отличное состояние здоровья с учетом возраста",
+        ),
+    ),
+}
+
+ANALYSIS_TEMPLATES = {
+    "ru": "Итоговое состояние здоровья: {score}/100 – {interpretation} (с учетом вашего возраста)",
+}
+
+# Первая группа включает все возрасты младше начала второй
+COHORT_AGES = (float("-inf"),) + tuple(age for age, _ in INTERPRETATION_COHORTS[1:])
+COHORT_THRESHOLDS = tuple(thresholds for _, thresholds in INTERPRETATION_COHORTS)
+
+# Для массивов: пороги всех групп в одном отсортированном массиве, каждая группа
+# сдвинута на SCORE_SPAN (баллы ограничены 0..100), так что один np.searchsorted
+# находит полосу сразу для пользователей разных групп
+SCORE_SPAN = 1000.0
+_COHORT_AGES_ARRAY = np.array(COHORT_AGES[1:])  # начала групп, кроме первой
+_SHIFTED_THRESHOLDS = np.concatenate([
+    np.asarray(thresholds, dtype=float) + cohort * SCORE_SPAN
+    for cohort, thresholds in enumerate(COHORT_THRESHOLDS)
+])
+
+
+def _build_tables():
+    # Плоские таблицы по коду: подписи и шаблон анализа с уже подставленной подписью,
+    # разделённый по месту балла на (начало, конец)
+    if any(len(thresholds) != BANDS - 1 for thresholds in COHORT_THRESHOLDS):
+        raise ValueError("Число порогов каждой возрастной группы должно быть BANDS - 1")
+    labels, analysis = {}, {}
+    for locale, cohorts in INTERPRETATION_LABELS.items():
+        if len(cohorts) != len(INTERPRETATION_COHORTS) or any(len(bands) != BANDS for bands in cohorts):
+            raise ValueError(f"Подписи интерпретации для '{locale}' не соответствуют группам и полосам")
+        labels[locale] = tuple(label for bands in cohorts for label in bands)
+        template = ANALYSIS_TEMPLATES[locale]
+        if template.count("{score}") != 1:
+            raise ValueError(f"Шаблон анализа для '{locale}' должен содержать {{score}} ровно один раз")
+        analysis[locale] = tuple(
+            tuple(template.replace("{interpretation}", label).split("{score}")) for label in labels[locale]
+        )
+    return labels, analysis
+
+
+LABEL_TABLE, ANALYSIS_TABLE = _build_tables()
+# Подписи по группам: COHORT_LABELS[locale][группа][полоса]
+COHORT_LABELS = {
+    locale: tuple(labels[cohort * BANDS:(cohort + 1) * BANDS] for cohort in range(len(INTERPRETATION_COHORTS)))
+    for locale, labels in LABEL_TABLE.items()
+}
+
+
+def interpretation_code(score: float, age: int) -> int:
+    cohort = bisect_right(COHORT_AGES, age) - 1
+    return cohort * BANDS + bisect_right(COHORT_THRESHOLDS[cohort], score)
+
+
+def interpretation_codes(scores, ages) -> np.ndarray:
+    # Векторный аналог interpretation_code для массивов баллов и возрастов
+    scores = np.asarray(scores, dtype=float)
+    cohorts = np.searchsorted(_COHORT_AGES_ARRAY, ages, side="right")
+    shifted = np.searchsorted(_SHIFTED_THRESHOLDS, scores + cohorts * SCORE_SPAN, side="right")
+    # Индекс в общем массиве минус пороги предыдущих групп = номер полосы в группе
+    bands = shifted - cohorts * (BANDS - 1)
+    return cohorts * BANDS + bands
+
+
+def interpretation_label(code: int, locale: str = DEFAULT_LOCALE) -> str:
+    return LABEL_TABLE[locale][code]
+
+
+def analysis_text(score: float, code: int, locale: str = DEFAULT_LOCALE) -> str:
+    prefix, suffix = ANALYSIS_TABLE[locale][code]
+    return f"{prefix}{score}{suffix}"
@@ -1,31 +1,38 @@
-from backend.calculations.utils import calculate_physiological_score, calculate_user_answers_score, get_age_norms, get_interpretation
+import logging
 
-def calculate_health_score(health_data, user_answers, age):
-    print(f"DEBUG: возраст = {age}, тип = {type(age)}")  
-    
+from backend.calculations.interpretation import analysis_text, interpretation_code, interpretation_label
+from backend.calculations.utils import calculate_physiological_score, calculate_user_answers_score
+
+logger = logging.getLogger(__name__)
+
+def calculate_health_score(health_data, user_answers, age, answers_score=None):
+    # answers_score — уже посчитанный балл за опросник (CompiledAnswerScorer),
+    # в этом случае user_answers не используется
     # Баллы за физиологию
-    print(f"DEBUG: norms = {get_age_norms(age)}")
     physio_scores = calculate_physiological_score(health_data, age)
 
     # Баллы за опросник
-    answers_score = calculate_user_answers_score(user_answers)
+    if answers_score is None:
+        answers_score = calculate_user_answers_score(user_answers)
 
     # Итоговый балл
     total_score = physio_scores["physiology_total"] + answers_score
     total_score = min(max(total_score, 0), 100)  # Ограничение от 0 до 100
 
     total_score = round(total_score, 1)  # Округление до 1 знака
-    interpretation = get_interpretation(total_score, age)
+    code = interpretation_code(total_score, age)
 
     score_result = {
         "total_score": total_score,
-        "interpretation": interpretation,
+        "interpretation": interpretation_label(code),
+        "interpretation_code": code,
+        "analysis_text": analysis_text(total_score, code),
         "details": {
             **physio_scores,
             "user_answers_score": answers_score
         }
     }
 
-    print(f"DEBUG: score_result = {score_result}, тип = {type(score_result)}")
-    
+    logger.debug("Расчёт балла: возраст %s, результат %s", age, score_result)
+
     return score_result
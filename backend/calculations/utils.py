@@ -1,4 +1,7 @@
 from decimal import Decimal
+from types import MappingProxyType
+
+from backend.calculations.interpretation import interpretation_code, interpretation_label
 
 def validate_positive(value, name="value"):
     # Проверка, что значение положительное.
@@ -11,43 +14,64 @@ def validate_positive(value, name="value"):
     return value
 
 
+# Возрастные нормы для АД, пульса и ИМТ по диапазонам возраста
+AGE_NORM_RANGES = {
+    "bp": {  # Артериальное давление
+        (18, 30): (120, 80),
+        (31, 45): (125, 85),
+        (46, 60): (130, 85),
+        (61, 100): (135, 90),
+    },
+    "pulse": {  # Пульс
+        (18, 30): (60, 80),
+        (31, 45): (62, 82),
+        (46, 60): (64, 84),
+        (61, 100): (66, 86),
+    },
+    "bmi": {  # Индекс массы тела (ИМТ)
+        (18, 30): (18.5, 24.9),
+        (31, 45): (19, 25.5),
+        (46, 60): (19.5, 26),
+        (61, 100): (20, 27),
+    },
+}
+
+MIN_NORM_AGE = 18
+MAX_NORM_AGE = 100
+
+
+def _build_age_norms_table():
+    # Плоская таблица норм, индексируемая целым возрастом (0..MAX_NORM_AGE).
+    # Строится один раз при импорте модуля. Записи общие для всех вызовов,
+    # поэтому отдаются только для чтения (MappingProxyType)
+    table = [None] * (MAX_NORM_AGE + 1)
+    for age in range(MIN_NORM_AGE, MAX_NORM_AGE + 1):
+        norms = {}
+        for category, ranges in AGE_NORM_RANGES.items():
+            norms[category] = next(
+                (norm for (low, high), norm in ranges.items() if low <= age <= high), None
+            )
+        table[age] = MappingProxyType(norms)
+    # Возраст младше 18 лет — нормы самой молодой группы
+    for age in range(MIN_NORM_AGE):
+        table[age] = table[MIN_NORM_AGE]
+    return tuple(table)
+
+
+AGE_NORMS_TABLE = _build_age_norms_table()
+
+
+def norm_age_index(age):
+    # Индекс в AGE_NORMS_TABLE. Возраст вне 18–100 получает нормы ближайшей
+    # возрастной группы: младше 18 — группы 18–30, старше 100 — группы 61–100.
+    return min(max(int(age), MIN_NORM_AGE), MAX_NORM_AGE)
+
+
 def get_age_norms(age):
     # Возврат возрастных норм для АД, пульса и ИМТ.
     # Валидация возраста
     age = validate_positive(age, "age")
-    
-    age_norms = {
-        "bp": {  # Артериальное давление
-            (18, 30): (120, 80),
-            (31, 45): (125, 85),
-            (46, 60): (130, 85),
-            (61, 100): (135, 90),
-        },
-        "pulse": {  # Пульс
-            (18, 30): (60, 80),
-            (31, 45): (62, 82),
-            (46, 60): (64, 84),
-            (61, 100): (66, 86),
-        },
-        "bmi": {  # Индекс массы тела (ИМТ)
-            (18, 30): (18.5, 24.9),
-            (31, 45): (19, 25.5),
-            (46, 60): (19.5, 26),
-            (61, 100): (20, 27),
-        },
-    }
-
-    def get_norm(category):
-        for age_range, norm in age_norms[category].items():
-            if age_range[0] <= age <= age_range[1]:
-                return norm
-        return None  # Если возраст не найден
-
-    return {
-        "bp": get_norm("bp"),
-        "pulse": get_norm("pulse"),
-        "bmi": get_norm("bmi"),
-    }
+    return AGE_NORMS_TABLE[norm_age_index(age)]
 
 
 def calculate_physiological_score(health_data, age):
@@ -143,27 +167,5 @@ def calculate_user_answers_score(user_answers):
 
 
 def get_interpretation(score: float, age: int) -> str:
-    print(f"DEBUG: Вызов get_interpretation(score={score}, age={age})")
-    if age >= 60:
-        if score >= 80:
-            return "Отличное состояние здоровья с учетом возраста"
-        elif score >= 65:
-            return "Хорошее состояние здоровья с учетом возраста"
-        elif score >= 45:
-            return "Удовлетворительное состояние здоровья с учетом возраста"
-        elif score >= 25:
-            return "Состояние здоровья требует внимания с учетом возраста"
-        else:
-            return "Низкий уровень здоровья с учетом возраста"
-    else:
-        if score >= 85:
-            return "Отличное состояние здоровья"
-        elif score >= 70:
-            return "Хорошее состояние здоровья"
-        elif score >= 50:
-            return "Удовлетворительное состояние здоровья"
-        elif score >= 30:
-            return "Состояние здоровья требует внимания"
-        else:
-            return "Низкий уровень здоровья"
-
+    # Полосы баллов по возрастным группам — таблицы calculations/interpretation.py
+    return interpretation_label(interpretation_code(score, age))
@@ -0,0 +1,36 @@
+import os
+
+from sqlalchemy import inspect
+from backend.db.connection import engine
+
+# Применение миграций Alembic из кода (при старте приложения и в бенчмарках).
+# Из командной строки то же самое делает alembic upgrade head.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(ROOT_DIR, "alembic.ini")
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, "backend", "migrations")
+
+# Ревизия, которой соответствует схема, созданная до перехода на миграции
+BASELINE_REVISION = "0001"
+
+
+def alembic_config():
+    # Alembic импортируется только при применении миграций
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    # Логирование приложения не перенастраиваем
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(revision: str = "head"):
+    from alembic import command
+
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        # База создана через create_all: отмечаем базовую ревизию, остальные применяем
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
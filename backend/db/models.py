@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, TIMESTAMP, Boolean, Date, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, TIMESTAMP, Boolean, Date, Text, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -22,6 +22,9 @@ class User(Base):
 
 class HealthData(Base):
     __tablename__ = "health_data"
+    __table_args__ = (
+        Index("ix_health_data_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -49,6 +52,10 @@ class Question(Base):
 
 class UserAnswer(Base):
     __tablename__ = "user_answers"
+    # У пользователя один текущий ответ на вопрос; повторная отправка обновляет его
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_user_answers_user_id_question_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -58,8 +65,25 @@ class UserAnswer(Base):
     user = relationship("User", back_populates="answers")
     question = relationship("Question", back_populates="answers")
 
+class UserAnswerHistory(Base):
+    # Все отправленные ответы для аудита; submission — запись health_data той же отправки
+    __tablename__ = "user_answer_history"
+    __table_args__ = (
+        Index("ix_user_answer_history_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    health_data_id = Column(Integer, ForeignKey("health_data.id"), nullable=True)
+    answer = Column(Boolean, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
 class Result(Base):
     __tablename__ = "results"
+    __table_args__ = (
+        Index("ix_results_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -68,4 +92,53 @@ class Result(Base):
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     recommendation = Column(Text, nullable=True)
 
-    user = relationship("User", back_populates="results")
\ No newline at end of file
+    user = relationship("User", back_populates="results")
+
+class RecommendationJob(Base):
+    __tablename__ = "recommendation_jobs"
+    __table_args__ = (
+        Index("ix_recommendation_jobs_status", "status"),
+        # Одна незавершённая задача на результат: повторные запросы получают её же
+        Index(
+            "uq_recommendation_jobs_active_result", "user_id", "result_id", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    result_id = Column(Integer, ForeignKey("results.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+
+    result = relationship("Result")
+
+class RecommendationCacheEntry(Base):
+    __tablename__ = "recommendation_cache"
+
+    key = Column(String(64), primary_key=True)
+    recommendation = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    last_used_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+class UserScoreRollup(Base):
+    __tablename__ = "user_score_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    results_count = Column(Integer, nullable=False, default=0)
+    latest_score = Column(Float, nullable=False)
+    latest_at = Column(TIMESTAMP, nullable=False)
+    min_score = Column(Float, nullable=False)
+    max_score = Column(Float, nullable=False)
+    # Средние с экспоненциальным затуханием по времени (окна 7/30/90 дней)
+    # и суммарный вес результатов в каждом окне
+    avg_7d = Column(Float, nullable=False)
+    avg_30d = Column(Float, nullable=False)
+    avg_90d = Column(Float, nullable=False)
+    weight_7d = Column(Float, nullable=False)
+    weight_30d = Column(Float, nullable=False)
+    weight_90d = Column(Float, nullable=False)
\ No newline at end of file
@@ -1,17 +1,74 @@
+import os
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from backend.logging_config import setup_logging, shutdown_logging
 from backend.api import router
+from backend.db.connection import engine
+from backend.db.migrate import upgrade_database
+from backend.services.recommendation_jobs import job_queue
+from backend.services.question_catalog import load_question_catalog, question_listener
+from backend.services.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, registry
+from backend.services.avatar_service import AVATAR_DIR, UploadSizeLimitMiddleware
+from backend.services.rate_limit import RateLimitMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+# При нескольких экземплярах миграции лучше применять отдельно (alembic upgrade head)
+# и отключать их при старте: DB_MIGRATE_ON_STARTUP=0
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Вывод логов через очередь и фоновый поток (LOG_LEVEL, LOG_FORMAT)
+    setup_logging()
+    # Схема БД (таблицы, индексы, триггер NOTIFY на questions) — миграции Alembic
+    if DB_MIGRATE_ON_STARTUP:
+        upgrade_database()
+    # Каталоги для загружаемых файлов
+    os.makedirs(AVATAR_DIR, exist_ok=True)
+    # Каталог вопросов загружается один раз и обновляется по NOTIFY из Postgres
+    load_question_catalog()
+    question_listener.start()
+    # Запуск воркеров генерации рекомендаций
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    question_listener.stop()
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to health assessment API"}
 
-# Подключаем отдачу файлов из папки "uploads"
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Метрики в формате Prometheus (METRICS_ENABLED=0 — выключены)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+class UploadsStaticFiles(StaticFiles):
+    # Имена загруженных файлов уникальны (хэш содержимого), файл по одному адресу
+    # не меняется, поэтому браузер и прокси могут кэшировать его бессрочно
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Подключаем отдачу файлов из папки "uploads" (папка создаётся в lifespan)
+app.mount("/uploads", UploadsStaticFiles(directory="uploads", check_dir=False), name="uploads")
+
+# Ограничение частоты дорогих маршрутов (services/rate_limit.py); добавляется до CORS,
+# чтобы ответы 429 тоже получали CORS-заголовки
+app.add_middleware(RateLimitMiddleware)
+
+# Предел размера тела запросов загрузки файлов, в том числе без Content-Length
+app.add_middleware(UploadSizeLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,5 +80,9 @@ app.add_middleware(
 
 app.include_router(router, prefix="/api")
 
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=9000)
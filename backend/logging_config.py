@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Логирование приложения. Записи из обработчиков запросов только кладутся
+# в очередь, а форматирование и запись в поток вывода выполняет отдельный поток
+# QueueListener. Сообщения форматируются лениво (logger.debug("... %s", value)):
+# при выключенном уровне аргументы не превращаются в строку.
+#
+# LOG_LEVEL  — уровень логгеров backend (DEBUG, INFO, WARNING, ...), по умолчанию INFO
+# LOG_FORMAT — text (по умолчанию) или json (одна JSON-запись на строку)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def _extra_fields(record) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    # Сообщение и поля из extra в виде key=value
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    # Стандартный QueueHandler форматирует сообщение в вызывающем потоке;
+    # здесь запись передаётся как есть и форматируется в потоке QueueListener.
+    # Аргументы сообщения не должны изменяться после вызова логгера.
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: str = None, log_format: str = None, stream=None):
+    # Повторный вызов перенастраивает вывод (используется в бенчмарках)
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if (log_format or LOG_FORMAT) == "json" else TextFormatter())
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+
+        logger = logging.getLogger("backend")
+        for old_handler in list(logger.handlers):
+            logger.removeHandler(old_handler)
+        logger.addHandler(DeferredQueueHandler(log_queue))
+        logger.setLevel(level or LOG_LEVEL)
+        logger.propagate = False
+
+
+def shutdown_logging():
+    # Дописывает оставшиеся в очереди записи; дальше записи идут стандартным путём
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        logger = logging.getLogger("backend")
+        for handler in list(logger.handlers):
+            if isinstance(handler, DeferredQueueHandler):
+                logger.removeHandler(handler)
+        logger.propagate = True
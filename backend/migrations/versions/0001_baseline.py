@@ -0,0 +1,74 @@
+"""Базовая схема: users, health_data, questions, user_answers, results
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("birth_date", sa.Date(), nullable=False),
+        sa.Column("gender", sa.String(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("avatar_path", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "health_data",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("systolic_bp", sa.Integer(), nullable=False),
+        sa.Column("diastolic_bp", sa.Integer(), nullable=False),
+        sa.Column("pulse", sa.Integer(), nullable=False),
+        sa.Column("temperature", sa.Float(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.Column("age", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+    )
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("question_text", sa.String(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("positive_uns", sa.Boolean(), nullable=False),
+    )
+    op.create_table(
+        "user_answers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id"), nullable=False),
+        sa.Column("answer", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "results",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("health_score", sa.Float(), nullable=False),
+        sa.Column("analysis_text", sa.String(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("recommendation", sa.Text(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("results")
+    op.drop_table("user_answers")
+    op.drop_table("questions")
+    op.drop_table("health_data")
+    op.drop_table("users")
@@ -0,0 +1,64 @@
+"""Таблицы recommendation_jobs, recommendation_cache, user_score_rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # До перехода на миграции эти таблицы создавались через create_all при старте,
+    # поэтому в существующих базах они уже могут быть
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "recommendation_jobs" not in existing:
+        op.create_table(
+            "recommendation_jobs",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("result_id", sa.Integer(), sa.ForeignKey("results.id"), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+            sa.Column("started_at", sa.TIMESTAMP(), nullable=True),
+            sa.Column("finished_at", sa.TIMESTAMP(), nullable=True),
+        )
+    if "recommendation_cache" not in existing:
+        op.create_table(
+            "recommendation_cache",
+            sa.Column("key", sa.String(64), primary_key=True),
+            sa.Column("recommendation", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+            sa.Column("last_used_at", sa.TIMESTAMP(), nullable=True),
+        )
+    if "user_score_rollups" not in existing:
+        op.create_table(
+            "user_score_rollups",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("results_count", sa.Integer(), nullable=False),
+            sa.Column("latest_score", sa.Float(), nullable=False),
+            sa.Column("latest_at", sa.TIMESTAMP(), nullable=False),
+            sa.Column("min_score", sa.Float(), nullable=False),
+            sa.Column("max_score", sa.Float(), nullable=False),
+            sa.Column("avg_7d", sa.Float(), nullable=False),
+            sa.Column("avg_30d", sa.Float(), nullable=False),
+            sa.Column("avg_90d", sa.Float(), nullable=False),
+            sa.Column("weight_7d", sa.Float(), nullable=False),
+            sa.Column("weight_30d", sa.Float(), nullable=False),
+            sa.Column("weight_90d", sa.Float(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("user_score_rollups")
+    op.drop_table("recommendation_cache")
+    op.drop_table("recommendation_jobs")
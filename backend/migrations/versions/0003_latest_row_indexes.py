@@ -0,0 +1,47 @@
+"""Составные индексы для запросов "последняя запись пользователя"
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+import sqlalchemy as sa
+from alembic import context, op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # filter(user_id == X).order_by(created_at.desc()).first() и постраничный /results
+    ("ix_results_user_id_created_at", "results", ["user_id", "created_at"]),
+    ("ix_health_data_user_id_created_at", "health_data", ["user_id", "created_at"]),
+    # Ответы пользователя для расчёта и рекомендаций
+    ("ix_user_answers_user_id_question_id", "user_answers", ["user_id", "question_id"]),
+    # Незавершённые задачи, которые ставятся в очередь заново при старте
+    ("ix_recommendation_jobs_status", "recommendation_jobs", ["status"]),
+]
+
+
+def upgrade():
+    # Базы, созданные через create_all по текущим моделям, уже содержат индексы
+    existing = set()
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        existing = {index["name"] for table in {t for _, t, _ in INDEXES} for index in inspector.get_indexes(table)}
+
+    # В Postgres индексы строятся CONCURRENTLY (без блокировки записи в большие
+    # таблицы), а это возможно только вне транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if name in existing:
+                continue
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""Триггер NOTIFY на таблице questions для обновления каталога вопросов
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Канал должен совпадать с QUESTIONS_CHANNEL в backend/services/question_catalog.py
+QUESTIONS_CHANNEL = "questions_changed"
+
+
+def upgrade():
+    # LISTEN/NOTIFY есть только в Postgres. Диалект берётся из контекста миграции,
+    # а не из соединения: его нет при генерации SQL (alembic upgrade --sql)
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.execute(f"""
+CREATE OR REPLACE FUNCTION notify_questions_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{QUESTIONS_CHANNEL}', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""")
+    op.execute("DROP TRIGGER IF EXISTS questions_changed ON questions")
+    op.execute("""
+CREATE TRIGGER questions_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON questions
+FOR EACH STATEMENT EXECUTE FUNCTION notify_questions_changed()
+""")
+
+
+def downgrade():
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.execute("DROP TRIGGER IF EXISTS questions_changed ON questions")
+    op.execute("DROP FUNCTION IF EXISTS notify_questions_changed()")
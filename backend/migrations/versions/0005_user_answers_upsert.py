@@ -0,0 +1,52 @@
+"""Один текущий ответ на вопрос в user_answers и история ответов user_answer_history
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_answer_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id"), nullable=False),
+        sa.Column("health_data_id", sa.Integer(), sa.ForeignKey("health_data.id"), nullable=True),
+        sa.Column("answer", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+    )
+    op.create_index("ix_user_answer_history_user_id_created_at", "user_answer_history", ["user_id", "created_at"])
+
+    # Все накопленные ответы сохраняются в истории (время отправки для них неизвестно),
+    # в user_answers остаётся последний ответ на каждый вопрос
+    op.execute("""
+        INSERT INTO user_answer_history (user_id, question_id, answer)
+        SELECT user_id, question_id, answer FROM user_answers ORDER BY id
+    """)
+    op.execute("""
+        DELETE FROM user_answers
+        WHERE id NOT IN (SELECT MAX(id) FROM user_answers GROUP BY user_id, question_id)
+    """)
+
+    # Уникальный индекс ограничения заменяет обычный индекс из 0003
+    op.drop_index("ix_user_answers_user_id_question_id", table_name="user_answers")
+    with op.batch_alter_table("user_answers") as batch_op:
+        batch_op.create_unique_constraint("uq_user_answers_user_id_question_id", ["user_id", "question_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("user_answers") as batch_op:
+        batch_op.drop_constraint("uq_user_answers_user_id_question_id", type_="unique")
+    op.create_index("ix_user_answers_user_id_question_id", "user_answers", ["user_id", "question_id"])
+    op.drop_index("ix_user_answer_history_user_id_created_at", table_name="user_answer_history")
+    op.drop_table("user_answer_history")
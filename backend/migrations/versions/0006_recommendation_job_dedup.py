@@ -0,0 +1,45 @@
+"""Не более одной незавершённой задачи рекомендации на результат
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade():
+    # Из одновременно ожидающих задач по одному результату остаётся одна,
+    # остальные завершаются: их выполнение повторило бы ту же генерацию
+    op.execute("""
+        UPDATE recommendation_jobs
+        SET status = 'failed', error = 'Повторная задача для того же результата'
+        WHERE status IN ('queued', 'running')
+          AND id NOT IN (
+              SELECT MIN(id) FROM recommendation_jobs
+              WHERE status IN ('queued', 'running')
+              GROUP BY user_id, result_id
+          )
+    """)
+    # Индекс строится CONCURRENTLY, как в 0003: без блокировки записи в таблицу
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_recommendation_jobs_active_result", "recommendation_jobs", ["user_id", "result_id"],
+            unique=True, postgresql_where=ACTIVE, sqlite_where=ACTIVE, postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "uq_recommendation_jobs_active_result", table_name="recommendation_jobs", postgresql_concurrently=True,
+        )
@@ -0,0 +1,371 @@
+# Массовый пересчёт баллов всех пользователей — после изменения весов в questions
+# или возрастных норм. Пользователи читаются порциями по id (keyset-пагинация),
+# последние данные о здоровье и текущие ответы порции — потоковыми запросами
+# (server-side cursor), баллы считаются векторно (calculations/batch) в пуле
+# процессов, новые результаты записываются одним executemany на порцию.
+#
+# Запуск:
+#   python -m backend.rescore                       — пересчёт с записью результатов
+#   python -m backend.rescore --dry-run             — только сравнение с последними результатами
+#   python -m backend.rescore --resume              — продолжить прерванный пересчёт
+#   python -m backend.rescore --chunk-size 5000 --workers 4
+#
+# После каждой записанной порции сохраняется контрольная точка (--checkpoint).
+# Все результаты одного запуска записываются с одним created_at, поэтому при
+# продолжении уже записанные порции находятся и по таблице results — даже если
+# процесс остановился между commit и записью контрольной точки.
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from backend.calculate_service import get_age
+from backend.calculations.answer_scorer import NO_ANSWER
+from backend.calculations.batch import calculate_health_scores_batch
+from backend.calculations.interpretation import analysis_text
+from backend.db.connection import SessionLocal
+from backend.db.models import HealthData, Result, User, UserAnswer
+from backend.logging_config import setup_logging, shutdown_logging
+from backend.services.question_catalog import load_question_catalog
+from backend.services.result_service import update_score_rollups
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHECKPOINT = "rescore_checkpoint.json"
+STREAM_BATCH = 5000  # строк за одно чтение из server-side cursor
+DIFF_TOP = 20  # крупнейших изменений в отчёте --dry-run
+SCORE_EPSILON = 0.05  # баллы округлены до 0.1, меньшая разница — не изменение
+
+
+def _latest_per_user(model, columns, first_user_id, last_user_id):
+    # Последняя строка каждого пользователя в диапазоне id
+    # (индекс (user_id, created_at), см. миграцию 0003)
+    ranked = (
+        select(
+            *columns,
+            func.row_number().over(
+                partition_by=model.user_id, order_by=(model.created_at.desc(), model.id.desc())
+            ).label("row_number"),
+        )
+        .where(model.user_id.between(first_user_id, last_user_id))
+        .subquery()
+    )
+    return select(*(ranked.c[column.key] for column in columns)).where(ranked.c.row_number == 1)
+
+
+def _stream(session, statement):
+    return session.execute(statement, execution_options={"stream_results": True, "yield_per": STREAM_BATCH})
+
+
+def read_chunk(session, after_user_id: int, chunk_size: int, stats: dict):
+    # Порция пользователей с id > after_user_id в виде столбцов для score_chunk;
+    # None, когда пользователи закончились
+    users = session.execute(
+        select(User.id, User.birth_date).where(User.id > after_user_id).order_by(User.id).limit(chunk_size)
+    ).all()
+    if not users:
+        return None
+    first_user_id, last_user_id = users[0].id, users[-1].id
+    ages = {user.id: get_age(user.birth_date) for user in users}
+
+    columns = {name: [] for name in ("user_ids", "ages", "systolic", "diastolic", "pulse", "temperature", "height", "weight")}
+    rows = {}
+    invalid = 0
+    health_query = _latest_per_user(
+        HealthData,
+        (HealthData.user_id, HealthData.systolic_bp, HealthData.diastolic_bp, HealthData.pulse,
+         HealthData.temperature, HealthData.height, HealthData.weight),
+        first_user_id, last_user_id,
+    )
+    for health in _stream(session, health_query):
+        age = ages[health.user_id]
+        # Такие данные не пройдут проверки расчёта (validate_positive)
+        if age <= 0 or health.weight <= 0 or health.height <= 0 or health.temperature <= 0:
+            invalid += 1
+            continue
+        rows[health.user_id] = len(columns["user_ids"])
+        columns["user_ids"].append(health.user_id)
+        columns["ages"].append(age)
+        columns["systolic"].append(health.systolic_bp)
+        columns["diastolic"].append(health.diastolic_bp)
+        columns["pulse"].append(health.pulse)
+        columns["temperature"].append(health.temperature)
+        columns["height"].append(health.height)
+        columns["weight"].append(health.weight)
+    stats["users_read"] += len(users)
+    stats["skipped_invalid"] += invalid
+    stats["skipped_no_data"] += len(users) - len(rows) - invalid
+
+    # Ответы в виде троек (строка порции, id вопроса, упакованный ответ)
+    answer_rows, question_ids, answers = [], [], []
+    answers_query = (
+        select(UserAnswer.user_id, UserAnswer.question_id, UserAnswer.answer)
+        .where(UserAnswer.user_id.between(first_user_id, last_user_id))
+    )
+    for user_id, question_id, answer in _stream(session, answers_query):
+        row = rows.get(user_id)
+        if row is not None:
+            answer_rows.append(row)
+            question_ids.append(question_id)
+            answers.append(NO_ANSWER if answer is None else int(answer))
+
+    chunk = {name: np.asarray(values) for name, values in columns.items()}
+    chunk.update(
+        first_user_id=first_user_id,
+        last_user_id=last_user_id,
+        answer_rows=np.asarray(answer_rows, dtype=np.intp),
+        question_ids=np.asarray(question_ids, dtype=np.intp),
+        answers=np.asarray(answers, dtype=np.int8),
+    )
+    return chunk
+
+
+_scorer = None
+
+
+def _init_worker(scorer):
+    global _scorer
+    _scorer = scorer
+
+
+def score_chunk(chunk):
+    # Выполняется в процессе пула: итоговые баллы и коды интерпретации порции
+    # общим векторным расчётом (calculate_health_scores_batch). Столбцы матрицы
+    # ответов — вопросы каталога; ответы на вопросы вне каталога не учитываются
+    question_columns = np.flatnonzero(_scorer.known)
+    column_of = np.full(_scorer.weights.shape[0], -1, dtype=np.intp)
+    column_of[question_columns] = np.arange(question_columns.shape[0])
+
+    matrix = np.full((chunk["user_ids"].shape[0], question_columns.shape[0]), np.nan)
+    question_ids = chunk["question_ids"]
+    in_range = (question_ids >= 0) & (question_ids < column_of.shape[0])
+    columns = np.where(in_range, column_of[np.where(in_range, question_ids, 0)], -1)
+    answered = (columns >= 0) & (chunk["answers"] != NO_ANSWER)
+    matrix[chunk["answer_rows"][answered], columns[answered]] = chunk["answers"][answered]
+
+    result = calculate_health_scores_batch(
+        chunk["systolic"], chunk["diastolic"], chunk["pulse"], chunk["temperature"],
+        chunk["height"], chunk["weight"], chunk["ages"],
+        matrix, _scorer.weights[question_columns], _scorer.polarity[question_columns].astype(bool),
+    )
+    return result["total_score"], result["interpretation_code"]
+
+
+def write_results(session, user_ids, total_scores, codes, run_at):
+    rows = [
+        {
+            "user_id": int(user_id),
+            "health_score": round(float(score), 2),
+            "analysis_text": analysis_text(round(float(score), 2), code),
+            "created_at": run_at,
+        }
+        for user_id, score, code in zip(user_ids, total_scores, codes)
+    ]
+    if rows:
+        session.connection().execute(insert(Result.__table__), rows)
+        update_score_rollups(session, {row["user_id"]: row["health_score"] for row in rows}, run_at)
+    session.commit()
+    return len(rows)
+
+
+def diff_results(session, chunk, total_scores, diff: dict, writer=None):
+    # writer — csv.writer для --diff-output: строки по пользователям пишутся
+    # порциями, в памяти остаются только счётчики и DIFF_TOP крупнейших изменений
+    previous = dict(session.execute(
+        _latest_per_user(Result, (Result.user_id, Result.health_score), chunk["first_user_id"], chunk["last_user_id"])
+    ).all())
+    session.rollback()
+    rows = [] if writer is not None else None
+    for user_id, score in zip(chunk["user_ids"].tolist(), total_scores.tolist()):
+        old_score = previous.get(user_id)
+        if old_score is None:
+            diff["new"] += 1
+            if rows is not None:
+                rows.append((user_id, None, score, None))
+            continue
+        delta = round(score - old_score, 2)
+        diff["compared"] += 1
+        if rows is not None:
+            rows.append((user_id, old_score, score, delta))
+        if abs(delta) >= SCORE_EPSILON:
+            diff["changed"] += 1
+            diff["abs_delta_sum"] += abs(delta)
+            heapq.heappush(diff["top"], (abs(delta), user_id, old_score, score))
+            if len(diff["top"]) > DIFF_TOP:
+                heapq.heappop(diff["top"])
+    if rows:
+        writer.writerows(rows)
+
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def resume_position(session, state: dict) -> int:
+    # Последняя записанная порция: по контрольной точке или по results этого запуска
+    run_at = datetime.fromisoformat(state["run_at"])
+    committed = session.scalar(select(func.max(Result.user_id)).where(Result.created_at == run_at))
+    session.rollback()
+    return max(state["last_user_id"], committed or 0)
+
+
+def run(args) -> int:
+    session = SessionLocal()
+    scorer = load_question_catalog(session).scorer
+
+    stats = {"users_read": 0, "users_scored": 0, "results_written": 0, "skipped_no_data": 0, "skipped_invalid": 0}
+    timings = {"read": 0.0, "score": 0.0, "write": 0.0}
+    diff = {"compared": 0, "changed": 0, "new": 0, "abs_delta_sum": 0.0, "top": []}
+
+    state = None
+    if args.resume:
+        state = load_checkpoint(args.checkpoint)
+        if state is None:
+            print(f"Контрольная точка {args.checkpoint} не найдена")
+            return 1
+        if state.get("finished"):
+            print(f"Пересчёт от {state['run_at']} уже завершён")
+            return 0
+        after_user_id = resume_position(session, state)
+        run_at = datetime.fromisoformat(state["run_at"])
+        for key in ("users_read", "users_scored", "results_written", "skipped_no_data", "skipped_invalid"):
+            stats[key] = state.get(key, 0)
+        print(f"Продолжение пересчёта от {state['run_at']} с user_id > {after_user_id}")
+    else:
+        after_user_id = 0
+        run_at = datetime.utcnow()
+        state = {"run_at": run_at.isoformat(), "last_user_id": 0, "finished": False}
+
+    diff_file = diff_writer = None
+    if args.dry_run and args.diff_output:
+        diff_file = open(args.diff_output, "w", encoding="utf-8", newline="")
+        diff_writer = csv.writer(diff_file)
+        diff_writer.writerow(("user_id", "old_score", "new_score", "delta"))
+
+    pool = None
+    if args.workers > 1:
+        pool = ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(scorer,))
+        # Пока пул считает, читается следующая порция
+        max_pending = args.workers + 1
+    else:
+        _init_worker(scorer)
+        max_pending = 1
+
+    pending = deque()
+    exhausted = False
+    users_at_start = stats["users_read"]
+    start = time.perf_counter()
+    try:
+        while True:
+            if not exhausted:
+                read_start = time.perf_counter()
+                chunk = read_chunk(session, after_user_id, args.chunk_size, stats)
+                timings["read"] += time.perf_counter() - read_start
+                if chunk is None:
+                    exhausted = True
+                else:
+                    after_user_id = chunk["last_user_id"]
+                    future = pool.submit(score_chunk, chunk) if pool is not None else None
+                    pending.append((chunk, future))
+            if not pending:
+                break
+            if not exhausted and len(pending) < max_pending:
+                continue
+
+            chunk, future = pending.popleft()
+            score_start = time.perf_counter()
+            total_scores, codes = future.result() if future is not None else score_chunk(chunk)
+            timings["score"] += time.perf_counter() - score_start
+            stats["users_scored"] += len(total_scores)
+
+            write_start = time.perf_counter()
+            if args.dry_run:
+                diff_results(session, chunk, total_scores, diff, diff_writer)
+            else:
+                stats["results_written"] += write_results(session, chunk["user_ids"], total_scores, codes, run_at)
+                state.update(stats, last_user_id=chunk["last_user_id"])
+                save_checkpoint(args.checkpoint, state)
+            timings["write"] += time.perf_counter() - write_start
+
+            elapsed = time.perf_counter() - start
+            rate = (stats["users_read"] - users_at_start) / elapsed if elapsed else 0.0
+            print(f"user_id до {chunk['last_user_id']}: прочитано {stats['users_read']}, "
+                  f"пересчитано {stats['users_scored']}, {rate:.0f} польз./с")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if diff_file is not None:
+            diff_file.close()
+        session.close()
+
+    elapsed = time.perf_counter() - start
+    if not args.dry_run:
+        state.update(stats, finished=True)
+        save_checkpoint(args.checkpoint, state)
+
+    users = stats["users_read"] - users_at_start
+    print(f"\nпользователей: {stats['users_read']}, пересчитано: {stats['users_scored']}, "
+          f"без данных о здоровье: {stats['skipped_no_data']}, с некорректными данными: {stats['skipped_invalid']}")
+    print(f"время: {elapsed:.2f} с, {users / elapsed if elapsed else 0:.0f} польз./с "
+          f"(чтение {timings['read']:.2f} с, ожидание расчёта {timings['score']:.2f} с, "
+          f"{'сравнение' if args.dry_run else 'запись'} {timings['write']:.2f} с)")
+    if args.dry_run:
+        print_diff(diff, args.diff_output)
+    else:
+        print(f"записано результатов: {stats['results_written']}")
+    return 0
+
+
+def print_diff(diff: dict, output: str = None):
+    changed = diff["changed"]
+    mean_delta = diff["abs_delta_sum"] / changed if changed else 0.0
+    print(f"\nсравнено с последним результатом: {diff['compared']}, изменилось: {changed} "
+          f"(среднее |изменение| {mean_delta:.2f}), без прежнего результата: {diff['new']}")
+    if diff["top"]:
+        print(f"\n{'user_id':>10} {'было':>8} {'стало':>8} {'изм.':>8}")
+        for _, user_id, old_score, score in sorted(diff["top"], reverse=True):
+            print(f"{user_id:>10} {old_score:>8.1f} {score:>8.1f} {score - old_score:>+8.1f}")
+    if output:
+        print(f"\nсравнение по пользователям записано в {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пересчёт баллов всех пользователей")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="пользователей в порции")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="процессов для расчёта (1 — без пула)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="файл контрольной точки")
+    parser.add_argument("--resume", action="store_true", help="продолжить с контрольной точки")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не записывать, сравнить с последними результатами")
+    parser.add_argument("--diff-output", help="CSV со сравнением по пользователям (для --dry-run)")
+    args = parser.parse_args(argv)
+    if args.dry_run and args.resume:
+        parser.error("--dry-run нельзя совмещать с --resume")
+
+    setup_logging()
+    try:
+        return run(args)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from backend.db.models import UserAnswer, UserAnswerHistory
+
+# Текущие ответы пользователя хранятся по одному на вопрос (уникальность
+# user_id + question_id), повторная отправка перезаписывает их одним
+# INSERT ... ON CONFLICT DO UPDATE. Все отправленные ответы дополнительно
+# пишутся в user_answer_history, если история включена.
+
+ANSWER_HISTORY_ENABLED = os.getenv("ANSWER_HISTORY_ENABLED", "1") == "1"
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def save_user_answers(db: Session, user_id: int, answers, health_data_id: int = None):
+    # answers — список (question_id, ответ); ответ None означает "Не знаю"
+    if not answers:
+        return
+    rows = [{"user_id": user_id, "question_id": question_id, "answer": answer} for question_id, answer in answers]
+    # Выполняем через соединение сессии (Core executemany): ORM bulk insert пропускает
+    # ключи со значением None и дробит пачку на несколько запросов
+    conn = db.connection()
+
+    dialect_insert = _UPSERT_DIALECTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(UserAnswer)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserAnswer.user_id, UserAnswer.question_id],
+            set_={"answer": stmt.excluded.answer},
+        )
+        conn.execute(stmt, rows)
+    else:
+        # Без ON CONFLICT: удаляем прежние ответы на эти вопросы и вставляем новые
+        conn.execute(
+            delete(UserAnswer)
+            .where(UserAnswer.user_id == user_id)
+            .where(UserAnswer.question_id.in_([row["question_id"] for row in rows]))
+        )
+        conn.execute(insert(UserAnswer), rows)
+
+    if ANSWER_HISTORY_ENABLED:
+        created_at = datetime.utcnow()
+        conn.execute(insert(UserAnswerHistory), [
+            dict(row, health_data_id=health_data_id, created_at=created_at) for row in rows
+        ])
+
+
+def get_current_answers(db: Session, user_id: int):
+    # Текущий набор ответов пользователя (прежние + перезаписанные) парами
+    # (question_id, ответ); внутри транзакции отправки видит только что записанные строки
+    rows = db.execute(
+        select(UserAnswer.question_id, UserAnswer.answer).where(UserAnswer.user_id == user_id)
+    ).all()
+    return [(row.question_id, row.answer) for row in rows]
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from backend.db.models import User
+
+# Кэши для get_current_user: проверенные JWT -> claims и пользователи по id.
+# Оба ограничены по размеру (LRU), пользователи дополнительно живут недолго (TTL),
+# чтобы изменения, сделанные в обход API, подхватывались без перезапуска.
+
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "4096"))
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))  # сек
+
+
+class TokenCache:
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()  # token -> claims
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            claims = self._items.get(token)
+            if claims is None:
+                return None
+            # Истёкший токен больше не считается проверенным
+            exp = claims.get("exp")
+            if exp is not None and exp <= time.time():
+                del self._items[token]
+                return None
+            self._items.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        with self._lock:
+            self._items[token] = claims
+            self._items.move_to_end(token)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class UserCache:
+    # Хранит значения колонок пользователя, а не ORM-объект: объект сессии
+    # нельзя разделять между запросами. При попадании объект собирается заново
+    # и присоединяется к сессии запроса через merge(load=False) без SELECT.
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # user_id -> (values, expires_at)
+        self._ids_by_email = {}
+        self._lock = threading.Lock()
+
+    def get_by_email(self, db: Session, email: str):
+        with self._lock:
+            user_id = self._ids_by_email.get(email)
+            entry = self._items.get(user_id) if user_id is not None else None
+            if entry is None:
+                return None
+            values, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(user_id)
+                return None
+            self._items.move_to_end(user_id)
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, user: User):
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            self._remove(user.id)
+            self._items[user.id] = (values, time.monotonic() + self.ttl)
+            self._ids_by_email[user.email] = user.id
+            while len(self._items) > self.max_size:
+                oldest_id = next(iter(self._items))
+                self._remove(oldest_id)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        entry = self._items.pop(user_id, None)
+        if entry is not None:
+            values, _ = entry
+            if self._ids_by_email.get(values["email"]) == user_id:
+                del self._ids_by_email[values["email"]]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._ids_by_email.clear()
+
+
+class AuthStats:
+    # Накладные расходы аутентификации на запрос
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.token_cache_hits = 0
+        self.user_cache_hits = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds: float, token_hit: bool, user_hit: bool):
+        with self._lock:
+            self.requests += 1
+            self.token_cache_hits += token_hit
+            self.user_cache_hits += user_hit
+            self.total_seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests = self.requests
+            return {
+                "requests": requests,
+                "token_cache_hits": self.token_cache_hits,
+                "user_cache_hits": self.user_cache_hits,
+                "avg_auth_ms": round(self.total_seconds / requests * 1000, 4) if requests else 0.0,
+                "total_auth_seconds": round(self.total_seconds, 4),
+            }
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
+auth_stats = AuthStats()
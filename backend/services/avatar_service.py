@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+# Загрузка фото профиля: файл читается частями с ограничением размера и
+# проверкой сигнатуры формата, затем в отдельном пуле потоков уменьшается до
+# квадратных миниатюр фиксированных размеров. Оригинал не хранится (в том числе
+# его EXIF). Имена миниатюр содержат хэш содержимого, поэтому файл по одному
+# адресу никогда не меняется и может кэшироваться браузером бессрочно.
+
+AVATAR_DIR = "uploads/avatars"
+AVATAR_URL_PREFIX = "/uploads/avatars"
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+# Предел всего тела запроса загрузки: файл плюс запас на заголовки multipart
+AVATAR_MAX_REQUEST_BYTES = AVATAR_MAX_BYTES + 64 * 1024
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", str(40_000_000)))  # защита от "бомб" распаковки
+AVATAR_CHUNK_SIZE = 64 * 1024
+# Размеры миниатюр в пикселях; первый — основной, его путь хранится в users.avatar_path
+AVATAR_SIZES = (256, 64)
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", str(os.cpu_count() or 2)))
+
+# Сигнатуры (magic bytes) допустимых форматов
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+)
+
+# Маршруты загрузки и предел размера тела запроса
+UPLOAD_SIZE_LIMITS = {
+    ("POST", "/api/users/upload-avatar"): AVATAR_MAX_REQUEST_BYTES,
+}
+
+_AVATAR_NAME = re.compile(r"^user_(\d+)_([0-9a-f]{16})_\d+\.jpg$")
+
+
+class AvatarError(Exception):
+    pass
+
+
+class AvatarTooLarge(AvatarError):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    # ASGI middleware: multipart-парсер Starlette сохраняет файл целиком ещё до
+    # вызова обработчика, поэтому размер тела ограничивается при чтении из receive.
+    # Content-Length проверяется сразу, а запрос без него (Transfer-Encoding: chunked)
+    # обрывается с 413, как только прочитано больше предела
+    def __init__(self, app, limits=None):
+        self.app = app
+        self.limits = UPLOAD_SIZE_LIMITS if limits is None else limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": "Image is too large"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Обрабатывается как HTTPException приложения (и при разборе формы)
+                    raise HTTPException(status_code=413, detail="Image is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def detect_image_format(head: bytes):
+    for signature, image_format in _SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def avatar_url(user_id: int, digest: str, size: int) -> str:
+    return f"{AVATAR_URL_PREFIX}/user_{user_id}_{digest}_{size}.jpg"
+
+
+def _avatar_file(url: str):
+    # Путь к файлу по адресу из avatar_path; только внутри AVATAR_DIR
+    if not url or not url.startswith(AVATAR_URL_PREFIX + "/"):
+        return None
+    return os.path.join(AVATAR_DIR, os.path.basename(url))
+
+
+class AvatarProcessor:
+    def __init__(self, workers: int = AVATAR_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatar")
+        self._user_locks = weakref.WeakValueDictionary()  # user_id -> asyncio.Lock
+
+    def user_lock(self, user_id: int) -> asyncio.Lock:
+        # Загрузки одного пользователя выполняются по очереди: миниатюры с одним хэшем
+        # общие для повторных загрузок того же изображения, и удаление файлов одной
+        # загрузки (ошибка, прежний аватар) не должно задевать файлы, на которые
+        # ссылается другая. Блокировка действует в пределах процесса
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def save_upload(self, upload, user_id: int) -> dict:
+        # Потоковое чтение во временный файл с подсчётом размера и хэша.
+        # Возвращает адреса миниатюр {размер: url}
+        fd, tmp_path = tempfile.mkstemp(dir=AVATAR_DIR, prefix=".upload_")
+        try:
+            digest = hashlib.sha256()
+            total = 0
+            with os.fdopen(fd, "wb") as tmp_file:
+                while True:
+                    chunk = await upload.read(AVATAR_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if total == 0 and detect_image_format(chunk[:16]) is None:
+                        raise AvatarError("Only JPEG, PNG, GIF and WebP images are allowed")
+                    total += len(chunk)
+                    if total > AVATAR_MAX_BYTES:
+                        raise AvatarTooLarge(f"Image is larger than {AVATAR_MAX_BYTES} bytes")
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp_file.write, chunk)
+            if total == 0:
+                raise AvatarError("Empty file")
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, _make_thumbnails, tmp_path, user_id, digest.hexdigest()[:16]
+            )
+        finally:
+            os.unlink(tmp_path)
+
+    def discard(self, urls):
+        for url in urls:
+            path = _avatar_file(url)
+            if path is not None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+def _make_thumbnails(source_path: str, user_id: int, digest: str) -> dict:
+    # Pillow нужен только при загрузке аватара, импорт — в потоке пула
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source_path) as image:
+            if detect_image_format(_read_head(source_path)) != image.format:
+                raise AvatarError("File content does not match its image format")
+            if image.width * image.height > AVATAR_MAX_PIXELS:
+                raise AvatarError("Image dimensions are too large")
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                # Прозрачный фон заменяется белым
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+                image = background
+
+            urls = {}
+            created = []  # файлы, которых не было до этой загрузки
+            try:
+                for size in AVATAR_SIZES:
+                    url = avatar_url(user_id, digest, size)
+                    path = _avatar_file(url)
+                    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                    # Запись во временный файл и атомарная замена: файл по адресу
+                    # всегда либо отсутствует, либо записан полностью
+                    fd, tmp_path = tempfile.mkstemp(dir=AVATAR_DIR, prefix=".thumb_")
+                    try:
+                        with os.fdopen(fd, "wb") as tmp_file:
+                            thumbnail.save(tmp_file, "JPEG", quality=85, optimize=True)
+                        existed = os.path.exists(path)
+                        os.replace(tmp_path, path)
+                    except BaseException:
+                        os.unlink(tmp_path)
+                        raise
+                    if not existed:
+                        created.append(path)
+                    urls[size] = url
+            except BaseException:
+                # Ошибка на одном из размеров: уже записанные новые миниатюры удаляются.
+                # Совпадающие по хэшу файлы прежнего аватара остаются на месте
+                for path in created:
+                    os.remove(path)
+                raise
+            return urls
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise AvatarError(f"Invalid image: {e}")
+
+
+def _read_head(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(16)
+
+
+def avatar_digest(url: str):
+    # Хэш содержимого из адреса миниатюры; None для аватаров без миниатюр
+    match = _AVATAR_NAME.match(os.path.basename(url or ""))
+    return match.group(2) if match else None
+
+
+def avatar_urls(avatar_path: str):
+    # Все файлы аватара по пути основной миниатюры (для удаления прежнего аватара)
+    path = _avatar_file(avatar_path)
+    if path is None:
+        return []
+    match = _AVATAR_NAME.match(os.path.basename(path))
+    if match is None:
+        # Аватар, загруженный до появления миниатюр, — один файл
+        return [avatar_path]
+    user_id, digest = int(match.group(1)), match.group(2)
+    return [avatar_url(user_id, digest, size) for size in AVATAR_SIZES]
+
+
+avatar_processor = AvatarProcessor()
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from backend.services.provider_health import provider_health
+from backend.services.metrics import record_llm_attempt
+
+logger = logging.getLogger(__name__)
+
+# Модели для генерации рекомендаций. Запускаются одновременно,
+# побеждает первый непустой ответ.
+models_to_try = [
+    "gpt-4", "gpt-4o", "gpt-3.5-turbo",
+    "claude-3.5-sonnet",
+    "llama-3.2-11b", "mixtral-8x22b",
+]
+
+# Таймаут на одну модель, сек
+MODEL_TIMEOUT = float(os.getenv("LLM_MODEL_TIMEOUT", "60"))
+# Сколько ждать следующего фрагмента потока, прежде чем перейти к другой модели, сек
+STREAM_STALL_TIMEOUT = float(os.getenv("LLM_STREAM_STALL_TIMEOUT", "15"))
+
+
+class RecommendationError(Exception):
+    pass
+
+
+class LLMProvider:
+    # Интерфейс поставщика LLM: по имени модели и промпту вернуть текст ответа
+    async def complete(self, model: str, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, model: str, prompt: str):
+        # Потоковая генерация по фрагментам; по умолчанию — весь ответ одним фрагментом
+        yield await self.complete(model, prompt)
+
+
+_chat_completion = None
+
+
+def _load_chat_completion():
+    # g4f и его реестр моделей импортируются при первом обращении к LLM,
+    # а не при импорте приложения (холодный старт, fork воркеров)
+    global _chat_completion
+    if _chat_completion is None:
+        from g4f import ChatCompletion
+        _chat_completion = ChatCompletion
+    return _chat_completion
+
+
+class G4FProvider(LLMProvider):
+    async def complete(self, model: str, prompt: str) -> str:
+        ChatCompletion = _chat_completion or await asyncio.to_thread(_load_chat_completion)
+        return await ChatCompletion.create_async(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+
+    async def stream(self, model: str, prompt: str):
+        # Синхронный генератор g4f читается в отдельном потоке,
+        # фрагменты передаются в цикл событий через очередь
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        finished = object()
+
+        def produce():
+            try:
+                ChatCompletion = _load_chat_completion()
+                for chunk in ChatCompletion.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                ):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield str(item)
+        finally:
+            stop.set()
+
+
+class FakeLLMProvider(LLMProvider):
+    # Локальная заглушка для тестов и бенчмарков.
+    # latency — задержка в секундах (число или словарь {модель: задержка}),
+    # failures — модели, которые всегда падают, failure_rate — доля случайных ошибок.
+    # Для потоковой генерации: chunk_size — размер фрагмента в символах,
+    # chunk_delay — пауза между фрагментами, stalls — модели, которые "зависают"
+    # после первого фрагмента.
+    def __init__(self, response="Тестовая рекомендация", latency=0.0, failures=(), failure_rate=0.0,
+                 chunk_size=8, chunk_delay=0.0, stalls=()):
+        self.response = response
+        self.latency = latency
+        self.failures = set(failures)
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.stalls = set(stalls)
+        self.calls = []
+
+    def _latency_for(self, model):
+        if isinstance(self.latency, dict):
+            return self.latency.get(model, 0.0)
+        return self.latency
+
+    async def complete(self, model: str, prompt: str) -> str:
+        self.calls.append(model)
+        await asyncio.sleep(self._latency_for(model))
+        if model in self.failures or random.random() < self.failure_rate:
+            raise RuntimeError(f"Fake model {model} failed")
+        return self.response
+
+    async def stream(self, model: str, prompt: str):
+        self.calls.append(model)
+        await asyncio.sleep(self._latency_for(model))
+        if model in self.failures or random.random() < self.failure_rate:
+            raise RuntimeError(f"Fake model {model} failed")
+        for start in range(0, len(self.response), self.chunk_size):
+            yield self.response[start:start + self.chunk_size]
+            if model in self.stalls:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.chunk_delay)
+
+
+_provider: LLMProvider = G4FProvider()
+
+
+def get_llm_provider() -> LLMProvider:
+    return _provider
+
+
+def set_llm_provider(provider: LLMProvider):
+    global _provider
+    _provider = provider
+
+
+async def _attempt(provider, model, prompt, timeout):
+    # Пробный запрос восстанавливающейся модели мог занять другой вызов
+    if not provider_health.acquire(model):
+        raise RecommendationError(f"{model}: модель временно недоступна")
+    start = time.monotonic()
+    try:
+        try:
+            response = await asyncio.wait_for(provider.complete(model, prompt), timeout)
+        except asyncio.TimeoutError:
+            raise RecommendationError(f"{model}: превышено время ожидания ({timeout} сек)")
+        except Exception as e:
+            raise RecommendationError(f"{model}: {e}") from e
+
+        if not response or not isinstance(response, str) or not response.strip():
+            raise RecommendationError(f"{model}: пустой ответ")
+    except RecommendationError:
+        provider_health.record_failure(model, time.monotonic() - start)
+        record_llm_attempt(model, "failure", time.monotonic() - start)
+        raise
+    except asyncio.CancelledError:
+        # Проигравшие гонку запросы не считаются ошибкой модели
+        provider_health.release(model)
+        record_llm_attempt(model, "cancelled", time.monotonic() - start)
+        raise
+
+    provider_health.record_success(model, time.monotonic() - start)
+    record_llm_attempt(model, "success", time.monotonic() - start)
+    return model, response
+
+
+async def race_models(prompt: str, provider: LLMProvider = None, models=None, timeout: float = None) -> str:
+    # Запускает все модели одновременно, возвращает первый удачный ответ
+    # и отменяет остальные запросы.
+    provider = provider or get_llm_provider()
+    # Модели с открытым выключателем пропускаются, остальные — по ожидаемой задержке
+    models = provider_health.candidates(models if models is not None else models_to_try)
+    timeout = timeout if timeout is not None else MODEL_TIMEOUT
+    if not models:
+        raise RecommendationError("Не удалось получить рекомендацию: все модели временно недоступны")
+
+    tasks = [asyncio.create_task(_attempt(provider, model, prompt, timeout)) for model in models]
+    last_exception = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                model, response = await next_done
+            except RecommendationError as e:
+                last_exception = e
+                logger.warning("Ошибка при вызове модели: %s", e)
+                continue
+            logger.info("Модель ответила", extra={"model": model})
+            return response
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Дожидаемся отмены, чтобы не оставлять "висящие" задачи
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    raise RecommendationError(f"Не удалось получить рекомендацию. Последняя ошибка: {last_exception}")
+
+
+async def stream_models(prompt: str, provider: LLMProvider = None, models=None, stall_timeout: float = None):
+    # Потоковая генерация с переходом к следующей модели, если поток упал или
+    # завис дольше stall_timeout. Возвращает события (тип, данные):
+    # ("model", имя) — начата модель, ("chunk", текст) — фрагмент,
+    # ("reset", причина) — уже отданные фрагменты недействительны, ("done", весь текст).
+    provider = provider or get_llm_provider()
+    models = provider_health.candidates(models if models is not None else models_to_try)
+    stall_timeout = stall_timeout if stall_timeout is not None else STREAM_STALL_TIMEOUT
+
+    last_exception = RecommendationError("все модели временно недоступны")
+    for model in models:
+        # Модели пробуются по очереди, поэтому пробный запрос занимается только
+        # для той, к которой действительно обращаемся
+        if not provider_health.acquire(model):
+            continue
+        chunks = []
+        stream = None
+        start = time.monotonic()
+        succeeded = False
+        failure = None
+        try:
+            yield "model", model
+            stream = provider.stream(model, prompt)
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), stall_timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk:
+                    chunks.append(chunk)
+                    yield "chunk", chunk
+        except asyncio.TimeoutError:
+            failure = RecommendationError(f"{model}: поток завис более {stall_timeout} сек")
+        except Exception as e:
+            failure = RecommendationError(f"{model}: {e}")
+        else:
+            text = "".join(chunks)
+            if text.strip():
+                succeeded = True
+            else:
+                failure = RecommendationError(f"{model}: пустой ответ")
+        finally:
+            if stream is not None:
+                await stream.aclose()
+            elapsed = time.monotonic() - start
+            if succeeded:
+                provider_health.record_success(model, elapsed)
+                record_llm_attempt(model, "success", elapsed)
+            elif failure is not None:
+                provider_health.record_failure(model, elapsed)
+                record_llm_attempt(model, "failure", elapsed)
+            else:
+                # Клиент отключился посреди потока — модель не виновата
+                provider_health.release(model)
+                record_llm_attempt(model, "cancelled", elapsed)
+
+        if succeeded:
+            logger.info("Модель ответила (поток)", extra={"model": model})
+            yield "done", text
+            return
+
+        last_exception = failure
+        logger.warning("Ошибка при вызове модели: %s", failure)
+        if chunks:
+            yield "reset", str(failure)
+
+    raise RecommendationError(f"Не удалось получить рекомендацию. Последняя ошибка: {last_exception}")
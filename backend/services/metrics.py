@@ -0,0 +1,254 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Метрики процесса в текстовом формате Prometheus (GET /metrics):
+# счётчики, гистограммы и gauge, значение которых читается в момент запроса.
+# Запись метрики — несколько операций под коротким lock, без аллокаций строк;
+# при METRICS_ENABLED=0 span() и middleware ничего не делают.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Границы корзин гистограмм латентности, сек
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # значения меток -> [счётчики по корзинам..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            items = [(label_values, list(series)) for label_values, series in self._series.items()]
+        bucket_labels = self.labels + ("le",)
+        for label_values, series in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = _format_labels(bucket_labels, label_values + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(series[-2])}"
+            yield f"{self.name}_count{labels} {series[-1]}"
+
+
+class GaugeCallback:
+    # Значение вычисляется при каждом запросе /metrics
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def collect(self):
+        value = self.callback()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge_callback(self, name, documentation, callback):
+        return self.register(GaugeCallback(name, documentation, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route", "status"))
+span_duration = registry.histogram(
+    "span_duration_seconds", "Время этапов обработки запроса", ("span",))
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ("operation",))
+llm_attempts = registry.counter(
+    "llm_attempts_total", "Обращения к моделям LLM по результату", ("model", "outcome"))
+llm_attempt_duration = registry.histogram(
+    "llm_attempt_duration_seconds", "Время обращения к модели LLM", ("model", "outcome"))
+
+
+@contextmanager
+def _span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_duration.observe(time.perf_counter() - start, name)
+
+
+_NOOP = nullcontext()
+
+
+def span(name: str):
+    # with span("score.calculate"): ... — время этапа в span_duration_seconds
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _span(name)
+
+
+def record_llm_attempt(model: str, outcome: str, seconds: float):
+    # outcome: success, failure или cancelled
+    if not METRICS_ENABLED:
+        return
+    llm_attempts.inc(model, outcome)
+    llm_attempt_duration.observe(seconds, model, outcome)
+
+
+def instrument_engine(engine):
+    # Время SQL-запросов по типу операции и состояние пула соединений
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "metrics_query_start", None)
+        if start is not None:
+            words = statement.split(None, 1)
+            operation = words[0].upper() if words else "OTHER"
+            db_query_duration.observe(time.perf_counter() - start, operation)
+
+    pool = engine.pool
+    for name, documentation, attribute in (
+        ("db_pool_size", "Размер пула соединений", "size"),
+        ("db_pool_checked_out", "Соединения, выданные из пула", "checkedout"),
+        ("db_pool_checked_in", "Свободные соединения в пуле", "checkedin"),
+        ("db_pool_overflow", "Соединения сверх размера пула", "overflow"),
+    ):
+        method = getattr(pool, attribute, None)
+        if method is not None:
+            registry.gauge_callback(name, documentation, method)
+
+
+class MetricsMiddleware:
+    # ASGI middleware: латентность запросов по шаблону маршрута (/api/results,
+    # а не /api/results?cursor=...), чтобы число временных рядов было ограничено
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe(
+                time.perf_counter() - start, scope["method"], _route_label(scope, root_path), status_code
+            )
+
+
+def _route_label(scope, root_path: str) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is not None:
+        # Шаблон маршрута не содержит префикса include_router (/api), берём его из пути запроса
+        depth = template.count("/")
+        segments = scope["path"].split("/")
+        prefix = "/".join(segments[:-depth]) if depth < len(segments) else ""
+        return prefix + template
+    # Смонтированные приложения (например, /uploads) — одна метка на всё приложение
+    mounted = scope.get("root_path", "")
+    if mounted != root_path:
+        return mounted + "/*"
+    return "unmatched"
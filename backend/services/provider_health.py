@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Учёт состояния моделей LLM: скользящая доля успехов и латентность,
+# автоматический выключатель (circuit breaker) и порядок моделей по ожидаемой задержке.
+#
+# closed    — модель используется как обычно;
+# open      — после CIRCUIT_FAILURE_THRESHOLD ошибок подряд модель пропускается
+#             CIRCUIT_OPEN_SECONDS секунд;
+# half_open — по истечении этого времени пропускается один пробный запрос:
+#             успех закрывает выключатель, ошибка снова открывает его.
+#
+# candidates() только отбирает и упорядочивает модели; пробный запрос занимается
+# через acquire() непосредственно перед вызовом модели и освобождается через
+# record_success / record_failure / release.
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "60"))
+HEALTH_WINDOW = int(os.getenv("LLM_HEALTH_WINDOW", "20"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ModelHealth:
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)  # (успех, латентность в секундах)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    @property
+    def success_rate(self):
+        if not self.outcomes:
+            return None
+        return sum(ok for ok, _ in self.outcomes) / len(self.outcomes)
+
+    @property
+    def avg_latency(self):
+        latencies = [latency for ok, latency in self.outcomes if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def expected_latency(self):
+        # Средняя задержка удачного ответа с поправкой на долю ошибок.
+        # Модели без истории считаются самыми быстрыми, чтобы о них собралась статистика.
+        if not self.outcomes:
+            return 0.0
+        rate = self.success_rate
+        latency = self.avg_latency
+        if latency is None:
+            return float("inf")
+        return latency / max(rate, 0.05)
+
+
+class ProviderHealthTracker:
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, window: int = HEALTH_WINDOW):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.window = window
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model):
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = ModelHealth(self.window)
+        return health
+
+    def _allow(self, health, now):
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN and now - health.opened_at >= self.open_seconds:
+            health.state = HALF_OPEN
+        return health.state == HALF_OPEN and not health.probe_in_flight
+
+    def candidates(self, models):
+        # Модели, которые можно вызывать сейчас, в порядке ожидаемой задержки.
+        # При равенстве сохраняется исходный приоритет из models_to_try.
+        now = time.monotonic()
+        with self._lock:
+            allowed = [
+                (self._health(model).expected_latency(), index, model)
+                for index, model in enumerate(models)
+                if self._allow(self._health(model), now)
+            ]
+        return [model for _, _, model in sorted(allowed)]
+
+    def acquire(self, model) -> bool:
+        # Вызывается перед обращением к модели. Для half_open занимает единственный
+        # пробный запрос; False — модель сейчас вызывать нельзя
+        now = time.monotonic()
+        with self._lock:
+            health = self._health(model)
+            if not self._allow(health, now):
+                return False
+            if health.state == HALF_OPEN:
+                health.probe_in_flight = True
+            return True
+
+    def record_success(self, model, latency: float):
+        with self._lock:
+            health = self._health(model)
+            health.outcomes.append((True, latency))
+            health.consecutive_failures = 0
+            health.state = CLOSED
+            health.opened_at = None
+            health.probe_in_flight = False
+
+    def record_failure(self, model, latency: float):
+        with self._lock:
+            health = self._health(model)
+            health.outcomes.append((False, latency))
+            health.consecutive_failures += 1
+            health.probe_in_flight = False
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def release(self, model):
+        # Пробный запрос отменён без результата (например, проиграл гонку)
+        with self._lock:
+            self._health(model).probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    "state": health.state,
+                    "success_rate": health.success_rate,
+                    "avg_latency": health.avg_latency,
+                    "expected_latency": _finite(health.expected_latency()),
+                    "consecutive_failures": health.consecutive_failures,
+                    "samples": len(health.outcomes),
+                    "open_for": max(self.open_seconds - (now - health.opened_at), 0) if health.state == OPEN else None,
+                }
+                for model, health in self._models.items()
+            }
+
+
+def _finite(value):
+    return None if value == float("inf") else value
+
+
+provider_health = ProviderHealthTracker()
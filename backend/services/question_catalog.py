@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import select
+import threading
+from types import MappingProxyType
+from typing import NamedTuple
+
+from sqlalchemy.orm import Session
+from backend.db.connection import engine, SessionLocal
+from backend.db.models import Question
+from backend.calculations.answer_scorer import CompiledAnswerScorer
+
+# Каталог вопросов в памяти процесса. Вопросы меняются редко, поэтому
+# /questions и расчёты читают их отсюда, а не из таблицы questions.
+# Каталог неизменяемый: при обновлении создаётся новый объект с новой версией.
+
+logger = logging.getLogger(__name__)
+
+# Канал Postgres LISTEN/NOTIFY, в который пишет триггер на таблице questions
+# (создаётся миграцией 0004_questions_notify_trigger)
+QUESTIONS_CHANNEL = "questions_changed"
+
+
+class CatalogQuestion(NamedTuple):
+    id: int
+    question_text: str
+    weight: float
+    category: str
+    positive_uns: bool
+
+
+class QuestionCatalog:
+    __slots__ = ("version", "questions", "by_id", "etag", "scorer")
+
+    def __init__(self, version: int, questions):
+        questions = tuple(sorted(questions, key=lambda q: q.id))
+        payload = json.dumps([q._asdict() for q in questions], ensure_ascii=False, sort_keys=True)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "questions", questions)
+        object.__setattr__(self, "by_id", MappingProxyType({q.id: q for q in questions}))
+        # ETag зависит только от содержимого, поэтому совпадает во всех процессах
+        object.__setattr__(self, "etag", '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20] + '"')
+        # Массивы весов и полярности для расчёта баллов за опросник
+        object.__setattr__(self, "scorer", CompiledAnswerScorer(questions))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionCatalog is immutable")
+
+    def get(self, question_id: int):
+        return self.by_id.get(question_id)
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def load_question_catalog(db: Session = None) -> QuestionCatalog:
+    # Загрузка каталога из БД и замена текущего
+    global _catalog
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        rows = db.query(Question).all()
+        questions = [
+            CatalogQuestion(q.id, q.question_text, float(q.weight), q.category, bool(q.positive_uns))
+            for q in rows
+        ]
+    finally:
+        if own_session:
+            db.close()
+
+    with _lock:
+        version = _catalog.version + 1 if _catalog is not None else 1
+        _catalog = QuestionCatalog(version, questions)
+        logger.info("Каталог вопросов загружен: версия %s, вопросов %s", version, len(questions))
+        return _catalog
+
+
+def get_question_catalog() -> QuestionCatalog:
+    catalog = _catalog
+    if catalog is None:
+        catalog = load_question_catalog()
+    return catalog
+
+
+class QuestionChangeListener:
+    # Фоновый поток, который перезагружает каталог по уведомлению из Postgres
+    def __init__(self, poll_interval: float = 5.0):
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if engine.dialect.name != "postgresql":
+            return
+        self._thread = threading.Thread(target=self._run, name="question-catalog-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Ошибка подписки на изменения вопросов")
+                self._stop.wait(self.poll_interval)
+
+    def _listen(self):
+        raw = engine.raw_connection()
+        try:
+            dbapi_conn = raw.driver_connection
+            if hasattr(dbapi_conn, "set_isolation_level"):
+                # psycopg2
+                dbapi_conn.set_isolation_level(0)
+                dbapi_conn.cursor().execute(f"LISTEN {QUESTIONS_CHANNEL}")
+                while not self._stop.is_set():
+                    if select.select([dbapi_conn], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    if dbapi_conn.notifies:
+                        dbapi_conn.notifies.clear()
+                        load_question_catalog()
+            else:
+                # psycopg 3
+                dbapi_conn.autocommit = True
+                dbapi_conn.execute(f"LISTEN {QUESTIONS_CHANNEL}")
+                while not self._stop.is_set():
+                    if any(True for _ in dbapi_conn.notifies(timeout=self.poll_interval)):
+                        load_question_catalog()
+        finally:
+            raw.invalidate()
+
+
+question_listener = QuestionChangeListener()
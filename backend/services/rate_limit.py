@@ -0,0 +1,250 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from backend.auth import SECRET_KEY, ALGORITHM
+from backend.services.auth_cache import token_cache
+from backend.services.metrics import METRICS_ENABLED, registry
+
+# Ограничение частоты запросов к дорогим маршрутам: генерация рекомендаций
+# (до шести внешних моделей на вызов) и отправка данных (несколько строк в БД).
+# Для каждого правила — token bucket на пользователя и общий на все запросы;
+# запрос проходит, только если токен есть в обоих, иначе 429 с Retry-After.
+# Общий bucket расходуют только запросы с действительным JWT: запросы без него
+# (на них эндпоинт ответит 401) ограничиваются отдельным небольшим bucket'ом
+# на адрес клиента и не могут исчерпать лимит пользователей.
+#
+# RATE_LIMIT_ENABLED   — 0 выключает ограничения (нагрузочные тесты)
+# RATE_LIMIT_BACKEND   — memory (один процесс, по умолчанию) или redis
+#                        (общие счётчики для нескольких воркеров, RATE_LIMIT_REDIS_URL)
+# RATE_LIMITS          — JSON с переопределением лимитов правил, например
+#                        {"llm": {"user": "10/60", "global": "100/60", "anonymous": "5/60"}}
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+MEMORY_MAX_KEYS = int(os.getenv("RATE_LIMIT_MEMORY_MAX_KEYS", "100000"))
+
+
+class Limit(NamedTuple):
+    capacity: float  # запросов подряд (размер bucket)
+    rate: float  # восполнение, токенов в секунду
+
+
+def parse_limit(value: str) -> Limit:
+    # "5/60" — 5 запросов за 60 секунд, не более 5 подряд
+    count, seconds = value.split("/")
+    count, seconds = float(count), float(seconds)
+    if count < 1 or seconds <= 0:
+        raise ValueError(f"Некорректный лимит: {value}")
+    return Limit(count, count / seconds)
+
+
+# Лимиты правил: на пользователя, общий и на адрес клиента без действительного
+# токена (None — не ограничивать)
+DEFAULT_RATE_LIMITS = {
+    "llm": {"user": "5/60", "global": "60/60", "anonymous": "10/60"},
+    "submit": {"user": "20/60", "global": "600/60", "anonymous": "20/60"},
+}
+
+# Маршруты и правила; маршруты одного правила расходуют общие токены
+RATE_LIMIT_ROUTES = {
+    ("POST", "/api/generate_recommendation"): "llm",
+    ("POST", "/api/generate_recommendation/stream"): "llm",
+    ("POST", "/api/submit_health_data"): "submit",
+}
+
+
+def load_rate_limits(overrides: str = None) -> dict:
+    rules = {name: dict(limits) for name, limits in DEFAULT_RATE_LIMITS.items()}
+    overrides = overrides if overrides is not None else os.getenv("RATE_LIMITS")
+    if overrides:
+        for name, limits in json.loads(overrides).items():
+            rules.setdefault(name, {}).update(limits)
+    return {
+        name: {scope: parse_limit(value) for scope, value in limits.items() if value}
+        for name, limits in rules.items()
+    }
+
+
+class MemoryRateLimitBackend:
+    # Bucket'ы в памяти процесса; токены восполняются лениво при обращении
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (токены, время обновления, время полного восполнения)
+        self._lock = threading.Lock()
+
+    async def acquire(self, buckets) -> float:
+        return self.try_acquire(buckets, time.monotonic())
+
+    def try_acquire(self, buckets, now: float) -> float:
+        # buckets — [(key, Limit)]; токен списывается из всех сразу или ни из одного.
+        # Возвращает 0, если запрос разрешён, иначе секунды до появления токена
+        with self._lock:
+            wait = 0.0
+            levels = []
+            for key, limit in buckets:
+                state = self._buckets.get(key)
+                tokens = limit.capacity if state is None else min(limit.capacity, state[0] + (now - state[1]) * limit.rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / limit.rate)
+            if wait > 0:
+                return wait
+            for (key, limit), tokens in zip(buckets, levels):
+                tokens -= 1
+                self._buckets[key] = (tokens, now, now + (limit.capacity - tokens) / limit.rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float):
+        # Полностью восполненный bucket не отличается от отсутствующего
+        for key in [key for key, state in self._buckets.items() if state[2] <= now]:
+            del self._buckets[key]
+
+
+# Тот же алгоритм в Redis: проверка и списание атомарны для всех bucket'ов запроса,
+# время — часы Redis, общие для всех воркеров. Число возвращается строкой,
+# т.к. Redis приводит числа Lua к целым
+_REDIS_ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = capacity
+    if state[1] then
+        tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+    end
+    levels[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return '0'
+"""
+
+
+class RedisRateLimitBackend:
+    # Общие bucket'ы для нескольких процессов. При недоступности Redis запросы
+    # пропускаются (ограничение не должно ронять API)
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "rate_limit:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_ACQUIRE_SCRIPT)
+
+    async def acquire(self, buckets) -> float:
+        keys = [self.prefix + key for key, _ in buckets]
+        args = [value for _, limit in buckets for value in (limit.capacity, limit.rate)]
+        try:
+            return float(await self._script(keys=keys, args=args))
+        except Exception:
+            logger.warning("Redis для ограничения частоты недоступен, запрос пропущен", exc_info=True)
+            return 0.0
+
+
+_backend = None
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        _backend = RedisRateLimitBackend() if RATE_LIMIT_BACKEND == "redis" else MemoryRateLimitBackend()
+    return _backend
+
+
+def set_rate_limit_backend(backend):
+    global _backend
+    _backend = backend
+
+
+rate_limited = registry.counter(
+    "rate_limited_requests_total", "Запросы, отклонённые ограничением частоты", ("rule",))
+
+
+def _client_identity(scope) -> str:
+    # Пользователь по подписи JWT (проверенные токены кэшируются, как в get_current_user);
+    # без действительного токена — адрес клиента ("ip:..."), эндпоинт всё равно ответит 401
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                claims = token_cache.get(token)
+                if claims is None:
+                    try:
+                        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                    except JWTError:
+                        break
+                    token_cache.put(token, claims)
+                if claims.get("sub"):
+                    return "user:" + claims["sub"]
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    # ASGI middleware: ограничивает только маршруты из routes, остальные проходят без проверок
+    def __init__(self, app, routes=None, limits=None, backend=None):
+        self.app = app
+        self.routes = RATE_LIMIT_ROUTES if routes is None else routes
+        self.limits = load_rate_limits() if limits is None else limits
+        self.backend = backend
+
+    async def __call__(self, scope, receive, send):
+        rule = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        limits = self.limits.get(rule) if rule is not None and RATE_LIMIT_ENABLED else None
+        if not limits:
+            await self.app(scope, receive, send)
+            return
+
+        identity = _client_identity(scope)
+        buckets = []
+        if identity.startswith("user:"):
+            if "user" in limits:
+                buckets.append((f"{rule}:{identity}", limits["user"]))
+            if "global" in limits:
+                buckets.append((f"{rule}:global", limits["global"]))
+        elif "anonymous" in limits:
+            buckets.append((f"{rule}:{identity}", limits["anonymous"]))
+        if not buckets:
+            await self.app(scope, receive, send)
+            return
+
+        backend = self.backend or get_rate_limit_backend()
+        wait = await backend.acquire(buckets)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if METRICS_ENABLED:
+            rate_limited.inc(rule)
+        response = JSONResponse(
+            {"detail": "Слишком много запросов, повторите попытку позже"},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+        await response(scope, receive, send)
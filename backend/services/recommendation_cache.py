@@ -0,0 +1,169 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+from backend.db.models import RecommendationCacheEntry
+
+# Кэш рекомендаций LLM. Ключ — хэш нормализованных входных данных build_prompt:
+# балл, физиологические показатели и возраст округляются до "корзин",
+# поэтому похожие анкеты получают одну и ту же рекомендацию.
+# Два уровня: LRU в памяти процесса и таблица recommendation_cache в БД.
+
+# Шаг округления для каждого показателя. Чем крупнее шаг, тем больше попаданий
+# в кэш и тем менее персональна рекомендация.
+BUCKETS = {
+    "score": float(os.getenv("RECOMMENDATION_CACHE_SCORE_STEP", "5")),
+    "systolic": float(os.getenv("RECOMMENDATION_CACHE_BP_STEP", "5")),
+    "diastolic": float(os.getenv("RECOMMENDATION_CACHE_BP_STEP", "5")),
+    "pulse": float(os.getenv("RECOMMENDATION_CACHE_PULSE_STEP", "5")),
+    "temperature": float(os.getenv("RECOMMENDATION_CACHE_TEMPERATURE_STEP", "0.5")),
+    "height": float(os.getenv("RECOMMENDATION_CACHE_HEIGHT_STEP", "5")),
+    "weight": float(os.getenv("RECOMMENDATION_CACHE_WEIGHT_STEP", "5")),
+    "age": float(os.getenv("RECOMMENDATION_CACHE_AGE_BAND", "10")),
+}
+
+CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", str(7 * 24 * 3600)))  # сек
+MEMORY_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+DB_CACHE_MAX_ROWS = int(os.getenv("RECOMMENDATION_CACHE_DB_MAX_ROWS", "100000"))
+# Очистка таблицы (подсчёт строк по всей таблице) — раз в столько записей, а не на каждую
+PRUNE_EVERY = int(os.getenv("RECOMMENDATION_CACHE_PRUNE_EVERY", "100"))
+
+
+def _bucket(value, step):
+    if value is None:
+        return None
+    if step <= 0:
+        return value
+    return math.floor(float(value) / step) * step
+
+
+def make_cache_key(inputs: dict, buckets: dict = None) -> str:
+    # Ключ из входных данных collect_prompt_inputs
+    buckets = buckets or BUCKETS
+    phys_data = inputs["phys_data"]
+    canonical = {
+        "score": _bucket(inputs["score"], buckets["score"]),
+        "vitals": {name: _bucket(phys_data[name], buckets[name]) for name in sorted(phys_data)},
+        "age": _bucket(inputs["age"], buckets["age"]),
+        "answers": {str(question_id): answer for question_id, answer in inputs["answers"]},
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    def __init__(self, max_size: int = MEMORY_CACHE_SIZE, ttl: int = CACHE_TTL, db_max_rows: int = DB_CACHE_MAX_ROWS,
+                 prune_every: int = PRUNE_EVERY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_max_rows = db_max_rows
+        self.prune_every = prune_every
+        self._puts_since_prune = 0
+        self._memory = OrderedDict()  # key -> (recommendation, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _remember(self, key, recommendation, expires_at):
+        with self._lock:
+            self._memory[key] = (recommendation, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            recommendation, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return recommendation
+
+    def get(self, db: Session, key: str):
+        recommendation = self._get_memory(key)
+        if recommendation is not None:
+            self._count("memory_hits")
+            return recommendation
+
+        entry = db.get(RecommendationCacheEntry, key)
+        if entry is not None and entry.created_at > datetime.utcnow() - timedelta(seconds=self.ttl):
+            entry.last_used_at = datetime.utcnow()
+            db.commit()
+            expires_at = time.time() + self.ttl - (datetime.utcnow() - entry.created_at).total_seconds()
+            self._remember(key, entry.recommendation, expires_at)
+            self._count("db_hits")
+            return entry.recommendation
+
+        self._count("misses")
+        return None
+
+    def put(self, db: Session, key: str, recommendation: str):
+        now = datetime.utcnow()
+        entry = db.get(RecommendationCacheEntry, key)
+        if entry is None:
+            db.add(RecommendationCacheEntry(key=key, recommendation=recommendation, created_at=now, last_used_at=now))
+        else:
+            entry.recommendation = recommendation
+            entry.created_at = now
+            entry.last_used_at = now
+        db.commit()
+        self._remember(key, recommendation, time.time() + self.ttl)
+        self._count("stores")
+        with self._lock:
+            self._puts_since_prune += 1
+            due = self._puts_since_prune >= self.prune_every
+            if due:
+                self._puts_since_prune = 0
+        if due:
+            self.prune(db)
+
+    def prune(self, db: Session):
+        # Удаление просроченных записей и самых давно использованных сверх лимита
+        expired_before = datetime.utcnow() - timedelta(seconds=self.ttl)
+        removed = (
+            db.query(RecommendationCacheEntry)
+            .filter(RecommendationCacheEntry.created_at < expired_before)
+            .delete(synchronize_session=False)
+        )
+
+        overflow = db.query(RecommendationCacheEntry).count() - self.db_max_rows
+        if overflow > 0:
+            oldest = (
+                db.query(RecommendationCacheEntry.key)
+                .order_by(RecommendationCacheEntry.last_used_at)
+                .limit(overflow)
+                .subquery()
+            )
+            removed += (
+                db.query(RecommendationCacheEntry)
+                .filter(RecommendationCacheEntry.key.in_(oldest.select()))
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+        if removed:
+            self._count("evictions", removed)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+recommendation_cache = RecommendationCache()
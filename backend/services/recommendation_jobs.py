@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend.db.connection import SessionLocal
+from backend.db.models import RecommendationJob, Result
+from backend.services.llm import RecommendationError, race_models
+from backend.services.single_flight import recommendation_flights
+from backend.services.recommendation_service import RecommendationDataError, collect_prompt_inputs, build_recommendation_prompt
+from backend.services.recommendation_cache import recommendation_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Статусы задачи
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Сколько рекомендаций генерируется одновременно
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "4"))
+
+
+class RecommendationJobQueue:
+    # Очередь задач генерации рекомендаций. Задачи хранятся в таблице
+    # recommendation_jobs, поэтому после перезапуска незавершённые задачи
+    # ставятся в очередь заново. Выполняются фиксированным числом asyncio-воркеров.
+
+    def __init__(self, concurrency: int = RECOMMENDATION_WORKERS, session_factory=SessionLocal):
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        self._queue = None
+        self._loop = None
+        self._workers = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        for job_id in await asyncio.to_thread(self._requeue_pending):
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue(self, db: Session, user_id: int, result_id: int) -> RecommendationJob:
+        # Повторные запросы по тому же результату (двойной клик, повтор клиента)
+        # получают уже созданную задачу, а не запускают ещё одну генерацию
+        job = self._find_job(db, user_id, result_id)
+        if job is not None:
+            return job
+
+        job = RecommendationJob(id=uuid4().hex, user_id=user_id, result_id=result_id, status=JOB_QUEUED)
+        if db.get(Result, result_id).recommendation:
+            # Рекомендация уже есть — задача сразу выполнена, модели не вызываются
+            job.status = JOB_DONE
+            job.started_at = job.finished_at = datetime.utcnow()
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Задачу по этому результату одновременно создал другой воркер
+            # (уникальный индекс uq_recommendation_jobs_active_result)
+            db.rollback()
+            job = self._find_job(db, user_id, result_id)
+            if job is None:
+                raise
+            return job
+        db.refresh(job)
+        if job.status == JOB_QUEUED:
+            # enqueue вызывается из потока обработчика запроса, очередь живёт в event loop
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, job.id)
+        return job
+
+    def _find_job(self, db: Session, user_id: int, result_id: int):
+        # Незавершённая задача по результату, иначе выполненная, если рекомендация сохранена
+        jobs = db.query(RecommendationJob).filter(
+            RecommendationJob.user_id == user_id,
+            RecommendationJob.result_id == result_id,
+        )
+        job = jobs.filter(RecommendationJob.status.in_([JOB_QUEUED, JOB_RUNNING])).first()
+        if job is None and db.get(Result, result_id).recommendation:
+            job = (
+                jobs.filter(RecommendationJob.status == JOB_DONE)
+                .order_by(RecommendationJob.finished_at.desc())
+                .first()
+            )
+        return job
+
+    def _requeue_pending(self):
+        # Задачи, прерванные перезапуском, снова получают статус "queued"
+        db = self.session_factory()
+        try:
+            jobs = (
+                db.query(RecommendationJob)
+                .filter(RecommendationJob.status.in_([JOB_QUEUED, JOB_RUNNING]))
+                .order_by(RecommendationJob.created_at)
+                .all()
+            )
+            for job in jobs:
+                job.status = JOB_QUEUED
+                job.started_at = None
+            db.commit()
+            return [job.id for job in jobs]
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception:
+                logger.exception("Задача завершилась с ошибкой", extra={"job_id": job_id})
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        try:
+            prepared = await asyncio.to_thread(self._start_job, job_id)
+            if prepared is None:
+                return
+            prompt, cache_key, flight_key = prepared
+
+            try:
+                # Если ту же рекомендацию уже генерирует другой запрос (например, поток SSE),
+                # задача ждёт его результат вместо второго обращения к моделям. Если клиент
+                # этого потока отключится, задача вызывает модели сама (см. FlightAborted)
+                recommendation = await recommendation_flights.run(flight_key, lambda: race_models(prompt))
+            except RecommendationError as e:
+                await asyncio.to_thread(self._fail_job, job_id, str(e))
+                return
+
+            await asyncio.to_thread(self._finish_job, job_id, recommendation, cache_key)
+        except Exception:
+            # Ошибка БД или любая другая: задача не должна оставаться "running"
+            # до перезапуска, иначе клиент опрашивает её бесконечно
+            logger.exception("Задача завершилась с ошибкой", extra={"job_id": job_id})
+            await asyncio.to_thread(self._fail_job, job_id, "Внутренняя ошибка при генерации рекомендации")
+
+    def _start_job(self, job_id: str):
+        # Отмечает задачу как выполняемую и строит промпт.
+        # None — если выполнять нечего (задача уже обработана или ответ найден в кэше).
+        db = self.session_factory()
+        try:
+            job = db.get(RecommendationJob, job_id)
+            if job is None or job.status != JOB_QUEUED:
+                return None
+
+            job.status = JOB_RUNNING
+            job.started_at = datetime.utcnow()
+            if job.result.recommendation:
+                # Рекомендация появилась, пока задача ждала в очереди
+                self._complete(db, job, job.result.recommendation)
+                return None
+            try:
+                inputs = collect_prompt_inputs(db, job.result)
+            except RecommendationDataError as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                job.finished_at = datetime.utcnow()
+                db.commit()
+                return None
+            db.commit()
+
+            cache_key = make_cache_key(inputs)
+            cached = recommendation_cache.get(db, cache_key)
+            if cached is not None:
+                self._complete(db, job, cached)
+                return None
+
+            return build_recommendation_prompt(inputs), cache_key, (job.user_id, job.result_id)
+        finally:
+            db.close()
+
+    def _complete(self, db: Session, job: RecommendationJob, recommendation: str):
+        job.result.recommendation = recommendation
+        job.status = JOB_DONE
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+    def _finish_job(self, job_id: str, recommendation: str, cache_key=None):
+        db = self.session_factory()
+        try:
+            job = db.get(RecommendationJob, job_id)
+            if job is None:
+                logger.warning("Задача не найдена при сохранении рекомендации", extra={"job_id": job_id})
+                return
+            self._complete(db, job, recommendation)
+            if cache_key is not None:
+                recommendation_cache.put(db, cache_key, recommendation)
+        finally:
+            db.close()
+
+    def _fail_job(self, job_id: str, error: str):
+        # Отдельная сессия: сессия, в которой произошла ошибка, могла остаться в
+        # неконсистентном состоянии. Уже выполненная задача не меняется
+        db = self.session_factory()
+        try:
+            job = db.get(RecommendationJob, job_id)
+            if job is None or job.status not in (JOB_QUEUED, JOB_RUNNING):
+                return
+            job.status = JOB_FAILED
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+
+job_queue = RecommendationJobQueue()
@@ -0,0 +1,82 @@
+from sqlalchemy.orm import Session
+from backend.db.models import HealthData, UserAnswer, Result
+from backend.services.question_catalog import get_question_catalog
+from backend.calculations.prompt_builder import build_prompt
+from backend.services.metrics import span
+
+
+class RecommendationDataError(Exception):
+    pass
+
+
+def get_last_result(db: Session, user_id: int):
+    return (
+        db.query(Result)
+        .filter(Result.user_id == user_id)
+        .order_by(Result.created_at.desc())
+        .first()
+    )
+
+
+def get_last_health_data(db: Session, user_id: int):
+    return (
+        db.query(HealthData)
+        .filter(HealthData.user_id == user_id)
+        .order_by(HealthData.created_at.desc())
+        .first()
+    )
+
+
+def collect_prompt_inputs(db: Session, result: Result) -> dict:
+    # Входные данные build_prompt: результат, ответы и последние физиологические данные пользователя
+    score = round(result.health_score, 2)
+
+    # Тексты вопросов берутся из каталога, без join с таблицей questions
+    catalog = get_question_catalog()
+    user_answers = (
+        db.query(UserAnswer.question_id, UserAnswer.answer)
+        .filter(UserAnswer.user_id == result.user_id)
+        .all()
+    )
+
+    qa_pairs = []
+    answers = []
+    for ua in user_answers:
+        q = catalog.get(ua.question_id)
+        if q is None:
+            continue
+        ans_text = "Да" if ua.answer else "Нет" if ua.answer is not None else "Не знаю"
+        qa_pairs.append({"question": q.question_text, "answer": ans_text})
+        answers.append((q.id, ua.answer))
+
+    phys_data_entry = get_last_health_data(db, result.user_id)
+    if not phys_data_entry:
+        raise RecommendationDataError("Физиологические данные не найдены")
+
+    phys_data = {
+        "systolic": phys_data_entry.systolic_bp,
+        "diastolic": phys_data_entry.diastolic_bp,
+        "pulse": phys_data_entry.pulse,
+        "temperature": phys_data_entry.temperature,
+        "height": phys_data_entry.height,
+        "weight": phys_data_entry.weight
+    }
+
+    return {
+        "score": score,
+        "qa_pairs": qa_pairs,
+        "answers": answers,
+        "phys_data": phys_data,
+        "age": phys_data_entry.age,
+    }
+
+
+def build_recommendation_prompt(inputs: dict) -> str:
+    with span("prompt.build"):
+        return build_prompt(inputs["score"], inputs["qa_pairs"], inputs["phys_data"], age=inputs["age"])
+
+
+def save_recommendation(db: Session, result_id: int, recommendation: str):
+    result = db.get(Result, result_id)
+    result.recommendation = recommendation
+    db.commit()
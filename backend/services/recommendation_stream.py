@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from fastapi.concurrency import run_in_threadpool
+from backend.db.connection import SessionLocal
+from backend.services.llm import RecommendationError, stream_models
+from backend.services.recommendation_cache import recommendation_cache, make_cache_key
+from backend.services.recommendation_service import build_recommendation_prompt, save_recommendation
+from backend.services.single_flight import FlightAborted, recommendation_flights
+
+# Потоковая генерация рекомендации в формате Server-Sent Events.
+# События: model — начата модель, chunk — фрагмент текста, reset — отданные
+# фрагменты нужно отбросить (модель зависла, пробуем следующую),
+# done — итоговый текст сохранён, error — ни одна модель не ответила.
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _get_cached(cache_key: str):
+    db = SessionLocal()
+    try:
+        return recommendation_cache.get(db, cache_key)
+    finally:
+        db.close()
+
+
+def _save(result_id: int, recommendation: str, cache_key: str = None):
+    db = SessionLocal()
+    try:
+        save_recommendation(db, result_id, recommendation)
+        if cache_key is not None:
+            recommendation_cache.put(db, cache_key, recommendation)
+    finally:
+        db.close()
+
+
+async def stored_recommendation_events(recommendation: str):
+    # Рекомендация для результата уже сохранена — отдаётся без обращения к моделям
+    yield sse_event("chunk", {"text": recommendation})
+    yield sse_event("done", {"recommendation": recommendation})
+
+
+async def recommendation_events(user_id: int, result_id: int, inputs: dict):
+    flight_key = (user_id, result_id)
+    while (flight := recommendation_flights.current(flight_key)) is not None:
+        # Такая же генерация уже идёт (повторный запрос или задача из очереди) — ждём её текст
+        try:
+            recommendation = await asyncio.shield(flight)
+        except FlightAborted:
+            # Ведущий поток отключился — генерацию продолжает следующий ожидающий
+            continue
+        except RecommendationError as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("chunk", {"text": recommendation})
+        yield sse_event("done", {"recommendation": recommendation})
+        return
+
+    future = recommendation_flights.lead(flight_key)
+    try:
+        cache_key = make_cache_key(inputs)
+        cached = await run_in_threadpool(_get_cached, cache_key)
+        if cached is not None:
+            await run_in_threadpool(_save, result_id, cached)
+            recommendation_flights.finish(future, cached)
+            yield sse_event("chunk", {"text": cached})
+            yield sse_event("done", {"recommendation": cached})
+            return
+
+        prompt = build_recommendation_prompt(inputs)
+        async for event, data in stream_models(prompt):
+            if event == "model":
+                yield sse_event("model", {"model": data})
+            elif event == "chunk":
+                yield sse_event("chunk", {"text": data})
+            elif event == "reset":
+                yield sse_event("reset", {"reason": data})
+            elif event == "done":
+                # Собранный текст сохраняется в Result.recommendation
+                await run_in_threadpool(_save, result_id, data, cache_key)
+                recommendation_flights.finish(future, data)
+                yield sse_event("done", {"recommendation": data})
+    except RecommendationError as e:
+        recommendation_flights.finish(future, error=e)
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        # Клиент отключился до конца генерации: это не ошибка генерации, ожидающие
+        # (другой поток или задача из очереди) запускают её сами
+        recommendation_flights.finish(future, error=FlightAborted())
@@ -1,13 +1,29 @@
-from sqlalchemy import text
+from sqlalchemy import text, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+import logging
+import math
 import uuid
+from backend.db.models import Result, UserScoreRollup
+from backend.calculations.interpretation import analysis_text
 
 log_id = uuid.uuid4()
+logger = logging.getLogger(__name__)
+
+# Окна средних в днях: постоянная времени затухания веса результата
+ROLLUP_WINDOWS = (7, 30, 90)
+
+_INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
 def save_health_score(session, user_id, score_result, age, recommendation=None):
     total_score = round(score_result["total_score"], 2)
-    interpretation = score_result.get("interpretation")
-    analysis = f"Итоговое состояние здоровья: {total_score}/100 – {interpretation} (с учетом вашего возраста)"
+    # Текст анализа по шаблону локали (calculations/interpretation.py)
+    analysis = analysis_text(total_score, score_result["interpretation_code"])
+    created_at = datetime.utcnow()
 
     session.execute(text("""
         INSERT INTO results (user_id, health_score, analysis_text, created_at, recommendation)
@@ -16,8 +32,153 @@ def save_health_score(session, user_id, score_result, age, recommendation=None):
         "user_id": user_id,
         "health_score": total_score,
         "analysis_text": analysis,
-        "created_at": datetime.utcnow(),
+        "created_at": created_at,
         "recommendation": recommendation
     })
+    update_score_rollup(session, user_id, total_score, created_at)
+
+    logger.debug("Результат подготовлен к сохранению", extra={"user_id": user_id, "health_score": total_score})
+
+def _apply_score(rollup, score, created_at):
+    # Инкрементальное обновление сводки одним новым результатом: вес прежних
+    # результатов затухает как exp(-дни / окно), новый результат имеет вес 1
+    elapsed_days = max((created_at - rollup.latest_at).total_seconds() / 86400, 0)
+    for window in ROLLUP_WINDOWS:
+        decayed_weight = getattr(rollup, f"weight_{window}d") * math.exp(-elapsed_days / window)
+        average = getattr(rollup, f"avg_{window}d")
+        weight = decayed_weight + 1
+        setattr(rollup, f"avg_{window}d", (average * decayed_weight + score) / weight)
+        setattr(rollup, f"weight_{window}d", weight)
+    rollup.results_count += 1
+    rollup.latest_score = score
+    rollup.latest_at = created_at
+    rollup.min_score = min(rollup.min_score, score)
+    rollup.max_score = max(rollup.max_score, score)
+
+def _new_rollup(user_id, score, created_at):
+    return UserScoreRollup(
+        user_id=user_id, results_count=1, latest_score=score, latest_at=created_at,
+        min_score=score, max_score=score, avg_7d=score, avg_30d=score, avg_90d=score,
+        weight_7d=1, weight_30d=1, weight_90d=1,
+    )
+
+def _rollup_from_history(session, user_id):
+    # Сводка по всей истории пользователя (для тех, у кого её ещё нет); в сессию не добавляется
+    rollup = None
+    history = (
+        session.query(Result.health_score, Result.created_at)
+        .filter(Result.user_id == user_id)
+        .order_by(Result.created_at, Result.id)
+        .yield_per(1000)
+    )
+    for score, created_at in history:
+        if rollup is None:
+            rollup = _new_rollup(user_id, score, created_at)
+        else:
+            _apply_score(rollup, score, created_at)
+    return rollup
+
+def _insert_rollups(session, rollups):
+    # INSERT ... ON CONFLICT DO NOTHING одним запросом; возвращает id вставленных.
+    # Сводку, которой нет среди вставленных, уже записала другая транзакция
+    # (одновременные первые сохранения): блокировать до вставки было нечего
+    rows = [
+        {column.key: getattr(rollup, column.key) for column in UserScoreRollup.__table__.columns}
+        for rollup in rollups
+    ]
+    if not rows:
+        return set()
+    conn = session.connection()
+    dialect_insert = _INSERT_DIALECTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        stmt = (
+            dialect_insert(UserScoreRollup)
+            .on_conflict_do_nothing(index_elements=[UserScoreRollup.user_id])
+            .returning(UserScoreRollup.user_id)
+        )
+        return set(session.scalars(stmt, rows))
+    # Без ON CONFLICT: каждая вставка в своей точке сохранения, конфликт откатывает только её
+    inserted = set()
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(insert(UserScoreRollup), row)
+        except IntegrityError:
+            continue
+        inserted.add(row["user_id"])
+    return inserted
+
+def _apply_to_locked(session, user_id, score, created_at):
+    # Сводка, вставленная другой транзакцией, не включает наш результат (он ей не
+    # виден до commit) — блокируем строку и добавляем его
+    rollup = session.get(UserScoreRollup, user_id, with_for_update=True, populate_existing=True)
+    _apply_score(rollup, score, created_at)
+    return rollup
+
+def update_score_rollup(session, user_id, score, created_at):
+    rollup = session.get(UserScoreRollup, user_id, with_for_update=True)
+    if rollup is not None:
+        _apply_score(rollup, score, created_at)
+        return rollup
+    # Сводки ещё нет — собираем её по истории, включая только что добавленный результат
+    rollup = _rollup_from_history(session, user_id)
+    if rollup is None or _insert_rollups(session, [rollup]):
+        return rollup
+    return _apply_to_locked(session, user_id, score, created_at)
+
+def update_score_rollups(session, scores, created_at):
+    # Сводки для множества пользователей (scores: user_id -> балл) одним запросом;
+    # результаты уже записаны в results в этой же транзакции
+    rollups = (
+        session.query(UserScoreRollup)
+        .filter(UserScoreRollup.user_id.in_(list(scores)))
+        .with_for_update()
+        .all()
+    )
+    existing = {rollup.user_id: rollup for rollup in rollups}
+    missing = [user_id for user_id in scores if user_id not in existing]
+    for user_id, score in scores.items():
+        rollup = existing.get(user_id)
+        if rollup is not None:
+            _apply_score(rollup, score, created_at)
+    if not missing:
+        return
+    # Сводок ещё нет — собираем их по истории всех таких пользователей одним запросом
+    history = (
+        session.query(Result.user_id, Result.health_score, Result.created_at)
+        .filter(Result.user_id.in_(missing))
+        .order_by(Result.user_id, Result.created_at, Result.id)
+        .yield_per(1000)
+    )
+    built = {}
+    for user_id, score, result_created_at in history:
+        rollup = built.get(user_id)
+        if rollup is None:
+            built[user_id] = _new_rollup(user_id, score, result_created_at)
+        else:
+            _apply_score(rollup, score, result_created_at)
+    inserted = _insert_rollups(session, built.values())
+    for user_id in built.keys() - inserted:
+        _apply_to_locked(session, user_id, scores[user_id], created_at)
 
-    print(f"Данные подготовлены к сохранению для user_id={user_id}")
+def rollup_summary(rollup, now=None):
+    # weighted_average_Nd — среднее всех результатов с весом exp(-давность в днях / N),
+    # а не среднее ровно за N дней. Если последний результат старше N дней, в окне
+    # нет ни одного результата: среднее и тренд не отдаются (None), а не остаются
+    # значением на момент последнего результата.
+    # Тренд — отклонение последнего результата от среднего.
+    now = now or datetime.utcnow()
+    days_since_latest = max((now - rollup.latest_at).total_seconds() / 86400, 0)
+    summary = {
+        "results_count": rollup.results_count,
+        "latest_score": round(rollup.latest_score, 2),
+        "latest_at": rollup.latest_at,
+        "days_since_latest": round(days_since_latest, 2),
+        "min_score": round(rollup.min_score, 2),
+        "max_score": round(rollup.max_score, 2),
+    }
+    for window in ROLLUP_WINDOWS:
+        average = getattr(rollup, f"avg_{window}d") if days_since_latest <= window else None
+        summary[f"weighted_average_{window}d"] = round(average, 2) if average is not None else None
+        summary[f"trend_{window}d"] = round(rollup.latest_score - average, 2) if average is not None else None
+    return summary
@@ -0,0 +1,70 @@
+import asyncio
+
+# Объединение одинаковых одновременных операций (single flight): пока операция
+# по ключу выполняется, остальные вызовы с тем же ключом ждут её результат,
+# а не запускают свою. Действует в пределах процесса (одного event loop);
+# между воркерами дубли задач рекомендаций исключает уникальный индекс в БД.
+
+
+class FlightAborted(Exception):
+    # Ведущий (см. lead) прекратил операцию, не завершив её, — например, клиент
+    # потоковой генерации отключился. Ожидающие должны выполнить операцию заново
+    pass
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # ключ -> Task или Future выполняемой операции
+
+    def current(self, key):
+        # Выполняемая операция по ключу; завершённая ещё может быть в словаре
+        # до вызова _done, она не возвращается
+        flight = self._flights.get(key)
+        return flight if flight is not None and not flight.done() else None
+
+    async def run(self, key, factory):
+        # factory() создаёт корутину операции. Она выполняется отдельной задачей:
+        # отмена одного из ожидающих (клиент отключился) не отменяет общую операцию
+        while True:
+            flight = self.current(key)
+            if flight is None:
+                flight = asyncio.ensure_future(factory())
+                self._track(key, flight)
+            try:
+                return await asyncio.shield(flight)
+            except FlightAborted:
+                # Ведущий бросил операцию — она запускается заново (или ожидается
+                # следующая, если её уже начал другой вызов)
+                continue
+
+    def lead(self, key):
+        # Для операций, которые вызывающий выполняет сам (потоковая генерация):
+        # возвращает Future, который он должен завершить через finish()
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        return future
+
+    @staticmethod
+    def finish(future, result=None, error: BaseException = None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _track(self, key, flight):
+        self._flights[key] = flight
+
+        def _done(completed):
+            if self._flights.get(key) is completed:
+                del self._flights[key]
+            # Ошибку получают ожидающие; если их не осталось, она не логируется как потерянная
+            if not completed.cancelled():
+                completed.exception()
+
+        flight.add_done_callback(_done)
+
+
+# Генерация рекомендаций, ключ — (user_id, result_id)
+recommendation_flights = SingleFlight()
@@ -0,0 +1,74 @@
+# Тесты работают с отдельной локальной SQLite-базой: DATABASE_URL задаётся
+# до импорта модулей backend, чтобы не обращаться к рабочей Postgres
+import os
+import tempfile
+
+TEST_DB_PATH = os.path.join(tempfile.gettempdir(), f"health_test_{os.getpid()}.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_PATH}"
+# Схему пересоздают утилиты бенчмарков (reset_database), им нужна та же база
+os.environ["BENCH_DATABASE_URL"] = os.environ["DATABASE_URL"]
+# Дешёвый bcrypt; ограничение частоты проверяется отдельными тестами
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+import pytest
+
+
+@pytest.fixture
+def provider_health(monkeypatch):
+    # Свежее состояние выключателей моделей, чтобы ошибки одного теста не влияли на другие
+    from backend.services import llm
+    from backend.services.provider_health import ProviderHealthTracker
+
+    tracker = ProviderHealthTracker()
+    monkeypatch.setattr(llm, "provider_health", tracker)
+    return tracker
+
+
+@pytest.fixture
+def database():
+    # Схема по миграциям, тестовые вопросы и пользователи, пустые кэши процесса
+    from backend.benchmarks.common import reset_database
+    from backend.services.auth_cache import token_cache, user_cache
+    from backend.services.question_catalog import load_question_catalog
+    from backend.services.recommendation_cache import recommendation_cache
+
+    reset_database(questions=10, users=5)
+    load_question_catalog()
+    token_cache.clear()
+    user_cache.clear()
+    recommendation_cache._memory.clear()
+
+
+def add_result(user_id: int, score: float = 70.0, recommendation: str = None) -> int:
+    # Физиологические данные и результат пользователя напрямую в БД; возвращает id результата
+    from backend.db.connection import SessionLocal
+    from backend.db.models import HealthData, Result
+
+    db = SessionLocal()
+    try:
+        db.add(HealthData(user_id=user_id, systolic_bp=120, diastolic_bp=80, pulse=70,
+                          temperature=36.6, height=175, weight=70, age=40))
+        result = Result(user_id=user_id, health_score=score, analysis_text="-", recommendation=recommendation)
+        db.add(result)
+        db.commit()
+        return result.id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(database):
+    # Приложение целиком, с lifespan (миграции, каталог вопросов, воркеры задач)
+    from fastapi.testclient import TestClient
+    from backend.index import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def auth_headers(user_id: int) -> dict:
+    # Токен тестового пользователя из reset_database без входа по паролю
+    from backend.api import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': f'user{user_id}@bench.local'})}"}
@@ -0,0 +1,31 @@
+# Служебные маршруты доступны только с ADMIN_TOKEN
+import pytest
+
+from conftest import auth_headers
+from backend import api
+
+ADMIN_ROUTES = [
+    ("GET", "/api/debug/auth"),
+    ("GET", "/api/debug/llm_providers"),
+    ("GET", "/api/debug/recommendation_cache"),
+    ("POST", "/api/admin/questions/reload"),
+]
+
+
+@pytest.mark.parametrize("method,path", ADMIN_ROUTES)
+def test_admin_routes_require_admin_token(client, monkeypatch, method, path):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    # Обычного пользователя недостаточно
+    assert client.request(method, path, headers=auth_headers(1)).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_admin_routes_closed_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", None)
+    assert client.get("/api/debug/auth", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_non_ascii_admin_token_compares_without_error(client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "секрет")
+    assert client.get("/api/debug/auth", headers={"X-Admin-Token": "secret"}).status_code == 403
@@ -0,0 +1,15 @@
+import pytest
+
+from backend.calculations.utils import AGE_NORMS_TABLE, get_age_norms
+
+
+def test_age_norms_are_read_only():
+    norms = get_age_norms(40)
+    with pytest.raises(TypeError):
+        norms["bp"] = (0, 0)
+    assert get_age_norms(40)["bp"] == (125, 85)
+
+
+def test_ages_outside_table_use_nearest_group():
+    assert get_age_norms(5) is AGE_NORMS_TABLE[18]
+    assert get_age_norms(150) is AGE_NORMS_TABLE[100]
@@ -0,0 +1,15 @@
+from conftest import auth_headers
+from backend.services.auth_cache import user_cache
+
+
+def test_profile_update_with_cold_and_warm_user_cache(client):
+    # Пользователь из get_current_user присоединён к сессии запроса в обоих случаях
+    headers = auth_headers(2)
+    assert client.put("/api/users/profile", json={"name": "Холодный кэш"}, headers=headers).status_code == 200
+    assert client.put("/api/users/profile", json={"name": "Тёплый кэш"}, headers=headers).status_code == 200
+    user_cache.clear()
+    assert client.get("/api/users/me", headers=headers).json()["name"] == "Тёплый кэш"
+
+
+def test_unknown_user_is_rejected(client):
+    assert client.get("/api/users/me", headers=auth_headers(99)).status_code == 401
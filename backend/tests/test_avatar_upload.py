@@ -0,0 +1,157 @@
+# Предел размера тела загрузки аватара (в том числе без Content-Length)
+# и удаление уже записанных миниатюр при ошибке на одном из размеров
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image, ImageOps
+
+import httpx
+
+from conftest import auth_headers
+from backend.db.connection import SessionLocal
+from backend.db.models import User
+from backend.index import app
+from backend.services import avatar_service
+from backend.services.avatar_service import AvatarError, _make_thumbnails, avatar_processor
+
+LIMIT = 4096
+BOUNDARY = "avatar-test-boundary"
+
+
+def _png(side: int = 32, color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (side, side), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _multipart_chunks(content: bytes, chunk_size: int = 1024):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def avatar_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(avatar_service, "AVATAR_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setitem(avatar_service.UPLOAD_SIZE_LIMITS, ("POST", "/api/users/upload-avatar"), LIMIT)
+    calls = []
+    original = avatar_processor.save_upload
+
+    async def spy(upload, user_id):
+        calls.append(user_id)
+        return await original(upload, user_id)
+
+    monkeypatch.setattr(avatar_processor, "save_upload", spy)
+    return calls
+
+
+def test_chunked_upload_over_limit_is_rejected(client, avatar_dir, small_limit):
+    response = client.post(
+        "/api/users/upload-avatar",
+        content=_multipart_chunks(_png() + b"\0" * LIMIT * 4),
+        headers={**auth_headers(1), "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    assert response.status_code == 413
+    # Обработчик не вызывался, временных файлов не осталось
+    assert small_limit == []
+    assert list(avatar_dir.iterdir()) == []
+
+
+def test_content_length_over_limit_is_rejected(client, avatar_dir, small_limit):
+    response = client.post(
+        "/api/users/upload-avatar",
+        files={"file": ("a.png", _png() + b"\0" * LIMIT * 4, "image/png")},
+        headers=auth_headers(1),
+    )
+    assert response.status_code == 413
+    assert small_limit == []
+
+
+def test_chunked_upload_within_limit(client, avatar_dir, small_limit):
+    response = client.post(
+        "/api/users/upload-avatar",
+        content=_multipart_chunks(_png(), chunk_size=100),
+        headers={**auth_headers(1), "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    assert response.status_code == 200, response.text
+    assert small_limit == [1]
+    assert sorted(path.name for path in avatar_dir.iterdir()) == sorted(
+        url.rsplit("/", 1)[1] for url in response.json()["thumbnails"].values()
+    )
+
+
+def test_failed_thumbnail_removes_written_ones(avatar_dir, monkeypatch):
+    source = avatar_dir / "source.png"
+    source.write_bytes(_png())
+    fit = ImageOps.fit
+
+    def failing_fit(image, size, *args, **kwargs):
+        if size[0] == avatar_service.AVATAR_SIZES[-1]:
+            raise OSError("No space left on device")
+        return fit(image, size, *args, **kwargs)
+
+    monkeypatch.setattr(ImageOps, "fit", failing_fit)
+    with pytest.raises(AvatarError):
+        _make_thumbnails(str(source), 1, "0123456789abcdef")
+    assert [path.name for path in avatar_dir.iterdir()] == ["source.png"]
+
+
+def test_failed_thumbnail_keeps_existing_avatar_files(avatar_dir, monkeypatch):
+    # Повторная загрузка того же изображения: файлы с тем же хэшем принадлежат
+    # текущему аватару и не удаляются
+    source = avatar_dir / "source.png"
+    source.write_bytes(_png())
+    urls = _make_thumbnails(str(source), 1, "0123456789abcdef")
+    fit = ImageOps.fit
+
+    def failing_fit(image, size, *args, **kwargs):
+        if size[0] == avatar_service.AVATAR_SIZES[-1]:
+            raise OSError("No space left on device")
+        return fit(image, size, *args, **kwargs)
+
+    monkeypatch.setattr(ImageOps, "fit", failing_fit)
+    with pytest.raises(AvatarError):
+        _make_thumbnails(str(source), 1, "0123456789abcdef")
+    assert sorted(path.name for path in avatar_dir.iterdir()) == sorted(
+        ["source.png"] + [url.rsplit("/", 1)[1] for url in urls.values()]
+    )
+
+
+def test_concurrent_uploads_keep_current_avatar_files(database, avatar_dir):
+    # Текущий аватар — красный; одновременно загружаются синий (обрабатывается
+    # быстрее) и снова красный. Файлы итогового аватара должны остаться на месте
+    headers = auth_headers(1)
+
+    async def upload(client, color, side):
+        response = await client.post(
+            "/api/users/upload-avatar", files={"file": ("a.png", _png(side, color), "image/png")}, headers=headers,
+        )
+        assert response.status_code == 200, response.text
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            await upload(client, "red", 1024)
+            for _ in range(3):
+                await asyncio.gather(upload(client, "blue", 16), upload(client, "red", 1024))
+
+    asyncio.run(run())
+    db = SessionLocal()
+    try:
+        avatar_path = db.get(User, 1).avatar_path
+    finally:
+        db.close()
+    expected = {url.rsplit("/", 1)[1] for url in avatar_service.avatar_urls(avatar_path)}
+    assert {name for name in os.listdir(avatar_dir)} == expected
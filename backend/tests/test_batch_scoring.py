@@ -0,0 +1,124 @@
+# Векторный расчёт (calculations/batch.py) должен совпадать со скалярным calculate_health_score
+import math
+import random
+
+import numpy as np
+import pytest
+
+from backend.calculations.batch import calculate_health_scores_batch, calculate_physiological_scores_batch
+from backend.calculations.score_calculator import calculate_health_score
+
+# Границы возрастных групп норм (18–30, 31–45, 46–60, 61–100) и интерпретации (60),
+# а также возрасты вне таблицы норм
+EDGE_AGES = (1, 17, 18, 30, 31, 45, 46, 59, 60, 61, 99, 100, 101, 120)
+
+
+def _question_set(rng, count):
+    return [(rng.choice([0.5, 1.0, 1.5, 2.0]), rng.random() < 0.5) for _ in range(count)]
+
+
+def _random_row(rng, questions, age=None):
+    return {
+        "health_data": {
+            "systolic_bp": rng.randint(60, 220),
+            "diastolic_bp": rng.randint(30, 140),
+            "pulse": rng.randint(30, 200),
+            "temperature": round(rng.uniform(34.0, 41.0), 1),
+            "height": rng.randint(120, 220),
+            "weight": rng.randint(30, 200),
+        },
+        "age": age if age is not None else rng.randint(1, 120),
+        "answers": [rng.choice([True, False, None]) for _ in questions],
+    }
+
+
+def _scalar(row, questions):
+    user_answers = [
+        {"answer": answer, "weight": weight, "positive_uns": positive}
+        for answer, (weight, positive) in zip(row["answers"], questions)
+    ]
+    return calculate_health_score(dict(row["health_data"]), user_answers, row["age"])
+
+
+def _batch(rows, questions):
+    column = lambda key: [row["health_data"][key] for row in rows]
+    answers = [[math.nan if a is None else float(a) for a in row["answers"]] for row in rows]
+    return calculate_health_scores_batch(
+        column("systolic_bp"), column("diastolic_bp"), column("pulse"), column("temperature"),
+        column("height"), column("weight"), [row["age"] for row in rows],
+        np.array(answers).reshape(len(rows), len(questions)),
+        [weight for weight, _ in questions], [positive for _, positive in questions],
+    )
+
+
+def _assert_parity(rows, questions):
+    batch = _batch(rows, questions)
+    for i, row in enumerate(rows):
+        expected = _scalar(row, questions)
+        assert batch["total_score"][i] == pytest.approx(expected["total_score"]), row
+        assert batch["interpretation_code"][i] == expected["interpretation_code"], row
+        for key, value in expected["details"].items():
+            assert batch["details"][key][i] == pytest.approx(value), (key, row)
+
+
+def test_random_rows_match_scalar():
+    rng = random.Random(1)
+    questions = _question_set(rng, 30)
+    _assert_parity([_random_row(rng, questions) for _ in range(2000)], questions)
+
+
+def test_cohort_edge_ages_match_scalar():
+    rng = random.Random(2)
+    questions = _question_set(rng, 10)
+    _assert_parity([_random_row(rng, questions, age) for age in EDGE_AGES for _ in range(20)], questions)
+
+
+def test_boundary_vitals_match_scalar():
+    # Значения ровно на границах норм и температуры, а также далеко за пределами
+    rng = random.Random(3)
+    questions = _question_set(rng, 5)
+    rows = []
+    for age in EDGE_AGES:
+        for systolic, diastolic, pulse, temperature in (
+            (110, 75, 60, 36.0), (130, 85, 80, 37.0), (145, 95, 86, 35.9),
+            (155, 100, 87, 37.1), (300, 200, 250, 45.0), (20, 10, 1, 25.0),
+        ):
+            row = _random_row(rng, questions, age)
+            row["health_data"].update(systolic_bp=systolic, diastolic_bp=diastolic, pulse=pulse, temperature=temperature)
+            rows.append(row)
+    _assert_parity(rows, questions)
+
+
+def test_missing_and_unknown_answers_match_scalar():
+    rng = random.Random(4)
+    questions = _question_set(rng, 8)
+    rows = [_random_row(rng, questions) for _ in range(5)]
+    rows[0]["answers"] = [None] * len(questions)  # только "Не знаю" — балл за опросник 0
+    rows[1]["answers"] = [positive for _, positive in questions]  # все ответы совпадают
+    rows[2]["answers"] = [not positive for _, positive in questions]
+    _assert_parity(rows, questions)
+
+
+def test_empty_questionnaire_matches_scalar():
+    rng = random.Random(5)
+    _assert_parity([_random_row(rng, []) for _ in range(5)], [])
+
+
+@pytest.mark.parametrize("key", ["weight", "height", "temperature"])
+def test_missing_vitals_rejected_by_both(key):
+    rng = random.Random(6)
+    row = _random_row(rng, [])
+    row["health_data"][key] = None
+    with pytest.raises(ValueError):
+        _scalar(row, [])
+    with pytest.raises(ValueError):
+        _batch([row], [])
+
+
+def test_non_positive_age_rejected_by_both():
+    rng = random.Random(7)
+    row = _random_row(rng, [], age=0)
+    with pytest.raises(ValueError):
+        _scalar(row, [])
+    with pytest.raises(ValueError):
+        calculate_physiological_scores_batch([120], [80], [70], [36.6], [175], [70], [0])
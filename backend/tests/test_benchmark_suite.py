@@ -0,0 +1,51 @@
+# Сравнение прогона набора бенчмарков с сохранённой базой (benchmarks/suite.py)
+import copy
+import json
+
+import pytest
+
+from backend.benchmarks import suite
+
+with open(suite.BASELINE_PATH, encoding="utf-8") as f:
+    BASELINE = json.load(f)
+
+MICRO = next(iter(BASELINE["micro"]))
+ROUTE = next(iter(BASELINE["load"]["routes"]))
+
+
+def _regressions(report, tolerance=suite.DEFAULT_TOLERANCE):
+    return {name for name, _, _, _, regression in suite.compare(report, BASELINE, tolerance) if regression}
+
+
+def test_baseline_compared_with_itself_has_no_regressions():
+    assert _regressions(BASELINE) == set()
+
+
+def test_slower_and_lower_throughput_are_regressions():
+    report = copy.deepcopy(BASELINE)
+    report["micro"][MICRO]["ns_per_call"] *= 2
+    report["load"]["routes"][ROUTE]["p95_ms"] *= 1.5
+    report["load"]["throughput_rps"] *= 0.5
+    assert _regressions(report) == {
+        f"micro.{MICRO}.ns_per_call", f"load.{ROUTE}.p95_ms", "load.throughput_rps",
+    }
+
+
+def test_improvements_changes_within_tolerance_and_new_metrics_pass():
+    report = copy.deepcopy(BASELINE)
+    report["micro"][MICRO]["ns_per_call"] *= 0.5
+    report["load"]["throughput_rps"] *= 2
+    report["load"]["routes"][ROUTE]["p99_ms"] *= 1 + suite.DEFAULT_TOLERANCE / 2
+    report["micro"]["new_benchmark"] = {"ns_per_call": 1.0}
+    rows = {row[0]: row for row in suite.compare(report, BASELINE, suite.DEFAULT_TOLERANCE)}
+    assert not any(row[4] for row in rows.values())
+    assert rows["micro.new_benchmark.ns_per_call"][1] is None
+
+
+@pytest.mark.parametrize("slowdown, exit_code", [(1.0, 0), (3.0, 1)])
+def test_main_exit_code_reflects_regressions(monkeypatch, capsys, slowdown, exit_code):
+    report = copy.deepcopy(BASELINE)
+    report["micro"][MICRO]["ns_per_call"] *= slowdown
+    monkeypatch.setattr(suite, "run_suite", lambda users, iterations: report)
+    assert suite.main(["--baseline", suite.BASELINE_PATH]) == exit_code
+    assert ("РЕГРЕССИЯ" in capsys.readouterr().out) == bool(exit_code)
@@ -0,0 +1,11 @@
+# Импорт приложения не загружает тяжёлые модули, нужные только позже,
+# и не обращается к БД (проверка из benchmarks/bench_import_time.py)
+from backend.benchmarks.bench_import_time import LAZY_MODULES, import_once
+
+
+def test_app_import_leaves_lazy_modules_unloaded():
+    # Импорт идёт в отдельном процессе с недоступной Postgres в DATABASE_URL
+    modules, loaded_lazy = import_once()
+    assert "backend.index" in modules
+    assert loaded_lazy == []
+    assert not any(name.split(".")[0] in LAZY_MODULES for name in modules)
@@ -0,0 +1,60 @@
+# Табличная интерпретация балла (calculations/interpretation.py) совпадает
+# с прежней цепочкой условий на границах возрастных групп и порогов полос
+import numpy as np
+import pytest
+
+from backend.calculations.batch import get_interpretation_codes
+from backend.calculations.interpretation import analysis_text, interpretation_code, interpretation_label
+from backend.calculations.utils import get_interpretation
+
+AGES = (0, 17, 18, 30, 31, 45, 46, 59, 60, 61, 99, 100, 120)
+THRESHOLDS = (25, 30, 45, 50, 65, 70, 80, 85)
+SCORES = sorted({0, 0.1, 99.9, 100} | {t + d for t in THRESHOLDS for d in (-0.1, 0, 0.1)})
+
+
+def legacy_interpretation(score, age):
+    # Прежняя реализация get_interpretation (до табличной)
+    if age >= 60:
+        if score >= 80:
+            return "Отличное состояние здоровья с учетом возраста"
+        elif score >= 65:
+            return "Хорошее состояние здоровья с учетом возраста"
+        elif score >= 45:
+            return "Удовлетворительное состояние здоровья с учетом возраста"
+        elif score >= 25:
+            return "Состояние здоровья требует внимания с учетом возраста"
+        else:
+            return "Низкий уровень здоровья с учетом возраста"
+    else:
+        if score >= 85:
+            return "Отличное состояние здоровья"
+        elif score >= 70:
+            return "Хорошее состояние здоровья"
+        elif score >= 50:
+            return "Удовлетворительное состояние здоровья"
+        elif score >= 30:
+            return "Состояние здоровья требует внимания"
+        else:
+            return "Низкий уровень здоровья"
+
+
+def legacy_analysis_text(total_score, interpretation):
+    return f"Итоговое состояние здоровья: {total_score}/100 – {interpretation} (с учетом вашего возраста)"
+
+
+@pytest.mark.parametrize("age", AGES)
+def test_matches_legacy_at_cohort_and_threshold_edges(age):
+    for score in SCORES:
+        expected = legacy_interpretation(score, age)
+        code = interpretation_code(score, age)
+        assert get_interpretation(score, age) == expected, (score, age)
+        assert interpretation_label(code) == expected, (score, age)
+        assert analysis_text(score, code) == legacy_analysis_text(score, expected), (score, age)
+
+
+def test_batch_codes_match_scalar_codes():
+    ages, scores = np.meshgrid(AGES, SCORES)
+    codes = get_interpretation_codes(scores.ravel(), ages.ravel())
+    assert codes.tolist() == [
+        interpretation_code(score, age) for score, age in zip(scores.ravel().tolist(), ages.ravel().tolist())
+    ]
@@ -0,0 +1,76 @@
+# Гонка моделей race_models на заглушках поставщика LLM
+import asyncio
+import time
+
+import pytest
+
+from backend.services.llm import FakeLLMProvider, LLMProvider, RecommendationError, race_models
+
+
+class RecordingProvider(LLMProvider):
+    # Модель отвечает своим именем через latency[model] секунд; отмены записываются
+    def __init__(self, latency):
+        self.latency = latency
+        self.cancelled = []
+
+    async def complete(self, model, prompt):
+        try:
+            await asyncio.sleep(self.latency[model])
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        return model
+
+
+def test_first_success_wins(provider_health):
+    provider = RecordingProvider({"slow": 0.3, "fast": 0.01, "medium": 0.1})
+    assert asyncio.run(race_models("prompt", provider, ["slow", "fast", "medium"], timeout=5)) == "fast"
+
+
+def test_failed_model_does_not_win(provider_health):
+    provider = FakeLLMProvider(response="ответ", latency={"broken": 0.0, "ok": 0.05}, failures={"broken"})
+    assert asyncio.run(race_models("prompt", provider, ["broken", "ok"], timeout=5)) == "ответ"
+    assert sorted(provider.calls) == ["broken", "ok"]
+
+
+def test_losing_tasks_are_cancelled(provider_health):
+    provider = RecordingProvider({"fast": 0.01, "slow": 10, "slower": 20})
+
+    async def run():
+        started = time.monotonic()
+        response = await race_models("prompt", provider, ["fast", "slow", "slower"], timeout=30)
+        # После возврата не остаётся задач, кроме текущей
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        return response, time.monotonic() - started, others
+
+    response, elapsed, others = asyncio.run(run())
+    assert response == "fast"
+    assert elapsed < 5
+    assert sorted(provider.cancelled) == ["slow", "slower"]
+    assert others == []
+    # Проигравшие не считаются ошибкой модели
+    snapshot = provider_health.snapshot()
+    assert snapshot["slow"]["samples"] == 0 and snapshot["slow"]["state"] == "closed"
+
+
+def test_timeout_counts_as_failure(provider_health):
+    provider = RecordingProvider({"a": 10, "b": 10})
+    started = time.monotonic()
+    with pytest.raises(RecommendationError, match="превышено время ожидания"):
+        asyncio.run(race_models("prompt", provider, ["a", "b"], timeout=0.05))
+    assert time.monotonic() - started < 5
+    assert sorted(provider.cancelled) == ["a", "b"]
+    assert provider_health.snapshot()["a"]["consecutive_failures"] == 1
+
+
+def test_all_models_failing_raises(provider_health):
+    provider = FakeLLMProvider(failures={"a", "b", "c"})
+    with pytest.raises(RecommendationError, match="Не удалось получить рекомендацию"):
+        asyncio.run(race_models("prompt", provider, ["a", "b", "c"], timeout=5))
+    assert sorted(provider.calls) == ["a", "b", "c"]
+
+
+def test_empty_response_is_failure(provider_health):
+    provider = FakeLLMProvider(response="   ")
+    with pytest.raises(RecommendationError, match="пустой ответ"):
+        asyncio.run(race_models("prompt", provider, ["a"], timeout=5))
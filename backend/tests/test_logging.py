@@ -0,0 +1,66 @@
+# Логирование через очередь (logging_config.py): записи доходят до вывода,
+# форматируются в потоке QueueListener и дописываются при shutdown_logging
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from backend.logging_config import shutdown_logging, setup_logging
+
+
+class Recorder:
+    # Аргумент сообщения, запоминающий поток, в котором его превратили в строку
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "значение"
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    setup_logging(level="INFO", log_format="json", stream=stream)
+    try:
+        yield stream
+    finally:
+        shutdown_logging()
+
+
+def test_records_reach_listener_and_queue_is_flushed_on_shutdown(log_stream):
+    logger = logging.getLogger("backend.test")
+    for i in range(500):
+        logger.info("запись %s", i, extra={"user_id": i})
+    # Всё, что осталось в очереди, записывается до возврата из shutdown_logging
+    shutdown_logging()
+
+    entries = [json.loads(line) for line in log_stream.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == [f"запись {i}" for i in range(500)]
+    assert entries[-1]["user_id"] == 499
+    assert entries[0]["logger"] == "backend.test"
+
+
+def test_message_is_formatted_in_listener_thread(log_stream):
+    logger = logging.getLogger("backend.test")
+    enabled, disabled = Recorder(), Recorder()
+    logger.info("включено: %s", enabled)
+    logger.debug("выключено: %s", disabled)
+    shutdown_logging()
+
+    # Обработчики pytest (caplog) форматируют запись в вызывающем потоке,
+    # поэтому проверяется, что её форматировал и поток QueueListener
+    assert set(enabled.threads) - {threading.current_thread().name}
+    # Запись ниже уровня не форматируется вовсе
+    assert disabled.threads == []
+    assert "включено: значение" in log_stream.getvalue()
+
+
+def test_records_after_shutdown_use_standard_logging(log_stream, caplog):
+    shutdown_logging()
+    with caplog.at_level(logging.INFO, logger="backend"):
+        logging.getLogger("backend.test").info("после остановки")
+    assert "после остановки" in caplog.text
+    assert "после остановки" not in log_stream.getvalue()
@@ -0,0 +1,58 @@
+# Метрики Prometheus (services/metrics.py): метки маршрутов по шаблону,
+# счётчики и гистограммы в выводе /metrics
+import re
+
+import pytest
+
+from conftest import auth_headers
+from backend.services import metrics
+from backend.services.metrics import MetricsRegistry
+
+pytestmark = pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="METRICS_ENABLED=0")
+
+JOB_SERIES = 'http_request_duration_seconds_count{method="GET",route="/api/recommendation_jobs/{job_id}",status="404"}'
+
+
+def _value(text: str, series: str) -> float:
+    match = re.search(re.escape(series) + r" (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_requests_are_labelled_by_route_template(client):
+    headers = auth_headers(1)
+    before = _value(client.get("/metrics").text, JOB_SERIES)
+    for job_id in ("first", "second", "third"):
+        assert client.get(f"/api/recommendation_jobs/{job_id}", headers=headers).status_code == 404
+    client.get("/uploads/avatars/missing.png")
+    client.get("/no/such/path")
+
+    text = client.get("/metrics").text
+    assert _value(text, JOB_SERIES) == before + 3
+    # Идентификаторы из пути не становятся метками
+    assert "recommendation_jobs/first" not in text and "recommendation_jobs/second" not in text
+    assert 'route="/uploads/*"' in text
+    assert 'route="unmatched"' in text
+    assert "/no/such/path" not in text
+
+
+def test_counter_and_histogram_exposition():
+    registry = MetricsRegistry()
+    counter = registry.counter("attempts_total", "Попытки", ("outcome",))
+    histogram = registry.histogram("duration_seconds", "Время", ("op",), buckets=(0.1, 1.0))
+    counter.inc("success")
+    counter.inc("success")
+    counter.inc("failure", amount=3)
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "select")
+
+    text = registry.render()
+    assert "# TYPE attempts_total counter" in text
+    assert _value(text, 'attempts_total{outcome="success"}') == 2
+    assert _value(text, 'attempts_total{outcome="failure"}') == 3
+    assert _value(text, 'duration_seconds_bucket{op="select",le="0.1"}') == 1
+    assert _value(text, 'duration_seconds_bucket{op="select",le="1.0"}') == 2
+    assert _value(text, 'duration_seconds_bucket{op="select",le="+Inf"}') == 3
+    assert _value(text, 'duration_seconds_count{op="select"}') == 3
+    assert _value(text, 'duration_seconds_sum{op="select"}') == pytest.approx(5.55)
+    # Повторная регистрация возвращает ту же метрику
+    assert registry.counter("attempts_total", "Попытки", ("outcome",)) is counter
@@ -0,0 +1,87 @@
+# Выключатель моделей (services/provider_health.py) вместе с race_models / stream_models
+import asyncio
+
+import pytest
+
+from backend.services.llm import FakeLLMProvider, RecommendationError, race_models, stream_models
+from backend.services.provider_health import CLOSED, HALF_OPEN, OPEN, ProviderHealthTracker
+
+
+def half_open(tracker, model):
+    # Модель после серии ошибок, время открытого состояния уже истекло
+    for _ in range(tracker.failure_threshold):
+        tracker.record_failure(model, 0.01)
+    tracker._models[model].opened_at -= tracker.open_seconds
+    return tracker
+
+
+async def consume(events):
+    return [event async for event in events]
+
+
+def test_circuit_opens_after_consecutive_failures():
+    tracker = ProviderHealthTracker(failure_threshold=2, open_seconds=60)
+    tracker.record_failure("a", 0.1)
+    assert tracker.candidates(["a"]) == ["a"]
+    tracker.record_failure("a", 0.1)
+    assert tracker.snapshot()["a"]["state"] == OPEN
+    assert tracker.candidates(["a", "b"]) == ["b"]
+
+
+def test_half_open_allows_single_probe():
+    tracker = half_open(ProviderHealthTracker(), "a")
+    # candidates не занимает пробный запрос, acquire — только один
+    assert tracker.candidates(["a"]) == ["a"]
+    assert tracker.candidates(["a"]) == ["a"]
+    assert tracker.acquire("a")
+    assert not tracker.acquire("a")
+    assert tracker.candidates(["a"]) == []
+    tracker.record_success("a", 0.1)
+    assert tracker.snapshot()["a"]["state"] == CLOSED
+
+
+def test_stream_does_not_hold_probe_of_untried_model(provider_health):
+    # Поток закончился на первой модели: восстанавливающаяся модель дальше по списку
+    # не вызывалась и должна остаться доступной для следующего вызова
+    half_open(provider_health, "b")
+    events = asyncio.run(consume(stream_models("prompt", FakeLLMProvider(), ["a", "b"], stall_timeout=5)))
+
+    assert events[0] == ("model", "a")
+    assert events[-1][0] == "done"
+    assert provider_health.snapshot()["b"]["state"] == HALF_OPEN
+    assert provider_health.candidates(["a", "b"]) == ["a", "b"]
+    assert provider_health.acquire("b")
+
+
+def test_stream_disconnect_releases_probe(provider_health):
+    # Клиент отключился на середине потока пробной модели
+    half_open(provider_health, "a")
+
+    async def disconnect_after_first_chunk():
+        events = stream_models("prompt", FakeLLMProvider(chunk_size=2), ["a"], stall_timeout=5)
+        async for event, _ in events:
+            if event == "chunk":
+                break
+        await events.aclose()
+
+    asyncio.run(disconnect_after_first_chunk())
+    assert provider_health.candidates(["a"]) == ["a"]
+    assert provider_health.snapshot()["a"]["state"] == HALF_OPEN
+
+
+def test_stream_probe_failure_reopens_circuit(provider_health):
+    half_open(provider_health, "a")
+    provider = FakeLLMProvider(failures={"a"})
+    with pytest.raises(RecommendationError):
+        asyncio.run(consume(stream_models("prompt", provider, ["a"], stall_timeout=5)))
+
+    assert provider.calls == ["a"]
+    assert provider_health.snapshot()["a"]["state"] == OPEN
+    assert provider_health.candidates(["a"]) == []
+
+
+def test_race_probe_released_when_losing(provider_health):
+    half_open(provider_health, "slow")
+    provider = FakeLLMProvider(latency={"fast": 0.0, "slow": 5})
+    assert asyncio.run(race_models("prompt", provider, ["fast", "slow"], timeout=10)) == provider.response
+    assert provider_health.acquire("slow")
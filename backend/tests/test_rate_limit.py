@@ -0,0 +1,68 @@
+# Общий bucket правила расходуют только запросы с действительным JWT;
+# запросы без токена или с поддельным ограничиваются отдельно по адресу клиента
+import anyio
+
+from conftest import auth_headers
+from backend.services.rate_limit import MemoryRateLimitBackend, RateLimitMiddleware, load_rate_limits
+
+ROUTE = ("POST", "/api/generate_recommendation")
+LIMITS = load_rate_limits('{"llm": {"user": "2/60", "global": "3/60", "anonymous": "2/60"}}')
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _statuses(middleware, requests):
+    # requests — [(заголовки, адрес клиента)]; возвращает коды ответов по порядку
+    async def run():
+        statuses = []
+        for headers, client in requests:
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            scope = {
+                "type": "http", "method": ROUTE[0], "path": ROUTE[1], "client": (client, 1234),
+                "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            }
+            await middleware(scope, receive, send)
+        return statuses
+
+    return anyio.run(run)
+
+
+def _middleware():
+    return RateLimitMiddleware(_ok_app, routes={ROUTE: "llm"}, limits=LIMITS, backend=MemoryRateLimitBackend())
+
+
+def test_anonymous_requests_do_not_drain_global_bucket(monkeypatch):
+    monkeypatch.setattr("backend.services.rate_limit.RATE_LIMIT_ENABLED", True)
+    middleware = _middleware()
+    forged = {"Authorization": "Bearer not-a-jwt"}
+    # Поток запросов с поддельным токеном упирается в свой bucket на адрес...
+    assert _statuses(middleware, [(forged, "10.0.0.1")] * 5) == [200, 200, 429, 429, 429]
+    assert _statuses(middleware, [({}, "10.0.0.2")] * 3) == [200, 200, 429]
+    # ...а пользователи с действительным токеном получают весь общий лимит
+    users = [(auth_headers(1), "10.0.0.3"), (auth_headers(2), "10.0.0.3"), (auth_headers(3), "10.0.0.4")]
+    assert _statuses(middleware, users) == [200, 200, 200]
+    assert _statuses(middleware, [(auth_headers(4), "10.0.0.5")]) == [429]
+
+
+def test_verified_user_limits(monkeypatch):
+    monkeypatch.setattr("backend.services.rate_limit.RATE_LIMIT_ENABLED", True)
+    middleware = _middleware()
+    # Лимит пользователя не зависит от адреса, с которого он приходит
+    requests = [(auth_headers(1), "10.0.0.1"), (auth_headers(1), "10.0.0.2"), (auth_headers(1), "10.0.0.3")]
+    assert _statuses(middleware, requests) == [200, 200, 429]
+
+
+def test_anonymous_limit_can_be_disabled(monkeypatch):
+    monkeypatch.setattr("backend.services.rate_limit.RATE_LIMIT_ENABLED", True)
+    limits = load_rate_limits('{"llm": {"anonymous": null}}')
+    middleware = RateLimitMiddleware(_ok_app, routes={ROUTE: "llm"}, limits=limits, backend=MemoryRateLimitBackend())
+    assert _statuses(middleware, [({}, "10.0.0.1")] * 20) == [200] * 20
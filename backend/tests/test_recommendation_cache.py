@@ -0,0 +1,20 @@
+from backend.db.connection import SessionLocal
+from backend.db.models import RecommendationCacheEntry
+from backend.services.recommendation_cache import RecommendationCache
+
+
+def test_prune_runs_every_n_puts(database, monkeypatch):
+    cache = RecommendationCache(db_max_rows=2, prune_every=5)
+    prunes = []
+    original_prune = cache.prune
+    monkeypatch.setattr(cache, "prune", lambda db: (prunes.append(1), original_prune(db)))
+    db = SessionLocal()
+    try:
+        for i in range(12):
+            cache.put(db, f"key-{i}", f"совет {i}")
+        assert len(prunes) == 2
+        # Последняя очистка оставила не больше db_max_rows, дальше записи копятся до следующей
+        assert db.query(RecommendationCacheEntry).count() == 2 + 2
+        assert cache.get(db, "key-11") == "совет 11"
+    finally:
+        db.close()
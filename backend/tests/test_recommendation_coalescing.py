@@ -0,0 +1,184 @@
+# Объединение генераций рекомендации по одному результату: одновременные задачи,
+# поток SSE и задача из очереди, отключение клиента потока.
+# Приложение, очередь задач и заглушка LLM работают в одном event loop
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from conftest import add_result, auth_headers
+from backend.benchmarks.common import random_payload
+from backend.index import app
+from backend.services import llm
+from backend.services.llm import FakeLLMProvider
+from backend.services.recommendation_jobs import JOB_DONE, job_queue
+from backend.services.single_flight import recommendation_flights
+
+RESPONSE = "Пейте больше воды и гуляйте каждый день."
+CLIENTS = 10
+
+
+@pytest.fixture
+def provider(database, monkeypatch, provider_health):
+    # Одна модель: число вызовов провайдера — число генераций
+    provider = FakeLLMProvider(response=RESPONSE, latency=0.1, chunk_size=5, chunk_delay=0.05)
+    monkeypatch.setattr(llm, "_provider", provider)
+    monkeypatch.setattr(llm, "models_to_try", ["a"])
+    return provider
+
+
+@pytest.fixture
+def following(monkeypatch):
+    # Событие: задача из очереди начала ждать (или выполнять) общую генерацию
+    event = None
+    run = recommendation_flights.run
+
+    async def spy(key, factory):
+        event.set()
+        return await run(key, factory)
+
+    monkeypatch.setattr(recommendation_flights, "run", spy)
+
+    def make():
+        nonlocal event
+        event = asyncio.Event()
+        return event
+
+    return make
+
+
+def run_app(scenario):
+    # scenario(client) выполняется при запущенной очереди задач
+    async def run():
+        await job_queue.start()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+                return await scenario(client)
+        finally:
+            await job_queue.stop()
+
+    return asyncio.run(run())
+
+
+async def submit(client, headers):
+    random.seed(25)
+    response = await client.post("/api/submit_health_data", json=random_payload(questions=10), headers=headers)
+    assert response.status_code == 200
+
+
+async def job_state(client, headers, job_id):
+    await asyncio.wait_for(job_queue._queue.join(), 10)
+    return (await client.get(f"/api/recommendation_jobs/{job_id}", headers=headers)).json()
+
+
+class StreamClient:
+    # Поток SSE напрямую через ASGI: httpx.ASGITransport не отдаёт ответ по частям
+    # и не умеет отключать клиента посреди ответа
+    def __init__(self, headers):
+        self.headers = [(b"host", b"test")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        self.body = b""
+        self.first_chunk = asyncio.Event()
+        self.disconnect = asyncio.Event()
+        self._request_sent = False
+
+    async def _receive(self):
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message):
+        if message["type"] == "http.response.body":
+            self.body += message.get("body", b"")
+            if b"event: chunk" in self.body:
+                self.first_chunk.set()
+
+    def start(self):
+        path = "/api/generate_recommendation/stream"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": self.headers, "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        }
+        return asyncio.create_task(app(scope, self._receive, self._send))
+
+
+def test_concurrent_generate_calls_share_one_job(provider):
+    headers = auth_headers(1)
+
+    async def scenario(client):
+        await submit(client, headers)
+        responses = await asyncio.gather(*(
+            client.post("/api/generate_recommendation", headers=headers) for _ in range(CLIENTS)
+        ))
+        assert {response.status_code for response in responses} == {202}
+        job_ids = {response.json()["job_id"] for response in responses}
+        assert len(job_ids) == 1
+        return await job_state(client, headers, job_ids.pop())
+
+    job = run_app(scenario)
+    assert (job["status"], job["recommendation"]) == (JOB_DONE, RESPONSE)
+    assert provider.calls == ["a"]
+
+
+def test_existing_recommendation_makes_no_model_calls(provider):
+    headers = auth_headers(1)
+    add_result(1, recommendation="Сохранённая рекомендация")
+
+    async def scenario(client):
+        responses = await asyncio.gather(*(
+            client.post("/api/generate_recommendation", headers=headers) for _ in range(CLIENTS)
+        ))
+        stream = await client.post("/api/generate_recommendation/stream", headers=headers)
+        return [response.json() for response in responses], stream.text
+
+    jobs, stream = run_app(scenario)
+    assert {(job["status"], job["recommendation"]) for job in jobs} == {(JOB_DONE, "Сохранённая рекомендация")}
+    assert "Сохранённая рекомендация" in stream
+    assert provider.calls == []
+
+
+def test_stream_and_job_share_one_generation(provider, following):
+    headers = auth_headers(1)
+
+    async def scenario(client):
+        await submit(client, headers)
+        job_following = following()
+        stream = StreamClient(headers)
+        stream_task = stream.start()
+        await stream.first_chunk.wait()
+        # Задача ставится, пока поток ещё генерирует текст, и ждёт его результат
+        job_id = (await client.post("/api/generate_recommendation", headers=headers)).json()["job_id"]
+        await job_following.wait()
+        await stream_task
+        return stream.body.decode(), await job_state(client, headers, job_id)
+
+    body, job = run_app(scenario)
+    assert "event: done" in body
+    assert (job["status"], job["recommendation"]) == (JOB_DONE, RESPONSE)
+    assert provider.calls == ["a"]
+
+
+def test_stream_disconnect_does_not_fail_job(provider, following):
+    headers = auth_headers(1)
+
+    async def scenario(client):
+        await submit(client, headers)
+        job_following = following()
+        stream = StreamClient(headers)
+        stream_task = stream.start()
+        await stream.first_chunk.wait()
+        job_id = (await client.post("/api/generate_recommendation", headers=headers)).json()["job_id"]
+        await job_following.wait()
+        # Клиент потока отключается до конца генерации: задача вызывает модели сама
+        stream.disconnect.set()
+        await stream_task
+        return stream.body.decode(), await job_state(client, headers, job_id)
+
+    body, job = run_app(scenario)
+    assert "event: done" not in body
+    assert (job["status"], job["error"], job["recommendation"]) == (JOB_DONE, None, RESPONSE)
+    assert provider.calls == ["a", "a"]
@@ -0,0 +1,77 @@
+# Фоновые задачи генерации рекомендаций (services/recommendation_jobs.py)
+import asyncio
+
+from conftest import add_result
+from backend.db.connection import SessionLocal
+from backend.db.models import RecommendationJob
+from backend.services import recommendation_jobs
+from backend.services.recommendation_jobs import JOB_DONE, JOB_FAILED, RecommendationJobQueue
+
+
+def run_job(result_id: int):
+    # Ставит задачу по результату пользователя 1, ждёт её выполнения очередью
+    # и возвращает (статус, рекомендация результата)
+    async def run():
+        queue = RecommendationJobQueue(concurrency=1)
+        await queue.start()
+        try:
+            db = SessionLocal()
+            try:
+                job_id = queue.enqueue(db, 1, result_id).id
+            finally:
+                db.close()
+            await asyncio.wait_for(queue._queue.join(), 10)
+            return job_id
+        finally:
+            await queue.stop()
+
+    job_id = asyncio.run(run())
+    db = SessionLocal()
+    try:
+        job = db.get(RecommendationJob, job_id)
+        assert job.finished_at is not None
+        return job.status, job.result.recommendation
+    finally:
+        db.close()
+
+
+def fake_race(text):
+    async def race(prompt):
+        return text
+    return race
+
+
+def test_job_saves_recommendation(database, monkeypatch):
+    monkeypatch.setattr(recommendation_jobs, "race_models", fake_race("Совет"))
+    assert run_job(add_result(1)) == (JOB_DONE, "Совет")
+
+
+def test_unexpected_error_marks_job_failed(database, monkeypatch):
+    async def broken_race(prompt):
+        raise RuntimeError("соединение с БД потеряно")
+
+    monkeypatch.setattr(recommendation_jobs, "race_models", broken_race)
+    assert run_job(add_result(1)) == (JOB_FAILED, None)
+
+
+def test_error_while_starting_job_marks_it_failed(database, monkeypatch):
+    def broken_inputs(db, result):
+        raise RuntimeError("ошибка чтения")
+
+    monkeypatch.setattr(recommendation_jobs, "collect_prompt_inputs", broken_inputs)
+    assert run_job(add_result(1)) == (JOB_FAILED, None)
+
+
+def test_cache_write_error_keeps_saved_recommendation(database, monkeypatch):
+    def broken_put(db, key, recommendation):
+        raise RuntimeError("кэш недоступен")
+
+    monkeypatch.setattr(recommendation_jobs, "race_models", fake_race("Совет"))
+    monkeypatch.setattr(recommendation_jobs.recommendation_cache, "put", broken_put)
+    assert run_job(add_result(1)) == (JOB_DONE, "Совет")
+
+
+def test_missing_job_is_ignored(database):
+    queue = RecommendationJobQueue(concurrency=1)
+    queue._finish_job("missing", "Совет")
+    queue._fail_job("missing", "ошибка")
@@ -0,0 +1,98 @@
+# Потоковая генерация рекомендации (POST /generate_recommendation/stream) на заглушке LLM
+import json
+import random
+
+import pytest
+
+from conftest import auth_headers
+from backend.benchmarks.common import random_payload
+from backend.services import llm
+from backend.services.llm import FakeLLMProvider
+
+RESPONSE = "Пейте больше воды и гуляйте каждый день."
+
+
+@pytest.fixture
+def user(client):
+    # Пользователь 1 с одним результатом; возвращает заголовки авторизации
+    headers = auth_headers(1)
+    random.seed(12)
+    assert client.post("/api/submit_health_data", json=random_payload(questions=10), headers=headers).status_code == 200
+    return headers
+
+
+def use_provider(monkeypatch, models=("a", "b"), **kwargs):
+    provider = FakeLLMProvider(response=RESPONSE, chunk_size=5, **kwargs)
+    monkeypatch.setattr(llm, "_provider", provider)
+    monkeypatch.setattr(llm, "models_to_try", list(models))
+    return provider
+
+
+def read_events(client, headers):
+    events = []
+    with client.stream("POST", "/api/generate_recommendation/stream", headers=headers) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def saved_recommendation(client, headers):
+    return client.get("/api/results", params={"include_recommendation": True}, headers=headers).json()[0]["recommendation"]
+
+
+def test_chunks_arrive_in_order_and_end_with_done(client, user, monkeypatch, provider_health):
+    use_provider(monkeypatch)
+    events = read_events(client, user)
+
+    assert events[0] == ("model", {"model": "a"})
+    assert events[-1] == ("done", {"recommendation": RESPONSE})
+    chunks = [data["text"] for event, data in events if event == "chunk"]
+    assert chunks == [RESPONSE[i:i + 5] for i in range(0, len(RESPONSE), 5)]
+    assert [event for event, _ in events[1:-1]] == ["chunk"] * len(chunks)
+
+
+def test_recommendation_saved_on_done(client, user, monkeypatch, provider_health):
+    provider = use_provider(monkeypatch)
+    read_events(client, user)
+    assert saved_recommendation(client, user) == RESPONSE
+
+    # Повторный поток отдаёт сохранённый текст без обращения к моделям
+    calls = len(provider.calls)
+    assert read_events(client, user) == [("chunk", {"text": RESPONSE}), ("done", {"recommendation": RESPONSE})]
+    assert len(provider.calls) == calls
+
+
+def test_stalled_model_is_reset_and_next_model_streams(client, user, monkeypatch, provider_health):
+    use_provider(monkeypatch, stalls={"a"})
+    monkeypatch.setattr(llm, "STREAM_STALL_TIMEOUT", 0.2)
+    events = read_events(client, user)
+
+    names = [event for event, _ in events]
+    reset_at = names.index("reset")
+    # Модель a отдала один фрагмент и зависла; после reset текст целиком от модели b
+    assert events[:2] == [("model", {"model": "a"}), ("chunk", {"text": RESPONSE[:5]})]
+    assert "a: поток завис" in events[reset_at][1]["reason"]
+    assert events[reset_at + 1] == ("model", {"model": "b"})
+    after_reset = [data["text"] for event, data in events[reset_at + 2:] if event == "chunk"]
+    assert "".join(after_reset) == RESPONSE
+    assert events[-1] == ("done", {"recommendation": RESPONSE})
+    assert provider_health.snapshot()["a"]["consecutive_failures"] == 1
+
+
+def test_error_when_all_models_fail(client, user, monkeypatch, provider_health):
+    use_provider(monkeypatch, failures={"a", "b"})
+    events = read_events(client, user)
+
+    assert [event for event, _ in events] == ["model", "model", "error"]
+    assert "Не удалось получить рекомендацию" in events[-1][1]["detail"]
+    assert saved_recommendation(client, user) is None
+
+
+def test_stream_without_results_is_404(client):
+    assert client.post("/api/generate_recommendation/stream", headers=auth_headers(2)).status_code == 404
@@ -0,0 +1,174 @@
+# Массовый пересчёт (rescore.py): совпадение с calculate_for_user, режим --dry-run
+# и продолжение с контрольной точки
+import csv
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from backend import rescore
+from backend.benchmarks.common import reset_database
+from backend.calculate_service import calculate_for_user
+from backend.calculations.interpretation import analysis_text
+from backend.db.connection import SessionLocal
+from backend.db.models import HealthData, Result, UserScoreRollup, UserAnswer
+from backend.services.question_catalog import load_question_catalog
+
+USERS = 40
+NO_DATA = {5, 17}  # пользователи без данных о здоровье
+INVALID = {9}  # рост 0 — расчёт невозможен
+SCORED = [user_id for user_id in range(1, USERS + 1) if user_id not in NO_DATA | INVALID]
+CHUNK = "7"
+
+
+@pytest.fixture
+def population():
+    reset_database(questions=10, users=USERS)
+    load_question_catalog()
+    rng = random.Random(22)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for user_id in range(1, USERS + 1):
+            if user_id in NO_DATA:
+                continue
+            # Две записи: в расчёт идёт последняя
+            for age_days in (30, 1):
+                db.add(HealthData(
+                    user_id=user_id, systolic_bp=rng.randint(90, 170), diastolic_bp=rng.randint(55, 105),
+                    pulse=rng.randint(45, 120), temperature=round(rng.uniform(35.5, 38.0), 1),
+                    height=0 if user_id in INVALID else rng.randint(150, 200), weight=rng.randint(45, 130),
+                    age=40, created_at=now - timedelta(days=age_days),
+                ))
+            for question_id in rng.sample(range(1, 11), rng.randint(0, 10)):
+                db.add(UserAnswer(user_id=user_id, question_id=question_id, answer=rng.choice([True, False, None])))
+        db.commit()
+    finally:
+        db.close()
+
+
+def expected_scores():
+    db = SessionLocal()
+    try:
+        return {user_id: round(calculate_for_user(db, user_id)["total_score"], 2) for user_id in SCORED}
+    finally:
+        db.close()
+
+
+def results():
+    db = SessionLocal()
+    try:
+        return db.execute(select(Result.user_id, Result.health_score, Result.analysis_text, Result.created_at)).all()
+    finally:
+        db.close()
+
+
+def run(tmp_path, *args, workers: int = 1):
+    return rescore.main([
+        "--workers", str(workers), "--chunk-size", CHUNK, "--checkpoint", str(tmp_path / "checkpoint.json"), *args,
+    ])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rescore_matches_calculate_for_user(population, tmp_path, workers):
+    expected = expected_scores()
+    db = SessionLocal()
+    try:
+        expected_codes = {user_id: calculate_for_user(db, user_id)["interpretation_code"] for user_id in SCORED}
+    finally:
+        db.close()
+
+    assert run(tmp_path, workers=workers) == 0
+    rows = results()
+    assert sorted(row.user_id for row in rows) == SCORED
+    assert len(set(expected_codes.values())) > 1
+    for row in rows:
+        assert row.health_score == pytest.approx(expected[row.user_id]), row.user_id
+        # Текст анализа выбирается по коду интерпретации
+        assert row.analysis_text == analysis_text(row.health_score, expected_codes[row.user_id]), row.user_id
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert checkpoint["finished"] is True
+    assert (checkpoint["users_scored"], checkpoint["skipped_no_data"], checkpoint["skipped_invalid"]) == (
+        len(SCORED), len(NO_DATA), len(INVALID)
+    )
+
+
+def test_dry_run_writes_nothing_and_reports_counts(population, tmp_path):
+    expected = expected_scores()
+    unchanged, changed = SCORED[:10], SCORED[10:16]
+    db = SessionLocal()
+    try:
+        for user_id in unchanged:
+            db.add(Result(user_id=user_id, health_score=expected[user_id], analysis_text="-"))
+        for user_id in changed:
+            db.add(Result(user_id=user_id, health_score=expected[user_id] - 5, analysis_text="-"))
+        db.commit()
+        rollups = db.scalar(select(func.count()).select_from(UserScoreRollup))
+    finally:
+        db.close()
+    before = sorted(results())
+
+    diff_path = tmp_path / "diff.csv"
+    assert run(tmp_path, "--dry-run", "--diff-output", str(diff_path)) == 0
+
+    assert sorted(results()) == before
+    db = SessionLocal()
+    try:
+        assert db.scalar(select(func.count()).select_from(UserScoreRollup)) == rollups
+    finally:
+        db.close()
+    assert not (tmp_path / "checkpoint.json").exists()
+
+    with open(diff_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["user_id"]) for row in rows] == SCORED
+    new = [row for row in rows if row["old_score"] == ""]
+    compared = [row for row in rows if row["old_score"] != ""]
+    assert len(new) == len(SCORED) - len(unchanged) - len(changed)
+    assert sorted(int(row["user_id"]) for row in compared) == sorted(unchanged + changed)
+    assert sorted(int(row["user_id"]) for row in compared if abs(float(row["delta"])) >= rescore.SCORE_EPSILON) == changed
+
+
+def test_dry_run_counts_without_diff_output(population, tmp_path, capsys):
+    assert run(tmp_path, "--dry-run") == 0
+    output = capsys.readouterr().out
+    assert f"без прежнего результата: {len(SCORED)}" in output
+    assert results() == []
+
+
+@pytest.mark.parametrize("fail_in", ["write_results", "save_checkpoint"])
+def test_resume_neither_repeats_nor_skips_users(population, tmp_path, monkeypatch, fail_in):
+    # Прерывание после второй порции: до commit результатов или между commit
+    # и записью контрольной точки
+    expected = expected_scores()
+    original = getattr(rescore, fail_in)
+    calls = {"count": 0}
+
+    def interrupted(*args, **kwargs):
+        calls["count"] += 1
+        if calls["count"] == 3:
+            if fail_in == "save_checkpoint":
+                raise KeyboardInterrupt
+            raise RuntimeError("соединение с БД потеряно")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(rescore, fail_in, interrupted)
+    with pytest.raises((RuntimeError, KeyboardInterrupt)):
+        run(tmp_path)
+    written = results()
+    assert 0 < len(written) < len(SCORED)
+    monkeypatch.setattr(rescore, fail_in, original)
+
+    assert run(tmp_path, "--resume") == 0
+    rows = results()
+    assert sorted(row.user_id for row in rows) == SCORED
+    assert len({row.created_at for row in rows}) == 1
+    for row in rows:
+        assert row.health_score == pytest.approx(expected[row.user_id])
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert checkpoint["finished"] is True
+    assert checkpoint["results_written"] >= len(SCORED) - (int(CHUNK) if fail_in == "save_checkpoint" else 0)
@@ -0,0 +1,96 @@
+# Сводка баллов пользователя (services/result_service.py)
+from datetime import datetime, timedelta
+
+from backend.db.connection import SessionLocal
+from backend.db.models import Result, UserScoreRollup
+from backend.services import result_service
+from backend.services.result_service import rollup_summary, update_score_rollup, update_score_rollups
+
+NOW = datetime(2026, 1, 31, 12, 0)
+
+
+def add_results(user_id, scores_by_day):
+    db = SessionLocal()
+    try:
+        db.add_all(
+            Result(user_id=user_id, health_score=score, analysis_text="-", created_at=NOW - timedelta(days=days))
+            for days, score in scores_by_day
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_first_save_when_rollup_created_concurrently(database, monkeypatch):
+    # Две первые отправки одного пользователя: пока эта транзакция собирала сводку
+    # по истории, другая уже записала свою. Вставка не падает, наш балл добавляется к ней
+    add_results(1, [(2, 60.0)])
+    build = result_service._rollup_from_history
+
+    def build_after_rival_commit(session, user_id):
+        rival = SessionLocal()
+        try:
+            rival.add(result_service._new_rollup(user_id, 60.0, NOW - timedelta(days=2)))
+            rival.commit()
+        finally:
+            rival.close()
+        return build(session, user_id)
+
+    monkeypatch.setattr(result_service, "_rollup_from_history", build_after_rival_commit)
+    db = SessionLocal()
+    try:
+        rollup = update_score_rollup(db, 1, 80.0, NOW)
+        db.commit()
+        assert rollup.results_count == 2
+        assert rollup.latest_score == 80.0
+        assert db.get(UserScoreRollup, 1, populate_existing=True).results_count == 2
+    finally:
+        db.close()
+
+
+def test_batch_rollups_with_concurrent_first_save(database, monkeypatch):
+    add_results(1, [(1, 50.0)])
+    add_results(2, [(1, 70.0)])
+    insert = result_service._insert_rollups
+
+    def rival_wins_for_user_1(session, rollups):
+        rival = SessionLocal()
+        try:
+            rival.add(result_service._new_rollup(1, 50.0, NOW - timedelta(days=1)))
+            rival.commit()
+        finally:
+            rival.close()
+        return insert(session, rollups)
+
+    monkeypatch.setattr(result_service, "_insert_rollups", rival_wins_for_user_1)
+    db = SessionLocal()
+    try:
+        update_score_rollups(db, {1: 90.0, 2: 70.0}, NOW)
+        db.commit()
+        assert db.get(UserScoreRollup, 1).results_count == 2
+        assert db.get(UserScoreRollup, 1).latest_score == 90.0
+        assert db.get(UserScoreRollup, 2).results_count == 1
+    finally:
+        db.close()
+
+
+def test_summary_hides_averages_without_recent_results(database):
+    add_results(1, [(100, 40.0), (45, 60.0), (20, 80.0)])
+    db = SessionLocal()
+    try:
+        rollup = result_service._rollup_from_history(db, 1)
+    finally:
+        db.close()
+
+    # Последний результат 20 дней назад: в 7-дневном окне результатов нет
+    summary = rollup_summary(rollup, now=NOW)
+    assert summary["days_since_latest"] == 20
+    assert summary["weighted_average_7d"] is None and summary["trend_7d"] is None
+    assert 60 < summary["weighted_average_30d"] < 80
+    assert summary["trend_30d"] == round(80.0 - summary["weighted_average_30d"], 2)
+    assert summary["weighted_average_90d"] < summary["weighted_average_30d"]
+
+    # Спустя полгода без отправок средние больше не показываются
+    later = rollup_summary(rollup, now=NOW + timedelta(days=180))
+    assert all(later[f"weighted_average_{window}d"] is None for window in (7, 30, 90))
+    assert later["latest_score"] == 80.0
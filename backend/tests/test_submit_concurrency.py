@@ -0,0 +1,80 @@
+# Сотни одновременных /submit_health_data через API при маленьком пуле соединений:
+# ни одной ошибки ожидания пула, все соединения возвращаются
+import asyncio
+import random
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from conftest import TEST_DB_PATH, auth_headers
+from backend.benchmarks.common import random_payload
+from backend.db.connection import get_db
+from backend.db.models import HealthData, Result, UserAnswer
+from backend.index import app
+
+REQUESTS = 300
+USERS = 5
+
+
+@pytest.mark.parametrize("warm_auth_cache", [True, False])
+def test_parallel_submissions_with_small_pool(database, warm_auth_cache):
+    engine = create_engine(
+        f"sqlite:///{TEST_DB_PATH}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=QueuePool, pool_size=2, max_overflow=2, pool_timeout=10,
+    )
+    SmallSession = sessionmaker(bind=engine)
+    sessions = {"opened": 0, "closed": 0}
+
+    def small_pool_db():
+        db = SmallSession()
+        sessions["opened"] += 1
+        try:
+            yield db
+        finally:
+            db.close()
+            sessions["closed"] += 1
+
+    async def submit_all():
+        random.seed(6)
+        payloads = [(i % USERS + 1, random_payload(questions=10)) for i in range(REQUESTS)]
+        headers = {user_id: auth_headers(user_id) for user_id in range(1, USERS + 1)}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            # С прогретым кэшем get_current_user проверяется только путь отправки,
+            # с холодным — ещё и чтение пользователей при нагрузке на пул
+            if warm_auth_cache:
+                for user_headers in headers.values():
+                    (await client.get("/api/users/me", headers=user_headers)).raise_for_status()
+            return await asyncio.gather(*(
+                client.post("/api/submit_health_data", json=payload, headers=headers[user_id])
+                for user_id, payload in payloads
+            ))
+
+    app.dependency_overrides[get_db] = small_pool_db
+    try:
+        responses = asyncio.run(submit_all())
+    finally:
+        app.dependency_overrides.pop(get_db)
+
+    try:
+        failed = [(r.status_code, r.text) for r in responses if r.status_code != 200]
+        assert failed == []
+        assert all(r.json()["total_score"] is not None for r in responses)
+        # Сессии закрыты, соединения вернулись в пул
+        assert sessions["opened"] == sessions["closed"] == REQUESTS + (USERS if warm_auth_cache else 0)
+        assert engine.pool.checkedout() == 0
+
+        db = SmallSession()
+        try:
+            assert db.query(func.count(HealthData.id)).scalar() == REQUESTS
+            assert db.query(func.count(Result.id)).scalar() == REQUESTS
+            # Текущие ответы — по одному на вопрос у каждого пользователя
+            assert db.query(func.count(UserAnswer.id)).scalar() == USERS * 10
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
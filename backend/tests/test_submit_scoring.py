@@ -0,0 +1,37 @@
+# Балл отправки считается по всему текущему набору ответов (прежние + новые)
+# и совпадает с calculate_for_user, которым пользуется rescore
+import pytest
+
+from conftest import auth_headers
+from backend.benchmarks.common import random_payload
+from backend.calculate_service import calculate_for_user
+from backend.db.connection import SessionLocal
+from backend.db.models import Result
+from backend.services.question_catalog import get_question_catalog
+
+
+def test_partial_submission_scores_merged_answers(client):
+    headers = auth_headers(1)
+    full = random_payload(questions=0)
+    full["answers"] = [{"question_id": i, "answer": i % 2 == 0} for i in range(1, 11)]
+    assert client.post("/api/submit_health_data", json=full, headers=headers).status_code == 200
+
+    # Вторая отправка меняет ответы только на первые три вопроса
+    partial = dict(full, answers=[{"question_id": i, "answer": i % 2 == 1} for i in range(1, 4)])
+    response = client.post("/api/submit_health_data", json=partial, headers=headers)
+    assert response.status_code == 200
+    submitted = response.json()
+
+    db = SessionLocal()
+    try:
+        expected = calculate_for_user(db, 1)
+        stored = db.query(Result).filter(Result.user_id == 1).order_by(Result.id.desc()).first()
+    finally:
+        db.close()
+
+    # Только по трём ответам запроса балл был бы другим
+    scorer = get_question_catalog().scorer
+    assert scorer.score([1, 2, 3], [True, False, True]) != pytest.approx(expected["details"]["user_answers_score"])
+    assert submitted["answers_score"] == pytest.approx(round(expected["details"]["user_answers_score"], 2))
+    assert submitted["total_score"] == pytest.approx(round(expected["total_score"], 2))
+    assert stored.health_score == pytest.approx(expected["total_score"])